@@ -1,8 +1,11 @@
 # Import for converting string IDs back to ObjectId
 from bson.objectid import ObjectId 
-from flask import Flask, request, render_template, redirect, url_for, flash, jsonify, session
+from bson.errors import InvalidId
+from flask import Flask, request, render_template, redirect, url_for, flash, jsonify, session, Response, stream_with_context
 from flask_cors import CORS
 from flask_pymongo import PyMongo
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import PyMongoError, AutoReconnect, OperationFailure
 from flask_socketio import SocketIO, emit
 from flask_session import Session 
 from math import ceil 
@@ -54,12 +57,82 @@ socketio = SocketIO(
 # Initialize Flask-PyMongo
 mongo = PyMongo(app)
 
-# --- Global Battle Queue Management (Simplified In-Memory) ---
-BATTLE_QUEUE = [] 
+# --- MongoDB Indexes ---
+# (collection, keys, options) for every index the hot queries rely on.
+# The trailing _id lets the same index serve the keyset-paginated (sorted by _id) inventory pages.
+INDEXES = [
+    ('pokemon', [('player', ASCENDING), ('locked', ASCENDING), ('_id', ASCENDING)], {'name': 'player_locked_id'}),
+    ('pokemon', [('player', ASCENDING), ('_id', ASCENDING)], {'name': 'player_id'}),
+    ('trade', [('status', ASCENDING), ('timestamp', ASCENDING), ('_id', ASCENDING)], {'name': 'status_timestamp_id'}),
+    ('players', [('email', ASCENDING)], {'name': 'email_unique', 'unique': True}),
+]
+
+def ensure_indexes(db):
+    """Creates every index in INDEXES; a no-op for indexes that already exist."""
+    for collection, keys, options in INDEXES:
+        db[collection].create_index(keys, **options)
+
+# Make sure the hot queries are index-backed (idempotent, safe for every worker to run)
+try:
+    ensure_indexes(mongo.db)
+    app.logger.info("MongoDB indexes ensured.")
+except PyMongoError as e:
+    app.logger.error(f"ERROR: Could not ensure MongoDB indexes: {e}")
+
+# --- Battle Queue Management (Shared Through Redis) ---
+# The queue lives in Redis so players connected to different battle workers can be matched.
+# battle:queue is a ZSET of socket ids scored by join order, battle:queue:players maps sid -> email.
+BATTLE_QUEUE_KEY = "battle:queue"
+BATTLE_QUEUE_PLAYERS_KEY = "battle:queue:players"
+BATTLE_QUEUE_SEQ_KEY = "battle:queue:seq"
+MATCHMAKING_REDIS_URL = os.environ.get('MATCHMAKING_REDIS', 'redis://redis:6379/0')
+matchmaking_redis = redis.from_url(MATCHMAKING_REDIS_URL, decode_responses=True)
+
+# Enqueues a socket and, if that makes two, pops the two oldest entries in the same atomic step,
+# so no two workers can ever pop the same player
+join_queue_script = matchmaking_redis.register_script("""
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    return {'already_queued', redis.call('ZRANK', KEYS[1], ARGV[1]) + 1}
+end
+redis.call('ZADD', KEYS[1], redis.call('INCR', KEYS[3]), ARGV[1])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+if redis.call('ZCARD', KEYS[1]) < 2 then
+    return {'queued', redis.call('ZRANK', KEYS[1], ARGV[1]) + 1}
+end
+local popped = redis.call('ZPOPMIN', KEYS[1], 2)
+local sid1, sid2 = popped[1], popped[3]
+local names = redis.call('HMGET', KEYS[2], sid1, sid2)
+redis.call('HDEL', KEYS[2], sid1, sid2)
+return {'matched', sid1, names[1], sid2, names[2]}
+""")
+
+# Removes a socket only if it is still waiting; returns 1 if it was removed
+leave_queue_script = matchmaking_redis.register_script("""
+local removed = redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+return removed
+""")
+
 BATTLES_IN_PROGRESS = {} 
 XP_PER_WIN = 100
 LEVEL_UP_XP = 100
 
+# --- Inventory Pagination ---
+INVENTORY_PAGE_SIZE = 50
+MAX_INVENTORY_PAGE_SIZE = 500
+INVENTORY_STREAM_BATCH = 500
+# Fields a client may ask for with ?fields=; '_id' is always returned
+INVENTORY_FIELDS = {'name', 'image', 'hp', 'atk', 'def', 'locked', 'player'}
+
+# --- Trade Fulfillment (one conditional claim, then one bulk_write) ---
+FULFILL_MAX_ATTEMPTS = 3
+WRITE_CONFLICT_CODE = 112
+
+FULFILL_OK = 'fulfilled'
+FULFILL_NOT_FOUND = 'not_found'
+FULFILL_INVALID_OFFER = 'invalid_offer'
+FULFILL_CONFLICT = 'conflict'
+
 # --- ROUTES FOR USER INTERACTION ---
 
 @app.route('/', methods=['GET'])
@@ -154,9 +227,34 @@ def home():
 
 @app.route('/api/inventory', methods=['GET'])
 def get_inventory():
-    """Returns a list of all Pokemon in the player inventory."""
-    inventory = list(mongo.db.pokemon.find({'player': session.get('email')}))
-    return jsonify(inventory)
+    """Returns one page of Pokemon in the player inventory.
+
+    Query parameters:
+        cursor: the 'next_cursor' of the previous page (omit for the first page)
+        limit:  page size, capped at MAX_INVENTORY_PAGE_SIZE
+        fields: comma-separated subset of INVENTORY_FIELDS to return
+        locked: 'true' or 'false' to only return locked or unlocked Pokemon
+        format: 'ndjson' streams every matching Pokemon after the cursor, one JSON object per line
+    """
+    try:
+        query, projection = parse_inventory_args(request.args, session.get('email'))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    if request.args.get('format') == 'ndjson':
+        return Response(stream_with_context(stream_inventory(query, projection)), mimetype='application/x-ndjson')
+
+    limit = request.args.get('limit', INVENTORY_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_INVENTORY_PAGE_SIZE))
+
+    # Fetch one extra Pokemon to know whether another page exists
+    page = list(mongo.db.pokemon.find(query, projection).sort('_id', 1).limit(limit + 1))
+    next_cursor = str(page[limit - 1]['_id']) if len(page) > limit else None
+
+    return jsonify({
+        "inventory": page[:limit],
+        "next_cursor": next_cursor
+    })
 
 @app.route('/api/release', methods=['DELETE'])
 def release_pokemon():
@@ -217,20 +315,12 @@ def get_trade_menu_data():
     available_inventory = mongo.db.pokemon.find({"player": session.get('email'), "locked": False})
     available_inventory = list(available_inventory)
     
-    # 2. Get all pending trades
+    # 2. Get all pending trades, with the offered pokemon joined in a single query
     pending_trades = []
     for doc in mongo.db.trade.find({"status": "pending"}):
         doc['id'] = str(doc.pop('_id'))
-        
-        # Look up the details of the offered pokemon (for display)
-        offered_pokemon_details = []
-        for p_id in doc['offering_ids']:
-            p_doc = mongo.db.pokemon.find_one({'_id': ObjectId(p_id)})
-            if p_doc:
-                offered_pokemon_details.append({"name": p_doc['name'], "image": p_doc['image']})
-        
-        doc['offered_details'] = offered_pokemon_details
         pending_trades.append(doc)
+    attach_offered_details(pending_trades)
 
     return jsonify({
         "inventory": available_inventory,
@@ -276,7 +366,7 @@ def create_trade():
 
 @app.route('/api/trade/fulfill', methods=['PUT'])
 def fulfill_trade():
-    """Requires exactly one Pokémon to fulfill the trade, swaps ownership, and removes the request."""
+    """Requires exactly one Pokémon to fulfill the trade, swaps ownership, and closes the request."""
     data = request.get_json()
     trade_id = data.get('trade_id')
     fulfilling_ids = data.get('fulfilling_ids', [])
@@ -286,38 +376,156 @@ def fulfill_trade():
 
     trade_obj_id = ObjectId(trade_id)
     fulfilling_obj_id = ObjectId(fulfilling_ids[0])
-    
-    # 1. Retrieve the trade request
-    trade = mongo.db.trade.find_one({'_id': trade_obj_id})
-    if not trade or trade.get('looking_for_count') != 1:
-        return jsonify({"message": "Trade request not found or is not a 1-for-1 trade."}), 404
-    
-    # The Pokemon offered in the original trade
-    original_offered_id = ObjectId(trade['offering_ids'][0])
-    
-    # 2. Perform the swap using two atomic updates
-    
-    # A. Original Creator (e.g., TrainerB) receives CURRENT_PLAYER's (TrainerA's) Pokemon
-    mongo.db.pokemon.update_one(
-        {'_id': fulfilling_obj_id, 'player': session.get('email')},
-        {'$set': {'player': trade['creator'], 'locked': False}}
-    )
-    
-    # B. CURRENT_PLAYER (TrainerA) receives the Original Creator's (TrainerB's) Pokemon (and unlocks it)
-    mongo.db.pokemon.update_one(
-        {'_id': original_offered_id},
-        {'$set': {'player': session.get('email'), 'locked': False}}
-    )
 
-    # 3. Delete the fulfilled trade request
-    mongo.db.trade.delete_one({'_id': trade_obj_id})
+    outcome, trade = fulfill_trade_swap(trade_obj_id, fulfilling_obj_id, session.get('email'))
+
+    if outcome == FULFILL_NOT_FOUND:
+        return jsonify({"message": "Trade request not found, already fulfilled, or is not a 1-for-1 trade."}), 404
+    if outcome == FULFILL_INVALID_OFFER:
+        return jsonify({"message": "Could not trade the selected Pokémon. It may be locked or not yours."}), 409
+    if outcome == FULFILL_CONFLICT:
+        return jsonify({"message": "The trade could not be completed due to a conflicting update. Please try again."}), 409
 
     return jsonify({
         "message": "Trade successful! 1-for-1 Pokémon swap completed.",
-        "traded_in": str(original_offered_id),
+        "traded_in": trade['offering_ids'][0],
         "traded_out": str(fulfilling_obj_id)
     })
 
+# --- Helper Functions ---
+def is_transient_write_error(error):
+    """True for errors where simply re-sending the same write is the right response."""
+    if isinstance(error, AutoReconnect):
+        return True
+    return isinstance(error, OperationFailure) and (
+        error.code == WRITE_CONFLICT_CODE or error.has_error_label('TransientTransactionError')
+    )
+
+def fulfill_trade_swap(trade_obj_id, fulfilling_obj_id, user_email):
+    """Atomically claims a pending trade and swaps both Pokemon.
+
+    Only one caller can move a trade out of 'pending', so concurrent fulfills of the same trade
+    can never double-swap. Both swapped Pokemon are tagged with the trade id, which makes the
+    bulk_write safe to re-send and lets a failed swap be undone precisely.
+    Returns (outcome, trade) where outcome is one of the FULFILL_* constants.
+    """
+    # 1. Claim the trade: the status filter makes this the single point of mutual exclusion
+    trade = mongo.db.trade.find_one_and_update(
+        {'_id': trade_obj_id, 'status': 'pending', 'looking_for_count': 1},
+        {'$set': {'status': 'fulfilled', 'fulfilled_by': user_email, 'fulfilled_at': datetime.now()}}
+    )
+    if not trade:
+        return FULFILL_NOT_FOUND, None
+
+    creator = trade['creator']
+    original_offered_id = ObjectId(trade['offering_ids'][0])
+
+    # 2. Swap both Pokemon in one round trip. Each filter also matches its own already-applied
+    # state, so a retried bulk_write reports the same matched_count without changing anything.
+    swap = [
+        # A. Original Creator receives CURRENT_PLAYER's Pokemon
+        UpdateOne(
+            {'_id': fulfilling_obj_id, '$or': [
+                {'player': user_email, 'locked': False},
+                {'player': creator, 'last_trade': trade_obj_id}
+            ]},
+            {'$set': {'player': creator, 'last_trade': trade_obj_id}}
+        ),
+        # B. CURRENT_PLAYER receives the Original Creator's Pokemon (and unlocks it)
+        UpdateOne(
+            {'_id': original_offered_id, '$or': [
+                {'player': creator, 'locked': True},
+                {'player': user_email, 'last_trade': trade_obj_id}
+            ]},
+            {'$set': {'player': user_email, 'locked': False, 'last_trade': trade_obj_id}}
+        )
+    ]
+
+    outcome = FULFILL_CONFLICT
+    for attempt in range(FULFILL_MAX_ATTEMPTS):
+        try:
+            result = mongo.db.pokemon.bulk_write(swap, ordered=True)
+        except PyMongoError as e:
+            if is_transient_write_error(e) and attempt + 1 < FULFILL_MAX_ATTEMPTS:
+                continue
+            break
+        outcome = FULFILL_OK if result.matched_count == len(swap) else FULFILL_INVALID_OFFER
+        break
+
+    if outcome == FULFILL_OK:
+        return outcome, trade
+
+    # 3. The swap did not fully apply: undo whatever part carries this trade's tag and reopen the trade
+    mongo.db.pokemon.bulk_write([
+        UpdateOne(
+            {'_id': fulfilling_obj_id, 'player': creator, 'last_trade': trade_obj_id},
+            {'$set': {'player': user_email}, '$unset': {'last_trade': ''}}
+        ),
+        UpdateOne(
+            {'_id': original_offered_id, 'player': user_email, 'last_trade': trade_obj_id},
+            {'$set': {'player': creator, 'locked': True}, '$unset': {'last_trade': ''}}
+        )
+    ], ordered=False)
+    mongo.db.trade.update_one(
+        {'_id': trade_obj_id, 'status': 'fulfilled', 'fulfilled_by': user_email},
+        {'$set': {'status': 'pending'}, '$unset': {'fulfilled_by': '', 'fulfilled_at': ''}}
+    )
+    return outcome, None
+
+def parse_inventory_args(args, user_email):
+    """Builds the (query, projection) pair for an inventory request, raising ValueError on bad input."""
+    query = {"player": user_email}
+
+    # Optional filter so trade forms only fetch Pokemon that can still be offered
+    locked = args.get('locked')
+    if locked is not None:
+        if locked not in ('true', 'false'):
+            raise ValueError("locked must be 'true' or 'false'.")
+        query['locked'] = locked == 'true'
+
+    cursor = args.get('cursor')
+    if cursor:
+        try:
+            query['_id'] = {'$gt': ObjectId(cursor)}
+        except InvalidId:
+            raise ValueError("Invalid inventory cursor.")
+
+    projection = None
+    fields = args.get('fields')
+    if fields:
+        requested = {field.strip() for field in fields.split(',') if field.strip()}
+        unknown = requested - INVENTORY_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown inventory fields: {', '.join(sorted(unknown))}.")
+        projection = {field: 1 for field in requested}
+
+    return query, projection
+
+def stream_inventory(query, projection):
+    """Yields one NDJSON line per Pokemon while the cursor is being iterated."""
+    inventory = mongo.db.pokemon.find(query, projection).sort('_id', 1).batch_size(INVENTORY_STREAM_BATCH)
+    for pokemon in inventory:
+        yield app.json.dumps(pokemon) + "\n"
+
+def attach_offered_details(trades):
+    """Fills 'offered_details' on every trade using one $in lookup instead of one find_one per pokemon."""
+    offered_ids = {ObjectId(p_id) for trade in trades for p_id in trade['offering_ids']}
+
+    # Only the display fields are needed, so project everything else away
+    details_by_id = {}
+    if offered_ids:
+        details_by_id = {
+            p_doc['_id']: {"name": p_doc['name'], "image": p_doc['image']}
+            for p_doc in mongo.db.pokemon.find({'_id': {'$in': list(offered_ids)}}, {'name': 1, 'image': 1})
+        }
+
+    for trade in trades:
+        # Keep the original offering order and skip pokemon that no longer exist
+        trade['offered_details'] = [
+            details_by_id[ObjectId(p_id)] for p_id in trade['offering_ids'] if ObjectId(p_id) in details_by_id
+        ]
+    return trades
+
 # --- API Route: Get User Info ---
 
 @app.route('/api/user/info', methods=['GET'])
@@ -351,33 +559,33 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     """Removes player from the queue if they disconnect."""
-    global BATTLE_QUEUE
     player_name = session.get('email')
     if player_name:
         # Remove from queue if present
-        BATTLE_QUEUE = [player for player in BATTLE_QUEUE if player['sid'] != request.sid]
-        app.logger.info(f"Client Disconnected: {player_name} removed from queue.")
+        if leave_queue_script(keys=[BATTLE_QUEUE_KEY, BATTLE_QUEUE_PLAYERS_KEY], args=[request.sid]):
+            app.logger.info(f"Client Disconnected: {player_name} removed from queue.")
 
 @socketio.on('join_queue')
 def handle_join_queue():
     """Handles queue entry and immediate matchmaking attempt."""
-    global BATTLE_QUEUE, BATTLES_IN_PROGRESS
     player_name = session.get('email')
     player_sid = request.sid
 
+    # Enter the shared queue and attempt matchmaking in one atomic step
+    reply = join_queue_script(
+        keys=[BATTLE_QUEUE_KEY, BATTLE_QUEUE_PLAYERS_KEY, BATTLE_QUEUE_SEQ_KEY],
+        args=[player_sid, player_name]
+    )
+
     # Check if already in queue
-    if any(player['sid'] == player_sid for player in BATTLE_QUEUE):
+    if reply[0] == 'already_queued':
         return
-    
-    # Enter queue
-    BATTLE_QUEUE.append({'name': player_name, 'sid': player_sid})
 
-    # Attempt Matchmaking (if at least 2 players are in the queue)
-    if len(BATTLE_QUEUE) >= 2:
+    if reply[0] == 'matched':
         
-        # Pop the two players off the queue
-        player1 = BATTLE_QUEUE.pop(0) 
-        player2 = BATTLE_QUEUE.pop(0)
+        # The two oldest players, already popped off the queue
+        player1 = {'sid': reply[1], 'name': reply[2]}
+        player2 = {'sid': reply[3], 'name': reply[4]}
             
         # --- Match Found & Simulation ---
         
@@ -426,7 +634,7 @@ def handle_join_queue():
         
     else:
         # No match found, notify client of position
-        position = BATTLE_QUEUE.index({'name': player_name, 'sid': player_sid}) + 1
+        position = int(reply[1])
         emit('queue_update', {'message': "Searching...", 'position': position}, room=player_sid)
 
 # --- Helper Functions ---
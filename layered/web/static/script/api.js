@@ -31,10 +31,24 @@ async function callApi(endpoint, method, bodyData = null) {
     return response.json();
 }
 
+/**
+ * Builds a query string from the given parameters, skipping empty values.
+ * @param {Object} params - Query parameters (e.g., { cursor, limit }).
+ * @returns {string} - '' or '?key=value&...'.
+ */
+function toQueryString(params) {
+    const query = Object.entries(params)
+        .filter(([, value]) => value !== null && value !== undefined && value !== '')
+        .map(([key, value]) => `${encodeURIComponent(key)}=${encodeURIComponent(value)}`)
+        .join('&');
+    return query ? `?${query}` : '';
+}
+
 // Specific API functions
 export const API = {
     // Inventory related APIs
-    getInventory: () => callApi('inventory', 'GET'),
+    // Pass { cursor, limit, fields, locked } to page, project or filter the inventory
+    getInventory: (params = {}) => callApi('inventory' + toQueryString(params), 'GET'),
     releasePokemon: (ids) => callApi('release', 'DELETE', { ids }),
 
     // Catch Pokemon API
@@ -1,20 +1,48 @@
 import { API } from './api.js';
-import { renderInventory } from './renderer.js';
+import { renderInventory, renderInventoryCards, renderLoadMoreInventory } from './renderer.js';
+
+// Trade forms only need unlocked Pokémon and the fields shown on their cards
+export const TRADE_INVENTORY_PARAMS = { locked: 'false', fields: 'name,image,locked' };
+
+// Inventory query parameters for each card type that can show a "Load More" button
+const INVENTORY_PARAMS_BY_TYPE = {
+    'inventory': {},
+    'trade-fulfill': TRADE_INVENTORY_PARAMS
+};
 
 /**
- * Loads the main inventory view by fetching data and rendering it.
+ * Loads the main inventory view by fetching the first page and rendering it.
  */
 export async function loadInventoryView() {
     window.actionContainer.innerHTML = '<h2>Loading Inventory...</h2>';
     try {
         const data = await API.getInventory();
-        window.actionContainer.innerHTML = renderInventory(data);
+        window.actionContainer.innerHTML = renderInventory(data.inventory, data.next_cursor);
     } catch (error) {
         window.actionContainer.innerHTML = `<h2>Inventory Error 🚨</h2><p>Failed to load inventory.</p><p>Error: ${error.message}</p>`;
         console.error("Inventory fetch error:", error);
     }
 }
 
+/**
+ * Fetches the next inventory page and appends its cards to the current grid.
+ * @param {string} cursor - The next_cursor returned with the previous page.
+ * @param {string} type - The card type being rendered ('inventory' or 'trade-fulfill').
+ */
+export async function loadMoreInventory(cursor, type) {
+    const loadMoreElement = document.getElementById('inventory-load-more');
+    loadMoreElement.innerHTML = '<p>Loading more Pokémon...</p>';
+
+    try {
+        const data = await API.getInventory({ ...INVENTORY_PARAMS_BY_TYPE[type], cursor });
+        document.getElementById('inventory-grid').insertAdjacentHTML('beforeend', renderInventoryCards(data.inventory, type));
+        loadMoreElement.innerHTML = renderLoadMoreInventory(data.next_cursor, type);
+    } catch (error) {
+        loadMoreElement.innerHTML = `<p>Could not load more Pokémon. Error: ${error.message}</p>`;
+        console.error("Inventory page fetch error:", error);
+    }
+}
+
 /**
  * Handles the release API call and subsequent reload.
  */
@@ -1,7 +1,7 @@
 // The orchestrator script that ties together various modules for the game client
 
 import { renderBattle, renderGatchaResult } from './renderer.js';
-import { loadInventoryView, handleRelease } from './inventory.js';
+import { loadInventoryView, loadMoreInventory, handleRelease } from './inventory.js';
 import { loadTradeMenu, renderCreateTradeForm, renderFulfillTradeForm, handleCreateTrade, handleFulfillTrade, toggleTradeSelection } from './trade.js';
 import { enterMatchmakingQueue, handleBattleEndConfirmation, setupSocketListeners } from './battle.js'; // NEW
 import { loadDashboard } from './user.js'; // NEW
@@ -14,6 +14,7 @@ window.actionContainer = actionContainer; // Make available globally for modules
 
 // Expose these domain-specific functions globally for HTML onclick handlers
 window.handleRelease = handleRelease;
+window.loadMoreInventory = loadMoreInventory;
 window.loadTradeMenu = loadTradeMenu;
 window.renderCreateTradeForm = renderCreateTradeForm;
 window.renderFulfillTradeForm = renderFulfillTradeForm;
@@ -56,18 +56,31 @@ export function renderGatchaResult(data) {
     `;
 }
 
-export function renderInventory(pokemonList, handleRelease) {
+export function renderInventoryCards(pokemonList, type = 'inventory') {
+    return pokemonList.map(pokemon => generatePokemonCardHtml(pokemon, type)).join('');
+}
+
+export function renderLoadMoreInventory(nextCursor, type = 'inventory') {
+    // No cursor means the last page has been reached
+    if (!nextCursor) {
+        return '';
+    }
+    return `<button type="button" class="menu-button" style="background-color: #5bc0de;" onclick="window.loadMoreInventory('${nextCursor}', '${type}')">Load More Pokémon</button>`;
+}
+
+export function renderInventory(pokemonList, nextCursor) {
     if (pokemonList.length === 0) {
         return `<h2>Inventory Empty</h2><p>You haven't caught any Pokemon yet! Go use the Gatcha!</p>`;
     }
 
-    const inventoryHtml = pokemonList.map(pokemon => generatePokemonCardHtml(pokemon, 'inventory')).join('');
+    const inventoryHtml = renderInventoryCards(pokemonList, 'inventory');
 
     return `
-        <h2>Your Pokemon Inventory (${pokemonList.length} Caught)</h2>
+        <h2>Your Pokemon Inventory</h2>
         <form id="release-form" onsubmit="return false;"> 
             <p>Locked Pokémon (in trade) cannot be released.</p>
-            <div style="display:flex; flex-wrap:wrap; justify-content:center;">${inventoryHtml}</div>
+            <div id="inventory-grid" style="display:flex; flex-wrap:wrap; justify-content:center;">${inventoryHtml}</div>
+            <div id="inventory-load-more" style="margin-top: 20px;">${renderLoadMoreInventory(nextCursor, 'inventory')}</div>
             <button type="button" onclick="window.handleRelease()" style="margin-top: 20px; padding: 10px 30px; background-color: #dc3545; color: white; border: none; border-radius: 5px; cursor: pointer;">
                 Confirm Release Selected
             </button>
@@ -136,13 +149,13 @@ export function renderCreateTradeFormHTML(inventory) {
     `;
 }
 
-export function renderFulfillTradeFormHTML(tradeId, requestedCount, creator, inventory) {
+export function renderFulfillTradeFormHTML(tradeId, requestedCount, creator, inventory, nextCursor) {
     const availableInventory = inventory.filter(pokemon => !pokemon.locked);
     
     // We pass 1 to generatePokemonCardHtml for max selection status
     const inventoryWithCount = availableInventory.map(pokemon => ({...pokemon, requiredCount: 1}));
 
-    const inventoryHtml = inventoryWithCount.map(pokemon => generatePokemonCardHtml(pokemon, 'trade-fulfill')).join('');
+    const inventoryHtml = renderInventoryCards(inventoryWithCount, 'trade-fulfill');
 
     return `
         <h1>Fulfill Trade Request from ${creator}</h1>
@@ -150,7 +163,8 @@ export function renderFulfillTradeFormHTML(tradeId, requestedCount, creator, inv
         <div id="selection-status">Selected: 0 / 1</div>
 
         <p>Select your 1 Pokémon to send:</p>
-        <div style="display:flex; flex-wrap:wrap; justify-content:center;">${inventoryHtml || '<p>Your available inventory is empty!</p>'}</div>
+        <div id="inventory-grid" style="display:flex; flex-wrap:wrap; justify-content:center;">${inventoryHtml || '<p>Your available inventory is empty!</p>'}</div>
+        <div id="inventory-load-more" style="margin-top: 20px;">${renderLoadMoreInventory(nextCursor, 'trade-fulfill')}</div>
         
         <div style="margin-top: 20px;">
             <button onclick="window.handleFulfillTrade('${tradeId}', 1)" class="menu-button" style="background-color: #28a745;" id="fulfill-confirm-btn" disabled>Confirm Fulfillment</button>
@@ -1,4 +1,5 @@
 import { API } from './api.js';
+import { TRADE_INVENTORY_PARAMS } from './inventory.js';
 import { renderTradeMenu, renderCreateTradeFormHTML, renderFulfillTradeFormHTML } from './renderer.js';
 
 /**
@@ -35,8 +36,8 @@ export async function renderFulfillTradeForm(tradeId, requestedCount, creator) {
     // requestedCount will always be 1, but we keep it for now as a parameter for consistency
     window.actionContainer.innerHTML = '<h2>Loading Inventory...</h2>';
     try {
-        const inventory = await API.getInventory();
-        window.actionContainer.innerHTML = renderFulfillTradeFormHTML(tradeId, 1, creator, inventory);
+        const data = await API.getInventory(TRADE_INVENTORY_PARAMS);
+        window.actionContainer.innerHTML = renderFulfillTradeFormHTML(tradeId, 1, creator, data.inventory, data.next_cursor);
     } catch (error) {
         window.actionContainer.innerHTML = `<h2>Error loading inventory for trade fulfillment.</h2><p>${error.message}</p>`;
     }
@@ -163,6 +163,11 @@ class HttpLoadUser(HttpUser):
         """Simulates the high-load DB write request for gatcha."""
         self.client.post("/api/gatcha/", name="/api/gatcha")
 
+    @task(1)
+    def api_gatcha_multi(self):
+        """Simulates a 10-pull: one request and one insert_many for ten Pokemon."""
+        self.client.post("/api/gatcha/multi", json={"count": 10}, name="/api/gatcha/multi")
+
     @task(1)
     def api_inventory(self):
         """Simulates a lighter DB read request."""
@@ -1,6 +1,6 @@
 import os
 import sys
-from pymongo import MongoClient
+from pymongo import MongoClient, ReplaceOne
 from datetime import datetime
 import hashlib
 import time
@@ -23,6 +23,10 @@ BASE_MONSTERS = [
     {"name": "Snorlax", "type": "Normal", "atk": 110, "def": 65, "hp": 160, "base_rarity": 0.5},
 ]
 
+# Pokedex numbers of the base monsters, used as species ids and to build sprite URLs
+POKEDEX_IDS = {"Squirtle": 7, "Bulbasaur": 1, "Charmander": 4, "Pikachu": 25, "Snorlax": 143}
+SPRITE_URL = "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{}.png"
+
 
 def create_user_document(email, password):
     """
@@ -61,6 +65,22 @@ def create_inventory_document(owner_email, base_mon):
         "creation_date": datetime.utcnow(),
     }
 
+def create_species_document(base_mon):
+    """
+    Creates a species document for the 'species' collection.
+    Matches the catalog the gatcha service draws from (weighted by base_rarity).
+    """
+    pokedex_id = POKEDEX_IDS[base_mon['name']]
+    return {
+        "_id": pokedex_id,
+        "name": base_mon['name'],
+        "atk": base_mon['atk'],
+        "def": base_mon['def'],
+        "hp": base_mon['hp'],
+        "base_rarity": base_mon['base_rarity'],
+        "image": SPRITE_URL.format(pokedex_id),
+    }
+
 def seed_database():
     print(f"[{datetime.now().strftime('%H:%M:%S')}] Attempting to connect to MongoDB at: {MONGO_URI}...")
     try:
@@ -77,6 +97,12 @@ def seed_database():
         # --- 2. Seed Base Monsters (Required for Gatcha and Battle) ---
         db.monsters.insert_many(BASE_MONSTERS)
         print(f"[{datetime.now().strftime('%H:%M:%S')}] Inserted {len(BASE_MONSTERS)} base monsters into 'monsters' collection.")
+        # Upserted rather than wiped, so species the services seeded (and pokemon that reference them) stay valid
+        db.species.bulk_write([
+            ReplaceOne({"_id": species["_id"]}, species, upsert=True)
+            for species in map(create_species_document, BASE_MONSTERS)
+        ])
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Upserted {len(BASE_MONSTERS)} species into 'species' collection.")
 
         # --- 3. Register Test Player ---
         player_doc = create_user_document(TEST_USER_EMAIL, TEST_USER_PASSWORD)
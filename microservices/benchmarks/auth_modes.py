@@ -0,0 +1,129 @@
+import os
+import random
+import time
+import redis
+from flask import Flask, session, jsonify
+
+from web.db_utils import init_sessions, get_current_user_email, issue_auth_token, AUTH_MODE_TOKEN
+
+# --- CONFIGURATION ---
+# Run from the microservices/ directory: python -m benchmarks.auth_modes
+# A Redis database of its own, flushed at the end, so the benchmark never touches live sessions
+REDIS_URL = os.environ.get("BENCH_REDIS", "redis://localhost:6379/15")
+# Nothing listens here: the outage pass points every service at it
+DOWN_REDIS_URL = "redis://localhost:1/0?socket_connect_timeout=0.05"
+SERVICES = ["inventory", "gatcha", "trade", "battle"]
+PLAYERS = 200
+REQUESTS = 5000
+OUTAGE_REQUESTS = 200
+# (label, environment init_sessions reads)
+MODES = [
+    ("session", {"AUTH_MODE": "session", "SESSION_CACHE": "0"}),
+    ("cached", {"AUTH_MODE": "session", "SESSION_CACHE": "1"}),
+    ("token", {"AUTH_MODE": "token"}),
+]
+
+
+def build_service(name, environment, redis_url):
+    """A service configured by init_sessions whose only work is the caller lookup every API route does."""
+    os.environ.update(environment, SESSION_TYPE='redis', SESSION_REDIS=redis_url, SECRET_KEY='bench')
+    app = Flask(name)
+    init_sessions(app, name)
+
+    @app.route('/login/<email>', methods=['POST'])
+    def login(email):
+        response = jsonify({"ok": True})
+        if app.config['AUTH_MODE'] == AUTH_MODE_TOKEN:
+            issue_auth_token(response, email, 1)
+        else:
+            session['user_email'] = email
+        return response
+
+    @app.route('/api/me')
+    def me():
+        user_email = get_current_user_email()
+        if not user_email:
+            return jsonify({"error": "Unauthorized"}), 401
+        return jsonify({"email": user_email})
+
+    return app
+
+
+def log_in(services):
+    """Logs every player in through the first service; returns their cookies by name."""
+    cookies = []
+    login_client = services[SERVICES[0]]
+    for n in range(PLAYERS):
+        client = login_client.test_client()
+        client.post(f"/login/bench_{n}@example.com")
+        cookies.append({cookie.key: cookie.value for cookie in (client.get_cookie('session'), client.get_cookie('auth_token')) if cookie})
+    return cookies
+
+
+def clients_for(services, cookies):
+    clients = {}
+    for name, app in services.items():
+        for n, jar in enumerate(cookies):
+            clients[name, n] = app.test_client()
+            for key, value in jar.items():
+                clients[name, n].set_cookie(key, value)
+    return clients
+
+
+def run(redis_client, environment, rng):
+    """Replays REQUESTS lookups spread over the services; returns (redis commands/request, req/s, p50 ms)."""
+    redis_client.flushdb()
+    services = {name: build_service(name, environment, REDIS_URL) for name in SERVICES}
+    time.sleep(0.2)
+    clients = clients_for(services, log_in(services))
+
+    latencies, commands = [], 0
+    for _ in range(REQUESTS):
+        before = redis_client.info('stats')['total_commands_processed']
+        start = time.perf_counter()
+        response = clients[rng.choice(SERVICES), rng.randrange(PLAYERS)].get('/api/me')
+        latencies.append((time.perf_counter() - start) * 1000)
+        # Minus the INFO call itself
+        commands += redis_client.info('stats')['total_commands_processed'] - before - 1
+        if response.status_code != 200:
+            raise SystemExit("A logged-in player was rejected.")
+    latencies.sort()
+    return commands / REQUESTS, REQUESTS / (sum(latencies) / 1000), latencies[len(latencies) // 2]
+
+
+def run_outage(environment, rng):
+    """Logs players in while Redis is up, then points the services at a dead Redis; returns the share still served."""
+    services = {name: build_service(name, environment, REDIS_URL) for name in SERVICES}
+    time.sleep(0.2)
+    cookies = log_in(services)
+    services = {name: build_service(name, environment, DOWN_REDIS_URL) for name in SERVICES}
+    for app in services.values():
+        # Every failed request would otherwise print its traceback
+        app.logger.disabled = True
+    clients = clients_for(services, cookies)
+
+    served = 0
+    for _ in range(OUTAGE_REQUESTS):
+        try:
+            served += clients[rng.choice(SERVICES), rng.randrange(PLAYERS)].get('/api/me').status_code == 200
+        except redis.RedisError:
+            pass
+    return served / OUTAGE_REQUESTS
+
+
+def main():
+    redis_client = redis.from_url(REDIS_URL)
+    print(f"{'auth mode':>9} | {'redis ops/req':>13} | {'req/s':>8} | {'p50 ms':>7} | {'served with redis down':>22}")
+    try:
+        for label, environment in MODES:
+            ops, rate, p50 = run(redis_client, environment, random.Random(22))
+            served = run_outage(environment, random.Random(22))
+            print(f"{label:>9} | {ops:>13.2f} | {rate:>8.0f} | {p50:>7.3f} | {served:>21.0%}")
+            if environment["AUTH_MODE"] == AUTH_MODE_TOKEN and (ops or served < 1):
+                raise SystemExit("Token authentication touched Redis.")
+    finally:
+        redis_client.flushdb()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import random
+import time
+
+import bson
+
+from web.battle_simulator import pack_replay, unpack_replay, replay_turns, REPLAY_FORMAT
+
+# --- CONFIGURATION ---
+# Run from the microservices/ directory: python -m benchmarks.battle_replay
+# Replay correctness (round trip and agreement with the live engines) is covered by tests/test_replay.py.
+SIZED_PAIRS = 200000
+TIMED_REPLAYS = 100000
+
+
+def random_mon(rng):
+    """Stats across (and beyond) the species range, including zero/negative HP and damage-floor cases."""
+    return {"hp": rng.randint(-5, 400), "atk": rng.randint(0, 200), "def": rng.randint(0, 400)}
+
+
+def turn_log(turns):
+    """What storing the battle turn by turn would cost instead: a BSON array of per-attack documents."""
+    return bson.encode({"turns": [
+        {"attacker": side, "damage": hit, "hp": [hp0, hp1]} for side, hit, hp0, hp1 in turns
+    ]})
+
+
+def turn_log_sizes(rng):
+    """Sizes of the turn logs SIZED_PAIRS random battles would have stored, sorted."""
+    return sorted(
+        len(turn_log(replay_turns(random_mon(rng), random_mon(rng)))) for _ in range(SIZED_PAIRS)
+    )
+
+
+def main():
+    rng = random.Random(20)
+    log_sizes = turn_log_sizes(rng)
+
+    records = [pack_replay(random_mon(rng), random_mon(rng)) for _ in range(TIMED_REPLAYS)]
+    start = time.perf_counter()
+    for record in records:
+        replay_turns(*unpack_replay(record))
+    replays_per_second = TIMED_REPLAYS / (time.perf_counter() - start)
+
+    print(f"{'storage per battle':>22} | {'bytes':>6}")
+    print(f"{'replay record':>22} | {REPLAY_FORMAT.size:>6}")
+    print(f"{'turn log p50':>22} | {log_sizes[len(log_sizes) // 2]:>6}")
+    print(f"{'turn log max':>22} | {log_sizes[-1]:>6}")
+    print(f"regenerating turns: {replays_per_second:.0f} replays/s")
+
+
+if __name__ == "__main__":
+    main()
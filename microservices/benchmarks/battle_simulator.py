@@ -0,0 +1,43 @@
+import random
+import time
+
+import numpy as np
+
+from web.battle_simulator import simulate_battle_loop, player_wins, player_wins_batch
+
+# --- CONFIGURATION ---
+# Run from the microservices/ directory: python -m benchmarks.battle_simulator
+# The engines' agreement with the loop is covered by tests/test_battle_simulator.py.
+LOOP_PAIRS = 200000
+BATCH_PAIRS = 5000000
+
+
+def random_mon(rng):
+    """Stats across (and beyond) the species range, including zero/negative HP and damage-floor cases."""
+    return {"hp": rng.randint(-5, 400), "atk": rng.randint(0, 200), "def": rng.randint(0, 400)}
+
+
+def time_per_battle(fn, pairs):
+    start = time.perf_counter()
+    for a, b in pairs:
+        fn(a, b)
+    return len(pairs) / (time.perf_counter() - start)
+
+
+def main():
+    rng = random.Random(14)
+    pairs = [(random_mon(rng), random_mon(rng)) for _ in range(LOOP_PAIRS)]
+    np_rng = np.random.default_rng(14)
+    columns = [np_rng.integers(1, 400, BATCH_PAIRS) for _ in range(6)]
+    start = time.perf_counter()
+    player_wins_batch(*columns)
+    batch_rate = BATCH_PAIRS / (time.perf_counter() - start)
+
+    print(f"{'engine':>12} | {'battles/s':>12}")
+    print(f"{'loop':>12} | {time_per_battle(simulate_battle_loop, pairs):>12.0f}")
+    print(f"{'closed form':>12} | {time_per_battle(player_wins, pairs):>12.0f}")
+    print(f"{'numpy batch':>12} | {batch_rate:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
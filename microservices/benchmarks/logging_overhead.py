@@ -0,0 +1,109 @@
+import contextlib
+import logging
+import os
+import tempfile
+import time
+from flask import Flask, session, jsonify
+from flask.logging import default_handler
+
+from web.db_utils import init_logging
+
+# --- CONFIGURATION ---
+# Run from the microservices/ directory: python -m benchmarks.logging_overhead
+# Pure in-process work (logs go to a temporary file), so it needs no MongoDB or Redis.
+REQUESTS = 20000
+BATTLES = 50000
+SAMPLE_RATES = "/api/user/info=0.01,battle_result=0.01"
+
+
+def build_app(old_logging):
+    """/api/user/info with its session and user lookups stubbed out, logging the old way or the new way."""
+    app = Flask('logging_bench')
+    app.config['SECRET_KEY'] = 'bench'
+
+    @app.route('/login')
+    def login():
+        session['user_email'] = 'bench@example.com'
+        return jsonify({"ok": True})
+
+    @app.route('/api/user/info')
+    def get_user_info():
+        if old_logging:
+            app.logger.info(f"DEBUG session dict: {dict(session)}")
+            print(f"DEBUG session dict: {dict(session)}")
+            user_email = session.get('user_email')
+            app.logger.info(f"DEBUG: session user_email -> {user_email}")
+            app.logger.info(f"LOGGER User {user_email} requested their info.")
+            print(f"PRINT User {user_email} requested their info.")
+        else:
+            user_email = session.get('user_email')
+            if app.logger.isEnabledFor(logging.DEBUG):
+                app.logger.debug(f"session {dict(session)} -> user_email {user_email}")
+            app.logger.info("User %s requested their info.", user_email)
+        return jsonify({"email": user_email, "level": 1, "xp": 0})
+
+    return app
+
+
+def use_old_logging(app, log_file):
+    """Flask's default synchronous handler writing straight to the log file, as every service used to."""
+    logging.getLogger().handlers = []
+    default_handler.setStream(log_file)
+    app.logger.addHandler(default_handler)
+    app.logger.setLevel(logging.INFO)
+
+
+def use_new_logging(app, log_file, sample_rates):
+    os.environ['LOG_SAMPLE_RATES'] = sample_rates
+    return init_logging(app, 'logging_bench', stream=log_file)
+
+
+def emit_results(logger, old_logging):
+    """The logging of one resolved battle: a result emit per player (logged packet by packet with logger=True before)."""
+    for name, sid in [("p1@example.com", "sid1"), ("p2@example.com", "sid2")]:
+        if old_logging:
+            logger.info(f'emitting event "battle_result" to {sid} [/]')
+            logger.info(f"Match found! Sent FULL result to {name} (SID: {sid})")
+        else:
+            logger.info("Match found! Sent FULL result to %s (SID: %s)", name, sid, extra={'route': 'battle_result'})
+
+
+def run(old_logging, sample_rates, log_file):
+    app = build_app(old_logging)
+    listener = use_old_logging(app, log_file) if old_logging else use_new_logging(app, log_file, sample_rates)
+    client = app.test_client()
+    client.get('/login')
+
+    with contextlib.redirect_stdout(log_file):
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            client.get('/api/user/info')
+        info_rate = REQUESTS / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(BATTLES):
+            emit_results(app.logger, old_logging)
+        battle_rate = BATTLES / (time.perf_counter() - start)
+
+    if listener:
+        # Wait for the background writer, so no run pays for the previous one's backlog
+        listener.queue.join()
+    log_file.flush()
+    return info_rate, battle_rate
+
+
+def main():
+    print(f"{'logging':>22} | {'/api/user/info req/s':>20} | {'battle results/s':>16} | {'log MB':>7}")
+    for label, old_logging, sample_rates in [
+        ("sync + debug dumps", True, ""),
+        ("queue + JSON", False, ""),
+        ("queue + JSON, sampled", False, SAMPLE_RATES),
+    ]:
+        with tempfile.TemporaryFile('w+') as log_file:
+            info_rate, battle_rate = run(old_logging, sample_rates, log_file)
+            size_mb = log_file.seek(0, os.SEEK_END) / 1e6
+        print(f"{label:>22} | {info_rate:>20.0f} | {battle_rate:>16.0f} | {size_mb:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import random
+import time
+
+from web.matchmaking import InProcessMatchQueue
+
+# --- CONFIGURATION ---
+# Run from the microservices/ directory: python -m benchmarks.match_queue
+QUEUE_SIZES = [10000, 50000, 100000]
+OPS_PER_SIZE = 100
+
+
+class LegacyListQueue:
+    """The original BATTLE_QUEUE list operations from handle_join_queue / handle_disconnect."""
+
+    def __init__(self):
+        self.queue = []
+
+    def add(self, sid, player):
+        if any(entry['sid'] == sid for entry in self.queue):
+            return False
+        self.queue.append({'name': player, 'sid': sid})
+        return True
+
+    def leave(self, sid):
+        self.queue = [entry for entry in self.queue if entry['sid'] != sid]
+
+    def position(self, sid, player):
+        return self.queue.index({'name': player, 'sid': sid}) + 1
+
+    def pop_pair(self):
+        return self.queue.pop(0), self.queue.pop(0)
+
+
+def measure(fn, args_list):
+    """Mean microseconds per call over args_list."""
+    start = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1e6
+
+
+def run(queue_cls, size):
+    """Fills a queue with size sockets, then times each operation; returns microseconds per op."""
+    rng = random.Random(size)
+    queue = queue_cls()
+    if isinstance(queue, LegacyListQueue):
+        # Filling through add() would itself be O(n^2)
+        queue.queue = [{'name': f"player{n}@example.com", 'sid': f"sid{n}"} for n in range(size)]
+    else:
+        for n in range(size):
+            queue.add(f"sid{n}", f"player{n}@example.com")
+
+    new_sids = [(f"new{n}", f"new{n}@example.com") for n in range(OPS_PER_SIZE)]
+    waiting = rng.sample(range(size // 2, size), OPS_PER_SIZE * 2)
+    positions = [(f"sid{n}", f"player{n}@example.com") for n in waiting[:OPS_PER_SIZE]]
+    leaves = [(f"sid{n}",) for n in waiting[OPS_PER_SIZE:]]
+
+    if isinstance(queue, InProcessMatchQueue):
+        position = measure(lambda sid, player: queue.position(sid), positions)
+    else:
+        position = measure(queue.position, positions)
+    return {
+        'join': measure(queue.add, new_sids),
+        'position': position,
+        'leave': measure(queue.leave, leaves),
+        'match': measure(queue.pop_pair, [()] * OPS_PER_SIZE),
+    }
+
+
+def main():
+    print(f"{'variant':>10} | {'queued':>7} | {'join us':>9} | {'leave us':>9} | {'match us':>9} | {'position us':>11}")
+    for size in QUEUE_SIZES:
+        for label, queue_cls in [("list", LegacyListQueue), ("deque", InProcessMatchQueue)]:
+            result = run(queue_cls, size)
+            print(f"{label:>10} | {size:>7} | {result['join']:>9.2f} | {result['leave']:>9.2f} | "
+                  f"{result['match']:>9.2f} | {result['position']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import os
+import random
+import time
+from collections import Counter
+from multiprocessing import Pool
+
+import redis
+
+from web.matchmaking import RedisMatchQueue, MATCHED, QUEUE_KEY
+
+# --- CONFIGURATION ---
+# Run from the microservices/ directory: python -m benchmarks.matchmaking_harness
+# A Redis database of its own, flushed before and after, so live queues are never touched
+REDIS_URL = os.environ.get("BENCH_REDIS", "redis://localhost:6379/15")
+WORKER_COUNTS = [1, 4, 16]
+JOINS_PER_WORKER = 2000
+# Share of still-waiting sockets that disconnect before being matched
+LEAVE_RATIO = 0.2
+
+
+def worker(index):
+    """One battle worker: joins its own sockets, sometimes disconnecting one that is still waiting.
+
+    Returns (joined sids, matched pairs, sids removed by leave, elapsed seconds).
+    """
+    match_queue = RedisMatchQueue.from_url(REDIS_URL)
+    rng = random.Random(index)
+    joined, matches, left, waiting = [], [], [], []
+
+    start = time.perf_counter()
+    for n in range(JOINS_PER_WORKER):
+        sid = f"w{index}-s{n}"
+        joined.append(sid)
+        status, result = match_queue.join(sid, f"player{index}-{n}@example.com")
+        if status == MATCHED:
+            matches.append(tuple(player['sid'] for player in result))
+        else:
+            waiting.append(sid)
+        # Disconnect a random earlier socket; it may already have been matched by another worker
+        if waiting and rng.random() < LEAVE_RATIO:
+            candidate = waiting.pop(rng.randrange(len(waiting)))
+            if match_queue.leave(candidate):
+                left.append(candidate)
+    return joined, matches, left, time.perf_counter() - start
+
+
+def check(joined, matches, left, remaining):
+    """Every joined socket must end up in exactly one of: one match, left, or still queued."""
+    matched = Counter(sid for pair in matches for sid in pair)
+    double = [sid for sid, count in matched.items() if count > 1]
+    self_matches = [pair for pair in matches if pair[0] == pair[1]]
+    accounted = set(matched) | set(left) | set(remaining)
+    lost = set(joined) - accounted
+    overlap = (set(matched) & set(left)) | (set(matched) & set(remaining)) | (set(left) & set(remaining))
+    return double, self_matches, lost, overlap
+
+
+def main():
+    client = redis.from_url(REDIS_URL, decode_responses=True)
+
+    print(f"{'workers':>7} | {'joins':>7} | {'joins/s':>9} | {'matches':>7} | {'left':>5} | {'queued':>6} | {'double':>6} | {'lost':>4}")
+    failed = False
+    try:
+        for worker_count in WORKER_COUNTS:
+            client.flushdb()
+            start = time.perf_counter()
+            with Pool(worker_count) as pool:
+                results = pool.map(worker, range(worker_count))
+            seconds = time.perf_counter() - start
+
+            joined = [sid for result in results for sid in result[0]]
+            matches = [pair for result in results for pair in result[1]]
+            left = [sid for result in results for sid in result[2]]
+            remaining = client.zrange(QUEUE_KEY, 0, -1)
+
+            double, self_matches, lost, overlap = check(joined, matches, left, remaining)
+            failed = failed or bool(double or self_matches or lost or overlap) or len(remaining) > 1
+            print(f"{worker_count:>7} | {len(joined):>7} | {len(joined) / seconds:>9.0f} | {len(matches):>7} | "
+                  f"{len(left):>5} | {len(remaining):>6} | {len(double) + len(self_matches):>6} | {len(lost) + len(overlap):>4}")
+    finally:
+        client.flushdb()
+
+    if failed:
+        raise SystemExit("Matchmaking invariant violated: a player was matched twice or lost.")
+
+
+if __name__ == "__main__":
+    main()
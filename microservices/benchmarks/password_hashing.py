@@ -0,0 +1,78 @@
+import hashlib
+import os
+import threading
+import time
+
+from web.passwords import PasswordHasher, PasswordHasherBusy, parse_hash
+
+# --- CONFIGURATION ---
+# Run from the microservices/ directory: python -m benchmarks.password_hashing
+# Pure CPU work, so it needs no MongoDB or Redis.
+COST_FACTORS = [12, 14, 15]
+WORKERS = os.cpu_count() or 2
+CLIENTS = 32
+LOGINS_PER_CLIENT = 20
+# Unbounded (every login queues) vs. the service default (beyond it, logins are answered 503)
+MAX_PENDING = [CLIENTS, 16]
+PASSWORD = "password123"
+
+
+def check_upgrades(hasher):
+    """Fails unless legacy SHA-256 and plaintext rows verify, are rehashed, and the new hash verifies as is."""
+    for label, stored in [("sha256", hashlib.sha256(PASSWORD.encode()).hexdigest()), ("plaintext", PASSWORD)]:
+        matches, new_hash = hasher.verify(stored, PASSWORD)
+        if not matches or parse_hash(new_hash) is None:
+            raise SystemExit(f"A {label} row was not upgraded on login.")
+        if hasher.verify(new_hash, PASSWORD) != (True, None) or hasher.verify(new_hash, "wrong")[0]:
+            raise SystemExit(f"The upgraded {label} hash does not verify.")
+        if hasher.verify(stored, "wrong")[0]:
+            raise SystemExit(f"A {label} row accepted a wrong password.")
+        if stored != PASSWORD and hasher.verify(stored, stored)[0]:
+            raise SystemExit(f"A {label} row accepted its own stored value as the password.")
+
+
+def run_logins(hasher, stored):
+    """CLIENTS threads log in LOGINS_PER_CLIENT times each; returns (served latencies ms, rejected, seconds)."""
+    latencies, rejected = [], [0]
+    lock = threading.Lock()
+
+    def client():
+        for _ in range(LOGINS_PER_CLIENT):
+            start = time.perf_counter()
+            try:
+                hasher.verify(stored, PASSWORD)
+            except PasswordHasherBusy:
+                with lock:
+                    rejected[0] += 1
+                continue
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=client) for _ in range(CLIENTS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies), rejected[0], time.perf_counter() - start
+
+
+def main():
+    print(f"{CLIENTS} concurrent clients, {WORKERS} hashing processes")
+    print(f"{'log2 N':>6} | {'max pending':>11} | {'logins/s':>8} | {'p50 ms':>8} | {'p99 ms':>8} | {'503s':>6}")
+    for log_n in COST_FACTORS:
+        for max_pending in MAX_PENDING:
+            hasher = PasswordHasher(workers=WORKERS, max_pending=max_pending, log_n=log_n)
+            try:
+                check_upgrades(hasher)
+                stored = hasher.hash(PASSWORD)
+                latencies, rejected, seconds = run_logins(hasher, stored)
+            finally:
+                hasher.shutdown()
+            p50 = latencies[len(latencies) // 2] if latencies else 0
+            p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0
+            print(f"{log_n:>6} | {max_pending:>11} | {len(latencies) / seconds:>8.1f} | {p50:>8.1f} | {p99:>8.1f} | {rejected:>6}")
+
+
+if __name__ == "__main__":
+    main()
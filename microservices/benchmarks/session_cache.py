@@ -0,0 +1,131 @@
+import os
+import random
+import time
+import redis
+from flask import Flask, session, jsonify
+from flask_session import Session
+from flask_session.defaults import Defaults
+
+from web.db_utils import CachedRedisSessionInterface, SessionCache
+
+# --- CONFIGURATION ---
+# Run from the microservices/ directory: python -m benchmarks.session_cache
+# A Redis database of its own, flushed at the end, so the benchmark never touches live sessions
+REDIS_URL = os.environ.get("BENCH_REDIS", "redis://localhost:6379/15")
+SERVICES = ["auth", "inventory", "gatcha", "trade", "battle"]
+PLAYERS = 200
+REQUESTS = 5000
+# The locustfile's API mix: inventory checks and gatcha pulls dominate
+SERVICE_WEIGHTS = {"auth": 1, "inventory": 4, "gatcha": 6, "trade": 1, "battle": 1}
+# How long a logout may take to reach the other services' caches before the check fails
+INVALIDATION_TIMEOUT_S = 1.0
+
+
+def build_service(name, client, cached):
+    """A service whose only work is the per-request session lookup every API route does."""
+    app = Flask(name)
+    app.config['SECRET_KEY'] = 'bench'
+    app.config['SESSION_TYPE'] = 'redis'
+    app.config['SESSION_REDIS'] = client
+    Session(app)
+    if cached:
+        plain = app.session_interface
+        app.session_interface = CachedRedisSessionInterface(
+            app, client, cache=SessionCache(),
+            key_prefix=plain.key_prefix, use_signer=plain.use_signer, permanent=plain.permanent,
+            sid_length=plain.sid_length, serialization_format=app.config.get('SESSION_SERIALIZATION_FORMAT', Defaults.SESSION_SERIALIZATION_FORMAT)
+        )
+
+    @app.route('/login/<email>', methods=['POST'])
+    def login(email):
+        session['user_email'] = email
+        return jsonify({"ok": True})
+
+    @app.route('/logout', methods=['POST'])
+    def logout():
+        session.pop('user_email', None)
+        return jsonify({"ok": True})
+
+    @app.route('/api/me')
+    def me():
+        user_email = session.get('user_email')
+        if not user_email:
+            return jsonify({"error": "Unauthorized"}), 401
+        return jsonify({"email": user_email})
+
+    return app
+
+
+def commands_processed(client):
+    return client.info('stats')['total_commands_processed']
+
+
+def run(client, cached, rng):
+    """Logs PLAYERS in through auth, replays the request mix, then checks logout. Returns per-service rows."""
+    client.flushdb()
+    services = {name: build_service(name, client, cached) for name in SERVICES}
+    # Let every invalidation listener subscribe before traffic starts
+    time.sleep(0.2)
+
+    cookies = []
+    for n in range(PLAYERS):
+        auth = services["auth"].test_client()
+        auth.post(f"/login/bench_{n}@example.com")
+        cookies.append(auth.get_cookie('session').value)
+
+    clients = {}
+    for name, app in services.items():
+        for n, cookie in enumerate(cookies):
+            clients[name, n] = app.test_client()
+            clients[name, n].set_cookie('session', cookie)
+
+    names = rng.choices(SERVICES, weights=[SERVICE_WEIGHTS[name] for name in SERVICES], k=REQUESTS)
+    latencies = {name: [] for name in SERVICES}
+    commands = {name: 0 for name in SERVICES}
+    for name in names:
+        before = commands_processed(client)
+        start = time.perf_counter()
+        response = clients[name, rng.randrange(PLAYERS)].get('/api/me')
+        latencies[name].append((time.perf_counter() - start) * 1000)
+        # Minus the INFO call itself
+        commands[name] += commands_processed(client) - before - 1
+        if response.status_code != 200:
+            raise SystemExit(f"{name} rejected a logged-in session.")
+
+    check_logout(clients)
+
+    rows = []
+    for name in SERVICES:
+        samples = sorted(latencies[name])
+        if not samples:
+            continue
+        rows.append((name, len(samples), commands[name] / len(samples),
+                     len(samples) / (sum(samples) / 1000), samples[len(samples) // 2]))
+    return rows
+
+
+def check_logout(clients):
+    """Logs player 0 out through auth and fails unless every service rejects the session within the timeout."""
+    clients["auth", 0].post('/logout')
+    deadline = time.perf_counter() + INVALIDATION_TIMEOUT_S
+    for name in SERVICES:
+        while clients[name, 0].get('/api/me').status_code != 401:
+            if time.perf_counter() > deadline:
+                raise SystemExit(f"{name} still accepts a logged-out session after {INVALIDATION_TIMEOUT_S}s.")
+            time.sleep(0.01)
+
+
+def main():
+    client = redis.from_url(REDIS_URL)
+    print(f"{'sessions':>8} | {'service':>9} | {'requests':>8} | {'redis ops/req':>13} | {'req/s':>8} | {'p50 ms':>7}")
+    try:
+        for label, cached in [("plain", False), ("cached", True)]:
+            for name, count, ops, rate, p50 in run(client, cached, random.Random(21)):
+                print(f"{label:>8} | {name:>9} | {count:>8} | {ops:>13.2f} | {rate:>8.0f} | {p50:>7.3f}")
+        print("\nlogout reached every service's session cache")
+    finally:
+        client.flushdb()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import random
+
+from web.skill_matchmaker import pair_by_level, level_bucket, wait_bin, WAIT_BINS_SECONDS
+
+# --- CONFIGURATION ---
+# Run from the microservices/ directory: python -m benchmarks.skill_matchmaker
+# A virtual-clock simulation of the matching policies alone, so it needs no MongoDB or Redis.
+ARRIVALS_PER_SECOND = [2, 20, 200]
+SIM_SECONDS = 600
+TICK_MS = 1000
+# XP round trips: one find_one_and_update per player per battle, vs. one bulk_write + one read per tick
+FIFO_XP_ROUND_TRIPS_PER_BATTLE = 2
+TICK_XP_ROUND_TRIPS_PER_BATCH = 2
+
+
+def random_level(rng):
+    """Most players are low level, with a long tail, like a live player base."""
+    return min(100, 1 + int(rng.expovariate(1 / 15)))
+
+
+def arrivals(rng, rate):
+    """Yields (join time ms, entry) for a Poisson stream of rate joins per second."""
+    now_ms, n = 0.0, 0
+    while True:
+        now_ms += rng.expovariate(rate) * 1000
+        if now_ms >= SIM_SECONDS * 1000:
+            return
+        yield now_ms, {'sid': f"s{n}", 'name': f"p{n}", 'level': random_level(rng), 'joined_at': now_ms}
+        n += 1
+
+
+def simulate_fifo(stream):
+    """The FIFO queue: every second joiner is matched with the one already waiting. Returns [(a, b, matched at ms)]."""
+    pairs, waiting = [], None
+    for now_ms, entry in stream:
+        if waiting:
+            pairs.append((waiting, entry, now_ms))
+            waiting = None
+        else:
+            waiting = entry
+    return pairs
+
+
+def simulate_ticks(stream):
+    """The tick matchmaker: every TICK_MS the whole waiting pool is paired by level. Returns (pairs, batches resolved)."""
+    pairs, waiting, batches = [], [], 0
+    stream = list(stream)
+    index = 0
+    for tick_ms in range(TICK_MS, SIM_SECONDS * 1000 + 1, TICK_MS):
+        while index < len(stream) and stream[index][0] <= tick_ms:
+            waiting.append(stream[index][1])
+            index += 1
+        matched = pair_by_level(waiting, tick_ms)
+        if matched:
+            batches += 1
+            matched_sids = {entry['sid'] for pair in matched for entry in pair}
+            waiting = [entry for entry in waiting if entry['sid'] not in matched_sids]
+            pairs.extend((a, b, tick_ms) for a, b in matched)
+    return pairs, batches
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0
+
+
+def summarize(pairs):
+    gaps = [abs(a['level'] - b['level']) for a, b, _ in pairs]
+    waits = [(matched_at - entry['joined_at']) / 1000 for a, b, matched_at in pairs for entry in (a, b)]
+    return percentile(gaps, 0.5), percentile(gaps, 0.95), percentile(waits, 0.5), percentile(waits, 0.95)
+
+
+def histograms(pairs):
+    """Per level bucket, how many matched players waited up to each bin (what /api/battle/stats reports)."""
+    table = {}
+    for a, b, matched_at in pairs:
+        for entry in (a, b):
+            bucket = table.setdefault(level_bucket(entry['level']), {})
+            label = wait_bin((matched_at - entry['joined_at']) / 1000)
+            bucket[label] = bucket.get(label, 0) + 1
+    return table
+
+
+def main():
+    print(f"{'joins/s':>7} | {'policy':>6} | {'battles':>7} | {'gap p50':>7} | {'gap p95':>7} | {'wait p50 s':>10} | {'wait p95 s':>10} | {'XP trips/battle':>15}")
+    last_tick_pairs = None
+    for rate in ARRIVALS_PER_SECOND:
+        fifo_pairs = simulate_fifo(arrivals(random.Random(19), rate))
+        tick_pairs, batches = simulate_ticks(arrivals(random.Random(19), rate))
+        for label, pairs, trips in [
+            ("fifo", fifo_pairs, FIFO_XP_ROUND_TRIPS_PER_BATTLE),
+            ("tick", tick_pairs, TICK_XP_ROUND_TRIPS_PER_BATCH * batches / max(1, len(tick_pairs))),
+        ]:
+            gap50, gap95, wait50, wait95 = summarize(pairs)
+            print(f"{rate:>7} | {label:>6} | {len(pairs):>7} | {gap50:>7} | {gap95:>7} | {wait50:>10.2f} | {wait95:>10.2f} | {trips:>15.3f}")
+        last_tick_pairs = tick_pairs
+
+    bins = [str(bound) for bound in WAIT_BINS_SECONDS] + ['+Inf']
+    print(f"\nwait-time histogram per level bucket at {ARRIVALS_PER_SECOND[-1]} joins/s (tick)")
+    print(f"{'levels':>7} | " + " | ".join(f"{'<=' + b:>6}" for b in bins))
+    table = histograms(last_tick_pairs)
+    for bucket in sorted(table, key=lambda label: int(label.split('-')[0])):
+        print(f"{bucket:>7} | " + " | ".join(f"{table[bucket].get(b, 0):>6}" for b in bins))
+
+
+if __name__ == "__main__":
+    main()
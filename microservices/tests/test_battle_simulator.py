@@ -0,0 +1,63 @@
+import random
+
+from web.battle_simulator import MAX_ATTACKS, damage, player_wins, player_wins_batch, simulate_battle_loop
+
+
+def mon(hp, atk, defense):
+    return {'hp': hp, 'atk': atk, 'def': defense}
+
+
+def random_mon(rng):
+    """Stats across (and beyond) the species range, including zero/negative HP and damage-floor cases."""
+    return mon(rng.randint(-5, 400), rng.randint(0, 200), rng.randint(0, 400))
+
+
+def stalemate_mon(rng):
+    """High-HP, high-DEF stats that usually survive all MAX_ATTACKS, exercising the attack cap."""
+    return mon(rng.randint(5, 60), rng.randint(0, 30), rng.randint(40, 400))
+
+
+def random_pairs(count, seed=0):
+    rng = random.Random(seed)
+    pairs = []
+    for n in range(count):
+        make = stalemate_mon if n % 4 == 0 else random_mon
+        pairs.append((make(rng), make(rng)))
+    return pairs
+
+
+def cap_pairs():
+    """Pairs that are knocked out exactly on, just before and just after the MAX_ATTACKS-th attack."""
+    pairs = []
+    for hits in (MAX_ATTACKS // 2 - 1, MAX_ATTACKS // 2, MAX_ATTACKS // 2 + 1):
+        for extra in (0, 1):
+            # Both sides deal 1 damage a hit, so hp is the number of hits needed to KO it
+            pairs.append((mon(hits + extra, 10, 20), mon(hits, 10, 20)))
+            pairs.append((mon(hits, 10, 20), mon(hits + extra, 11, 22)))
+            pairs.append((mon(hits + extra, 11, 22), mon(hits, 10, 20)))
+    return pairs
+
+
+def test_damage_never_below_one():
+    assert damage(10, 100) == 1
+    assert damage(50, 21) == 39
+
+
+def test_player_wins_matches_loop():
+    for player_mon, opponent_mon in random_pairs(2000) + cap_pairs():
+        assert player_wins(player_mon, opponent_mon) == simulate_battle_loop(player_mon, opponent_mon), (player_mon, opponent_mon)
+
+
+def test_both_standing_after_cap_is_a_player_win():
+    # 1 damage a hit and 50 HP each: nobody falls within MAX_ATTACKS, so the first Pokemon wins
+    player_mon, opponent_mon = mon(50, 10, 20), mon(50, 11, 22)
+    assert simulate_battle_loop(player_mon, opponent_mon)
+    assert player_wins(player_mon, opponent_mon)
+
+
+def test_batch_matches_loop():
+    pairs = random_pairs(2000, seed=1) + cap_pairs()
+    columns = [[side[stat] for side, _ in pairs] for stat in ('hp', 'atk', 'def')] + \
+              [[side[stat] for _, side in pairs] for stat in ('hp', 'atk', 'def')]
+    expected = [simulate_battle_loop(p1, p2) for p1, p2 in pairs]
+    assert player_wins_batch(*columns).tolist() == expected
@@ -0,0 +1,73 @@
+import random
+from collections import deque
+
+from web.matchmaking import InProcessMatchQueue, QUEUED, ALREADY_QUEUED, MATCHED
+
+
+def test_join_pairs_the_two_oldest():
+    queue = InProcessMatchQueue()
+    assert queue.join('sid1', 'p1@example.com') == (QUEUED, 1)
+    assert len(queue) == 1
+    assert queue.join('sid2', 'p2@example.com') == (
+        MATCHED, ({'sid': 'sid1', 'name': 'p1@example.com'}, {'sid': 'sid2', 'name': 'p2@example.com'})
+    )
+    assert len(queue) == 0
+
+
+def test_rejoin_reports_position():
+    queue = InProcessMatchQueue()
+    queue.add('sid1', 'p1@example.com')
+    queue.add('sid2', 'p2@example.com')
+    assert queue.add('sid1', 'p1@example.com') is False
+    assert queue.position('sid2') == 2
+    assert queue.join('sid2', 'p2@example.com') == (ALREADY_QUEUED, 2)
+
+
+def test_leave_skips_the_entry():
+    queue = InProcessMatchQueue()
+    queue.join('sid1', 'p1@example.com')
+    assert queue.leave('sid1') is True
+    assert queue.leave('sid1') is False
+    assert queue.position('sid1') is None
+    assert queue.join('sid2', 'p2@example.com') == (QUEUED, 1)
+    assert queue.join('sid3', 'p3@example.com')[1] == (
+        {'sid': 'sid2', 'name': 'p2@example.com'}, {'sid': 'sid3', 'name': 'p3@example.com'}
+    )
+
+
+def test_pop_pair_needs_two_waiting():
+    queue = InProcessMatchQueue()
+    assert queue.pop_pair() is None
+    queue.add('sid1', 'p1@example.com')
+    queue.add('sid2', 'p2@example.com')
+    queue.leave('sid2')
+    assert queue.pop_pair() is None
+    assert len(queue) == 1
+
+
+def test_matches_a_plain_fifo_under_random_joins_and_leaves():
+    """Random add/leave/pop sequences (enough leaves to trigger compaction) agree with a list-backed FIFO."""
+    rng = random.Random(12)
+    queue, reference = InProcessMatchQueue(), deque()
+    for n in range(5000):
+        action = rng.random()
+        if action < 0.5:
+            sid = f"sid{rng.randrange(300)}"
+            assert queue.add(sid, f"{sid}@example.com") == (sid not in reference)
+            if sid not in reference:
+                reference.append(sid)
+        elif action < 0.85:
+            sid = f"sid{rng.randrange(300)}"
+            assert queue.leave(sid) == (sid in reference)
+            if sid in reference:
+                reference.remove(sid)
+        else:
+            pair = queue.pop_pair()
+            if len(reference) < 2:
+                assert pair is None
+            else:
+                assert [entry['sid'] for entry in pair] == [reference.popleft(), reference.popleft()]
+        assert len(queue) == len(reference)
+        # Positions are estimates once players ahead have left, but always within the queue
+        for sid in reference:
+            assert 1 <= queue.position(sid) <= len(reference)
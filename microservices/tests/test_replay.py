@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from web.battle_simulator import (
+    MAX_ATTACKS, REPLAY_FORMAT, REPLAY_VERSION, damage, pack_replay, player_wins, replay_turns,
+    simulate_battle_loop, unpack_replay
+)
+
+
+def random_mon(rng):
+    """Stats across (and beyond) the species range, including zero/negative HP and damage-floor cases."""
+    return {'hp': rng.randint(-5, 400), 'atk': rng.randint(0, 200), 'def': rng.randint(0, 400)}
+
+
+def random_pairs(count, seed=20):
+    rng = random.Random(seed)
+    return [(random_mon(rng), random_mon(rng)) for _ in range(count)]
+
+
+def test_record_round_trips():
+    for player_mon, opponent_mon in random_pairs(2000):
+        record = pack_replay(player_mon, opponent_mon)
+        assert len(record) == REPLAY_FORMAT.size
+        assert unpack_replay(record) == (player_mon, opponent_mon)
+        assert pack_replay(*unpack_replay(record)) == record
+
+
+def test_extra_fields_are_not_stored():
+    player_mon = {'hp': 44, 'atk': 48, 'def': 65, 'name': 'Squirtle', 'species_id': 7}
+    opponent_mon = {'hp': 160, 'atk': 110, 'def': 65, 'name': 'Snorlax', 'species_id': 143}
+    assert unpack_replay(pack_replay(player_mon, opponent_mon)) == (
+        {'hp': 44, 'atk': 48, 'def': 65}, {'hp': 160, 'atk': 110, 'def': 65}
+    )
+
+
+def test_unknown_version_is_rejected():
+    record = REPLAY_FORMAT.pack(REPLAY_VERSION + 1, 1, 1, 1, 1, 1, 1)
+    with pytest.raises(ValueError):
+        unpack_replay(record)
+
+
+def test_turns_match_the_live_engines():
+    for player_mon, opponent_mon in random_pairs(2000, seed=21):
+        turns = replay_turns(*unpack_replay(pack_replay(player_mon, opponent_mon)))
+        assert len(turns) <= MAX_ATTACKS
+        # Outcome as the ledger reports it: player side still standing after the last attack
+        player_won = turns[-1][2] > 0 if turns else player_mon['hp'] > 0
+        assert player_won == simulate_battle_loop(player_mon, opponent_mon) == player_wins(player_mon, opponent_mon)
+
+
+def test_turns_alternate_from_the_faster_hitter():
+    player_mon, opponent_mon = {'hp': 30, 'atk': 20, 'def': 10}, {'hp': 30, 'atk': 25, 'def': 10}
+    turns = replay_turns(player_mon, opponent_mon)
+    assert [side for side, _, _, _ in turns] == [1, 0] * (len(turns) // 2) + [1] * (len(turns) % 2)
+    assert turns[0] == (1, damage(25, 10), 30 - damage(25, 10), 30)
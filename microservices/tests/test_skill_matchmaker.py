@@ -0,0 +1,62 @@
+import random
+
+from web.skill_matchmaker import (
+    MATCH_LEVEL_RANGE, MATCH_MAX_WAIT_SECONDS, MATCH_WIDEN_PER_SECOND, level_tolerance, pair_by_level
+)
+
+NOW_MS = 1_000_000
+
+
+def entry(name, level, waited_seconds=0, sid=None):
+    return {'sid': sid or f"sid-{name}", 'name': name, 'level': level, 'joined_at': NOW_MS - int(waited_seconds * 1000)}
+
+
+def names(pairs):
+    return [(older['name'], newer['name']) for older, newer in pairs]
+
+
+def test_tolerance_widens_with_wait():
+    assert level_tolerance(entry('a', 1), NOW_MS) == MATCH_LEVEL_RANGE
+    assert level_tolerance(entry('a', 1, 3), NOW_MS) == MATCH_LEVEL_RANGE + 3 * MATCH_WIDEN_PER_SECOND
+    assert level_tolerance(entry('a', 1, MATCH_MAX_WAIT_SECONDS), NOW_MS) == float('inf')
+
+
+def test_pairs_neighbours_within_range():
+    entries = [entry('a', 1), entry('b', 40), entry('c', 2), entry('d', 41)]
+    assert sorted(names(pair_by_level(entries, NOW_MS))) == [('a', 'c'), ('b', 'd')]
+
+
+def test_far_apart_fresh_entries_wait():
+    assert pair_by_level([entry('a', 1), entry('b', 1 + MATCH_LEVEL_RANGE + 1)], NOW_MS) == []
+
+
+def test_longer_wait_widens_the_search():
+    gap = MATCH_LEVEL_RANGE + 5
+    waited = 5 / MATCH_WIDEN_PER_SECOND
+    assert names(pair_by_level([entry('a', 1, waited), entry('b', 1 + gap)], NOW_MS)) == [('a', 'b')]
+    assert names(pair_by_level([entry('a', 1, MATCH_MAX_WAIT_SECONDS), entry('b', 99)], NOW_MS)) == [('a', 'b')]
+
+
+def test_pair_is_ordered_by_join_time():
+    pairs = pair_by_level([entry('new', 5, 1), entry('old', 5, 4)], NOW_MS)
+    assert names(pairs) == [('old', 'new')]
+
+
+def test_player_is_never_matched_with_itself_or_twice():
+    entries = [entry('a', 5, sid='a1'), entry('a', 5, sid='a2'), entry('b', 5), entry('c', 5)]
+    # a's two sockets are neighbours but cannot fight each other; once a is matched, c waits for the next tick
+    assert names(pair_by_level(entries, NOW_MS)) == [('a', 'b')]
+
+
+def test_random_pool_pairs_are_valid():
+    rng = random.Random(19)
+    entries = [
+        entry(f"p{n % 400}", rng.randint(1, 60), rng.uniform(0, 40), sid=f"sid{n}") for n in range(500)
+    ]
+    pairs = pair_by_level(entries, NOW_MS)
+    matched = [e['name'] for pair in pairs for e in pair]
+    assert len(matched) == len(set(matched))
+    for older, newer in pairs:
+        assert older['joined_at'] <= newer['joined_at']
+        tolerance = max(level_tolerance(older, NOW_MS), level_tolerance(newer, NOW_MS))
+        assert abs(older['level'] - newer['level']) <= tolerance
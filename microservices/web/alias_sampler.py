@@ -0,0 +1,42 @@
+import random
+
+
+class AliasSampler:
+    """Weighted sampler using Vose's alias method: O(n) to build, O(1) per draw."""
+
+    def __init__(self, items, weights):
+        if not items or len(items) != len(weights):
+            raise ValueError("AliasSampler needs one weight per item and at least one item.")
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError("AliasSampler needs a positive total weight.")
+
+        count = len(items)
+        self.items = list(items)
+        self.prob = [0.0] * count
+        self.alias = [0] * count
+
+        # Scale weights so the average bucket holds exactly 1.0, then pair every under-full
+        # bucket with an over-full one that tops it up
+        scaled = [weight * count / total for weight in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            under, over = small.pop(), large.pop()
+            self.prob[under] = scaled[under]
+            self.alias[under] = over
+            scaled[over] = scaled[over] + scaled[under] - 1.0
+            (small if scaled[over] < 1.0 else large).append(over)
+
+        # Whatever is left is full up to floating-point error
+        for i in large + small:
+            self.prob[i] = 1.0
+
+    def draw(self, rng=random):
+        """Returns one item, chosen with probability proportional to its weight."""
+        i = rng.randrange(len(self.items))
+        return self.items[i] if rng.random() < self.prob[i] else self.items[self.alias[i]]
+
+    def sample(self, k, rng=random):
+        """Returns k independent draws."""
+        return [self.draw(rng) for _ in range(k)]
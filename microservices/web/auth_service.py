@@ -1,4 +1,5 @@
 import os
+import logging
 import redis
 from flask import Flask
 from flask_pymongo import PyMongo
@@ -6,33 +7,26 @@ from flask_cors import CORS
 from flask_session import Session # Import Session
 from flask import Flask, request, render_template, redirect, url_for, flash, jsonify, session
 from datetime import datetime
+from pymongo.errors import PyMongoError
 import os
 import redis
 from flask import request
+from web.db_utils import init_logging, init_sessions, get_current_user_email, issue_auth_token, clear_auth_token, AUTH_MODE_TOKEN
+from web.passwords import PasswordHasher, PasswordHasherBusy
+from web.profile_cache import create_profile_cache
 
 # --- SETUP AND CONFIGURATION ---
 
 app = Flask(__name__)
+# Shared JSON logging, written by a background thread and sampled per route (LOG_LEVEL, LOG_SAMPLE_RATES)
+init_logging(app, 'auth_service')
 
 # --- Configuration ---
 # Load configuration from environment variables defined in docker-compose.yaml
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'default_secret') 
-app.config['SESSION_TYPE'] = os.environ.get('SESSION_TYPE', 'redis')
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax' # Required for modern browsers
 app.config['SESSION_COOKIE_SECURE'] = False # Use True in HTTPS production
 app.config["MONGO_URI"] = os.environ.get("MONGO_URI", "mongodb://localhost:27017/fallback_db")
 
-# Redis Configuration
-SESSION_REDIS_URL = os.environ.get('SESSION_REDIS')
-if app.config['SESSION_TYPE'] == 'redis' and SESSION_REDIS_URL:
-    try:
-        # Initialize the Redis client instance from the connection string
-        app.config['SESSION_REDIS'] = redis.from_url(SESSION_REDIS_URL)
-        print("Redis client initialized for sessions.")
-    except Exception as e:
-        print(f"Error initializing Redis client: {e}")
-        app.config['SESSION_TYPE'] = 'filesystem' # Fallback
-
  # --- Initialize Extensions ---
 # IMPORTANT: Enable CORS for all microservices, allowing credentials (cookies)
 CORS(app, supports_credentials=True)
@@ -40,12 +34,25 @@ CORS(app, supports_credentials=True)
 # Initialize Flask-PyMongo
 mongo = PyMongo(app)
 
-# Initialize Flask-Session
-Session(app) 
+# Initialize Flask-Session through the shared session layer, so logins and logouts here
+# invalidate the session caches of every other service
+init_sessions(app, 'auth_service')
 
 # --- Global ---
 LEVEL_UP_XP = 100
 
+# scrypt runs on a small per-worker process pool; logins and registrations beyond
+# PASSWORD_HASH_MAX_PENDING waiting hashes are answered with 503 instead of queueing. The limit only
+# comes into play when a worker serves requests concurrently (gunicorn -k gthread --threads N > 1)
+password_hasher = PasswordHasher(
+    workers=int(os.environ.get('PASSWORD_HASH_WORKERS', 2)),
+    max_pending=int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 16))
+)
+BUSY_MESSAGE = "The login server is busy, please try again."
+
+# Level/XP/record of every player, written through on registration and by the battle service's XP updates
+profile_cache = create_profile_cache(app.logger)
+
 @app.route('/')
 def index():
     """Serves the main application page."""
@@ -61,6 +68,10 @@ def register():
     password = request.form.get('password')
     confirm_password = request.form.get('confirm_password')
 
+    if not email or not password:
+        flash('Both email and password are required to register.', 'error')
+        return redirect(url_for('index'))
+
     if password != confirm_password:
         flash('Passwords do not match.', 'error')
         return redirect(url_for('index'))
@@ -71,14 +82,16 @@ def register():
         flash('Email already registered. Please log in.', 'error')
         return redirect(url_for('index'))
 
+    try:
+        hashed_password = password_hasher.hash(password)
+    except PasswordHasherBusy:
+        return jsonify({"message": BUSY_MESSAGE}), 503
+
     # Store user data (Create operation)
     try:
-        # In a real app, use generate_password_hash for security:
-        # hashed_password = generate_password_hash(password, method='sha256')
-        
         user_data = {
             "email": email,
-            "password": password, # ⚠️ DANGER: Replace with hashed password in production
+            "password": hashed_password,
             "level": 1,
             "xp": 0,
             "wins": 0,
@@ -88,6 +101,8 @@ def register():
         
         # Insert the new document into the 'players' collection
         mongo.db.players.insert_one(user_data)
+        if profile_cache is not None:
+            profile_cache.write(user_data)
         
         flash(f'Account created for {email}! Please log in.', 'success')
         
@@ -111,14 +126,29 @@ def login():
     user = mongo.db.players.find_one({'email': email})
 
     if user:
-        # Check if the retrieved password matches the submitted password
-        # In a real app, use: if check_password_hash(user['password'], password):
-        if user['password'] == password: # ⚠️ DANGER: Replace with bcrypt check in production
+        # Check the submitted password against the stored hash (legacy SHA-256/plaintext rows included)
+        try:
+            matches, new_hash = password_hasher.verify(user.get('password'), password)
+        except PasswordHasherBusy:
+            return jsonify({"message": BUSY_MESSAGE}), 503
+
+        if matches:
+            if new_hash:
+                # Upgrade a legacy or outdated hash, unless the password changed in the meantime
+                try:
+                    mongo.db.players.update_one({'_id': user['_id'], 'password': user.get('password')}, {'$set': {'password': new_hash}})
+                except PyMongoError as e:
+                    app.logger.error(f"Password rehash failed for {email}: {e}")
             flash(f'Successfully logged in as {email}!', 'success')
-            # Set a session variable to keep the user logged in
-            session['user_email'] = email   
+            response = redirect(url_for('home'))
+            if app.config['AUTH_MODE'] == AUTH_MODE_TOKEN:
+                # A signed token every service verifies locally keeps the user logged in
+                issue_auth_token(response, email, user.get('level', 1))
+            else:
+                # Set a session variable to keep the user logged in
+                session['user_email'] = email   
             # session.pop('email', None) # To log out, remove the session variable
-            return redirect(url_for('home'))
+            return response
         else:
             flash('Invalid email or password.', 'error')
     else:
@@ -129,9 +159,11 @@ def login():
 
 @app.route('/logout', methods=['GET'])
 def logout():
-    """Logs out the current user by clearing the session."""
+    """Logs out the current user by clearing the session and the auth token."""
     session.pop('user_email', None)
-    return redirect(url_for('login'))
+    response = redirect(url_for('login'))
+    clear_auth_token(response)
+    return response
 
 @app.route('/home')
 def home():
@@ -143,25 +175,22 @@ def home():
 @app.route('/api/user/info', methods=['GET'])
 def get_user_info():
     """Returns the current player's level and XP."""
-    # DEBUG: log session contents to help trace authentication issues
-    try:
-        app.logger.info(f"DEBUG session dict: {dict(session)}")
-        print(f"DEBUG session dict: {dict(session)}")
-    except Exception:
-        app.logger.info("DEBUG: could not convert session to dict")
+    user_email = get_current_user_email()
+    # Only built at LOG_LEVEL=DEBUG, so tracing authentication issues costs nothing otherwise
+    if app.logger.isEnabledFor(logging.DEBUG):
+        app.logger.debug(f"session {dict(session)} -> user_email {user_email}")
 
-    user_email = session.get('user_email')
-    app.logger.info(f"DEBUG: session user_email -> {user_email}")
+    def load_user():
+        return mongo.db.players.find_one({'email': user_email}, {'level': 1, 'xp': 1, 'wins': 1, 'losses': 1})
 
-    user = mongo.db.players.find_one({'email': user_email})
+    user = profile_cache.get_or_load(user_email, load_user) if profile_cache is not None and user_email else load_user()
     if not user:
         return jsonify({"message": "User not found."}), 404
     
-    app.logger.info(f"LOGGER User {user.get('email')} requested their info.")
-    print(f"PRINT User {user.get('email')} requested their info.")
+    app.logger.info("User %s requested their info.", user_email)
 
     return jsonify({
-        "email": user.get('email', "email-placeholder"),
+        "email": user_email,
         "level": user.get('level', 1),
         "xp": user.get('xp', 0),
         "xp_to_next_level": LEVEL_UP_XP - user.get('xp', 0),
@@ -0,0 +1,14 @@
+# Battle history queries shared by the battle service and its benchmarks.
+# Kept free of import-time side effects (no app, database or Redis connections).
+
+
+def history_page(db, player_name, before_id=None, limit=20):
+    """Cursor over a player's battles newest first, starting below before_id (a previous page's last _id).
+
+    Seeks straight to the cursor on players_id, so every page costs the same however long the history is.
+    Reads limit + 1 battles, so the caller can tell whether another page exists.
+    """
+    query = {"players": player_name}
+    if before_id is not None:
+        query['_id'] = {'$lt': before_id}
+    return db.battles.find(query).sort('_id', -1).limit(limit + 1)
@@ -0,0 +1,82 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# How many recent resolution latencies the stats percentiles are computed over
+LATENCY_WINDOW = 1000
+
+logger = logging.getLogger(__name__)
+
+
+class BattlePipeline:
+    """Resolves matched pairs on a bounded worker pool instead of inside the Socket.IO handler.
+
+    At most `workers` battles resolve at once and at most `max_pending` (running or waiting) are
+    accepted; submit() refuses anything beyond that, so a burst of matches cannot pile unbounded
+    MongoDB work onto the worker. Under the eventlet worker the pool threads are green threads.
+    """
+
+    def __init__(self, resolve, workers=8, max_pending=256):
+        self._resolve = resolve
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='battle')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.resolved = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def submit(self, *args):
+        """Queues resolve(*args); returns False (and runs nothing) when the pipeline is full."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                return False
+            self._pending += 1
+        self._executor.submit(self._run, time.perf_counter(), args)
+        return True
+
+    def _run(self, submitted_at, args):
+        ok = True
+        try:
+            self._resolve(*args)
+        except Exception as e:
+            ok = False
+            logger.error(f"Battle resolution failed: {e}")
+        finally:
+            # Latency covers the wait for a free worker plus the resolution itself
+            latency_ms = (time.perf_counter() - submitted_at) * 1000
+            with self._lock:
+                self._pending -= 1
+                self._latencies.append(latency_ms)
+                if ok:
+                    self.resolved += 1
+                else:
+                    self.failed += 1
+
+    def stats(self):
+        """Returns queue depth, counters and p50/p95/max resolution latency (ms) over the recent window."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                "pending": self._pending,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "resolved": self.resolved,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
+        if latencies:
+            stats["latency_ms"] = {
+                "p50": latencies[len(latencies) // 2],
+                "p95": latencies[int(len(latencies) * 0.95)],
+                "max": latencies[-1],
+            }
+        return stats
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
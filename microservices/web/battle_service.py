@@ -1,19 +1,45 @@
 import os
-import random
-from math import ceil
 from datetime import datetime
 from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
 from flask import request, jsonify, session
 from flask_socketio import SocketIO, emit, join_room, leave_room
-from web.db_utils import create_app, get_current_user_email
+from web.db_utils import create_app, get_current_user_email, TRADE_BOARD_ROOM
+from web.species_catalog import SpeciesCatalog
+from web.inventory_cache import create_inventory_cache
+from web.battle_pipeline import BattlePipeline
+from web.write_behind import WriteBehindInserter, WriteBehindError, ACK_ON_ENQUEUE
+from web.battle_simulator import player_wins, player_wins_batch, pack_replay, unpack_replay, replay_turns
+from web.leaderboard import create_leaderboard, BOARD_KEYS, BOARD_LEVEL
+from web.profile_cache import create_profile_cache
+from web.battle_history import history_page
+from web.fighters import select_fighter, select_fighters, SELECT_SAMPLE
+from web.progression import award_xp, xp_update_pipeline, XP_PER_WIN, XP_PER_LOSS, PROGRESS_PROJECTION
+from web.matchmaking import RedisMatchQueue, InProcessMatchQueue, MATCHED, ALREADY_QUEUED
+from web.skill_matchmaker import SkillMatchPool, TickMatchmaker
 import redis
 
 # Use a non-standard port 5001 for SocketIO service (as per typical deployment)
 app, mongo = create_app(__name__)
 
+# Species are loaded once per worker and expanded into pokemon at read time
+species_catalog = SpeciesCatalog(mongo.db)
+
+# Shared Redis inventory cache, so repeat battles do not re-read the same rosters
+inventory_cache = create_inventory_cache(app.logger)
+
+# Redis sorted-set leaderboards, updated from every XP award (None without a Redis to keep them in)
+leaderboard = create_leaderboard(app.logger)
+# Written through on every XP update so the auth service's /api/user/info rarely reads MongoDB
+profile_cache = create_profile_cache(app.logger)
+LEADERBOARD_PAGE_SIZE = 20
+MAX_LEADERBOARD_PAGE_SIZE = 100
+
 # --- SocketIO Setup ---
 # Retrieve Redis URL from environment variables via the db_utils shared setup
 REDIS_URL = os.environ.get('SESSION_REDIS', 'redis://localhost:6379/1') 
+SOCKETIO_DEBUG = os.environ.get('SOCKETIO_DEBUG', '0') == '1'
 # Initialize SocketIO with message queue for multiple workers
 socketio = SocketIO(
     app,
@@ -21,15 +47,61 @@ socketio = SocketIO(
     manage_session=False,
     message_queue=REDIS_URL,
     async_mode='eventlet',
-    logger=True,            # Enable python-socketio logging
-    engineio_logger=True    # Enable engineio (handshake/transport) logging
+    # python-socketio / engineio packet logging (every handshake, event and emit) only with SOCKETIO_DEBUG=1
+    logger=SOCKETIO_DEBUG,
+    engineio_logger=SOCKETIO_DEBUG
 )
 
-# --- Global State for Battle Service (Queue) ---
-BATTLE_QUEUE = []
+# --- Matchmaking Queue ---
+# Kept in Redis (not per-process) so players connected to different battle workers can be matched.
+# MATCHMAKING_BACKEND=memory keeps it in-process instead, for a single worker without a shared queue.
+MATCHMAKING_REDIS_URL = os.environ.get('MATCHMAKING_REDIS', REDIS_URL)
+if os.environ.get('MATCHMAKING_BACKEND', 'redis') == 'memory':
+    match_queue = InProcessMatchQueue()
+else:
+    match_queue = RedisMatchQueue.from_url(MATCHMAKING_REDIS_URL)
+    # Keeps this worker's waiting sockets alive; if the worker dies they expire instead of being matched
+    socketio.start_background_task(match_queue.run_heartbeat, socketio.sleep)
+# MATCHMAKING_TICK_MS > 0 switches to tick-based matching: joins only enter a shared Redis pool, and every
+# tick one worker pairs the whole pool by level (widening with wait time) and resolves the batch at once.
+MATCHMAKING_TICK_MS = int(os.environ.get('MATCHMAKING_TICK_MS', 0))
+skill_pool = SkillMatchPool.from_url(MATCHMAKING_REDIS_URL) if MATCHMAKING_TICK_MS > 0 else None
 BATTLES_IN_PROGRESS = {} 
-XP_PER_WIN = 100
-LEVEL_UP_XP = 100
+
+# --- Fighter Selection ---
+# BATTLE_FIGHTER_SELECTION picks 'sample' ($sample server-side) or 'roster' (cached id list); see web/fighters.py
+BATTLE_FIGHTER_SELECTION = os.environ.get('BATTLE_FIGHTER_SELECTION', SELECT_SAMPLE)
+
+# --- Battle History Ledger ---
+# Every resolved battle is appended to 'battles' through a write-behind queue, so resolution never waits
+# on the insert: records are flushed with insert_many every BATTLE_HISTORY_FLUSH_SIZE battles or
+# BATTLE_HISTORY_FLUSH_MS milliseconds. Records still queued are flushed on graceful shutdown.
+battle_ledger = WriteBehindInserter(
+    mongo.db.battles,
+    max_batch=int(os.environ.get('BATTLE_HISTORY_FLUSH_SIZE', 64)),
+    max_delay_ms=int(os.environ.get('BATTLE_HISTORY_FLUSH_MS', 200)),
+    ack_mode=ACK_ON_ENQUEUE
+)
+BATTLE_HISTORY_PAGE_SIZE = 20
+MAX_BATTLE_HISTORY_PAGE_SIZE = 100
+
+def record_battle(player1_name, player2_name, p1_mon, p2_mon, is_p1_winner, xp_gains, level_gains):
+    """Queues one battle record; the players, species, xp_gained and level_gain arrays are aligned by position.
+
+    'replay' holds the stats both fighters had, enough to regenerate every attack on demand.
+    """
+    try:
+        battle_ledger.submit([{
+            "players": [player1_name, player2_name],
+            "species": [p1_mon.get('species_id'), p2_mon.get('species_id')],
+            "winner": player1_name if is_p1_winner else player2_name,
+            "xp_gained": xp_gains,
+            "level_gain": level_gains,
+            "replay": pack_replay(p1_mon, p2_mon),
+            "timestamp": datetime.now()
+        }])
+    except WriteBehindError as e:
+        app.logger.error(f"Could not record battle between {player1_name} and {player2_name}: {e}")
 
 # --- SOCKETIO EVENT HANDLERS ---
 
@@ -37,154 +109,342 @@ LEVEL_UP_XP = 100
 def handle_connect():
     """Logs the client connecting and associates the session ID (sid) with the current user."""
     user_email = get_current_user_email()
-    app.logger.info(f"Client Connected: SID={request.sid}, User={user_email}")
     if user_email:
-        app.logger.info(f"User {user_email} connected with SID={request.sid}")
+        app.logger.info("User %s connected with SID=%s", user_email, request.sid, extra={'route': 'connect'})
     else:
         app.logger.warning(f"Unauthenticated connection with SID={request.sid}")
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Removes player from the queue if they disconnect."""
-    global BATTLE_QUEUE
     player_name = get_current_user_email()
     if player_name:
         # Remove from queue if present
-        BATTLE_QUEUE = [player for player in BATTLE_QUEUE if player['sid'] != request.sid]
-        app.logger.info(f"Client Disconnected: {player_name} removed from queue.")
+        if match_queue.leave(request.sid) or (skill_pool is not None and skill_pool.leave(request.sid)):
+            app.logger.info(f"Client Disconnected: {player_name} removed from queue.")
+
+@socketio.on('join_trade_board')
+def handle_join_trade_board():
+    """Subscribes the client to trade_added / trade_removed deltas published by the trade service."""
+    join_room(TRADE_BOARD_ROOM)
+
+@socketio.on('leave_trade_board')
+def handle_leave_trade_board():
+    """Stops trade board deltas once the client leaves the trade menu."""
+    leave_room(TRADE_BOARD_ROOM)
 
 @socketio.on('join_queue')
 def handle_join_queue():
     """Handles queue entry and immediate matchmaking attempt."""
-    global BATTLE_QUEUE, BATTLES_IN_PROGRESS
     player_name = get_current_user_email()
     player_sid = request.sid
 
+    if skill_pool is not None:
+        # Tick-based matching: just wait in the pool, the next tick pairs it
+        status, position = skill_pool.add(player_sid, player_name)
+        if status != ALREADY_QUEUED:
+            emit('queue_update', {'message': "Searching...", 'position': position}, room=player_sid)
+        return
+
+    # Enter the shared queue and attempt matchmaking in one atomic step
+    status, result = match_queue.join(player_sid, player_name)
+
     # Check if already in queue
-    if any(player['sid'] == player_sid for player in BATTLE_QUEUE):
+    if status == ALREADY_QUEUED:
         return
+
+    if status == MATCHED:
+        # The two oldest players, already popped off the queue; resolve the battle off the handler
+        player1, player2 = result
+        if not battle_pipeline.submit(player1, player2):
+            for player in [player1, player2]:
+                socketio.emit('queue_error', {'message': "The battle server is busy, please try again."}, room=player['sid'])
+    else:
+        # No match found, notify client of position
+        emit('queue_update', {'message': "Searching...", 'position': result}, room=player_sid)
+
+# --- Battle Resolution ---
+def resolve_battle(player1, player2):
+    """Selects both fighters, simulates the battle, awards XP and emits each player's battle_result."""
+    # Select Pokémon, Simulate Battle, Update XP/Level (using existing logic)
+    player1_mon_doc = select_fighter(mongo.db, player1['name'], BATTLE_FIGHTER_SELECTION, inventory_cache)
+    player2_mon_doc = select_fighter(mongo.db, player2['name'], BATTLE_FIGHTER_SELECTION, inventory_cache)
     
-    # Enter queue
-    BATTLE_QUEUE.append({'name': player_name, 'sid': player_sid})
+    if not player1_mon_doc or not player2_mon_doc:
+        # Send error event back to both clients; they have already left the queue
+        for player in [player1, player2]:
+            socketio.emit('queue_error', {'message': "Not enough available Pokemon to battle!"}, room=player['sid'])
+        return
 
-    # Attempt Matchmaking (if at least 2 players are in the queue)
-    if len(BATTLE_QUEUE) >= 2:
-        
-        # Pop the two players off the queue
-        player1 = BATTLE_QUEUE.pop(0) 
-        player2 = BATTLE_QUEUE.pop(0)
-            
-        # --- Match Found & Simulation ---
-        
-        # Select Pokémon, Simulate Battle, Update XP/Level (using existing logic)
-        player1_mon_docs = list(mongo.db.pokemon.find({"player": player1['name'], "locked": False}))
-        player2_mon_docs = list(mongo.db.pokemon.find({"player": player2['name'], "locked": False}))
-        
-        if not player1_mon_docs or not player2_mon_docs:
-             # Send error event back to client
-             emit('queue_error', {'message': "Not enough available Pokemon to battle!"}, room=player1['sid'])
-             return
+    p1_mon = species_catalog.expand(player1_mon_doc)
+    p2_mon = species_catalog.expand(player2_mon_doc)
+    
+    is_p1_winner = simulate_battle(p1_mon, p2_mon)
+    
+    p1_xp, p1_level_up = update_user_xp(player1['name'], is_p1_winner)
+    p2_xp, p2_level_up = update_user_xp(player2['name'], not is_p1_winner)
 
-        p1_mon = random.choice(player1_mon_docs)
-        p2_mon = random.choice(player2_mon_docs)
-        
-        is_p1_winner = simulate_battle(p1_mon, p2_mon)
-        
-        p1_xp, p1_level_up = update_user_xp(player1['name'], is_p1_winner)
-        p2_xp, p2_level_up = update_user_xp(player2['name'], not is_p1_winner)
+    record_battle(player1['name'], player2['name'], p1_mon, p2_mon, is_p1_winner,
+                  [p1_xp, p2_xp], [p1_level_up, p2_level_up])
+    emit_battle_result(player1, player2, p1_mon, p2_mon, is_p1_winner, (p1_xp, p1_level_up), (p2_xp, p2_level_up))
 
-        result_data = {
-            "winner": player1['name'] if is_p1_winner else player2['name']
-        }
-        
-        # --- Create a result object tailored for each player ---
-        
-        for player in [player1, player2]:
-            is_winner = player['name'] == result_data["winner"]
-            
-            # 1. Create the final result payload
-            final_result_payload = {
-                "status": "complete",
-                "message": f"Battle finished! {'WIN!' if is_winner else 'LOSS!'}",
-                "result": {
-                    "player_mon": p1_mon['name'] if player['name'] == player1['name'] else p2_mon['name'],
-                    "opponent_mon": p2_mon['name'] if player['name'] == player1['name'] else p1_mon['name'],
-                    "player_xp_gain": p1_xp if player['name'] == player1['name'] else p2_xp,
-                    "player_level_up": p1_level_up if player['name'] == player1['name'] else p2_level_up,
-                    "result_message": "WIN!" if is_winner else "LOSS!"
-                }
-            }
+def resolve_battle_batch(pairs):
+    """Resolves every pair matched in one tick together.
 
-            # 2. Emit the FULL result data directly to the client
-            socketio.emit('battle_result', final_result_payload, room=player['sid'])
-            app.logger.info(f"Match found! Sent FULL result to {player['name']} (SID: {player['sid']})")
-        
-    else:
-        # No match found, notify client of position
-        position = BATTLE_QUEUE.index({'name': player_name, 'sid': player_sid}) + 1
-        emit('queue_update', {'message': "Searching...", 'position': position}, room=player_sid)
+    One lead query, one vectorised simulation, one XP bulk_write plus one read-back and one ledger
+    submit cover the whole batch, instead of that work once per battle.
+    """
+    fighters = select_fighters(
+        mongo.db, {player['name'] for pair in pairs for player in pair}, BATTLE_FIGHTER_SELECTION, inventory_cache
+    )
 
-# --- Helper Functions ---
-def update_user_xp(user_name, is_winner):
-    """Adds XP to the user and handles leveling up."""
-    user = mongo.db.players.find_one({"email": user_name})
-    if not user:
+    battles = []
+    for player1, player2 in pairs:
+        if fighters.get(player1['name']) and fighters.get(player2['name']):
+            battles.append((player1, player2))
+        else:
+            for player in [player1, player2]:
+                socketio.emit('queue_error', {'message': "Not enough available Pokemon to battle!"}, room=player['sid'])
+    if not battles:
         return
 
-    xp_gained = XP_PER_WIN if is_winner else 10 # Small XP gain for participating
+    mons = {name: species_catalog.expand(doc) for name, doc in fighters.items() if doc}
+    side1 = [mons[player1['name']] for player1, _ in battles]
+    side2 = [mons[player2['name']] for _, player2 in battles]
+    p1_wins = player_wins_batch(*[[mon[stat] for mon in side] for side in (side1, side2) for stat in ('hp', 'atk', 'def')]).tolist()
+
+    awards = update_users_xp([
+        (player['name'], won)
+        for (player1, player2), is_p1_winner in zip(battles, p1_wins)
+        for player, won in [(player1, is_p1_winner), (player2, not is_p1_winner)]
+    ])
+
+    for (player1, player2), p1_mon, p2_mon, is_p1_winner in zip(battles, side1, side2, p1_wins):
+        p1_award, p2_award = awards[player1['name']], awards[player2['name']]
+        record_battle(player1['name'], player2['name'], p1_mon, p2_mon, is_p1_winner,
+                      [p1_award[0], p2_award[0]], [p1_award[1], p2_award[1]])
+        emit_battle_result(player1, player2, p1_mon, p2_mon, is_p1_winner, p1_award, p2_award)
+
+def emit_battle_result(player1, player2, p1_mon, p2_mon, is_p1_winner, p1_award, p2_award):
+    """Sends each player a battle_result from their own side; the awards are (xp_gained, levels_gained)."""
+    result_data = {
+        "winner": player1['name'] if is_p1_winner else player2['name']
+    }
+    p1_xp, p1_level_up = p1_award
+    p2_xp, p2_level_up = p2_award
     
-    new_xp = user['xp'] + xp_gained
-    new_level = user['level']
-    level_increase = 0
+    # --- Create a result object tailored for each player ---
     
-    # Simple Level Up Logic
-    while new_xp >= LEVEL_UP_XP:
-        new_xp -= LEVEL_UP_XP
-        new_level += 1
-        level_increase += 1
-
-    update_fields = {
-        '$set': {
-            'level': new_level, 
-            'xp': new_xp,
-        },
-        '$inc': {
-            'wins': 1 if is_winner else 0,
-            'losses': 1 if not is_winner else 0
+    for player in [player1, player2]:
+        is_winner = player['name'] == result_data["winner"]
+        
+        # 1. Create the final result payload
+        final_result_payload = {
+            "status": "complete",
+            "message": f"Battle finished! {'WIN!' if is_winner else 'LOSS!'}",
+            "result": {
+                "player_mon": p1_mon['name'] if player['name'] == player1['name'] else p2_mon['name'],
+                "opponent_mon": p2_mon['name'] if player['name'] == player1['name'] else p1_mon['name'],
+                "player_xp_gain": p1_xp if player['name'] == player1['name'] else p2_xp,
+                "player_level_up": p1_level_up if player['name'] == player1['name'] else p2_level_up,
+                "result_message": "WIN!" if is_winner else "LOSS!"
+            }
         }
+
+        # 2. Emit the FULL result data directly to the client
+        socketio.emit('battle_result', final_result_payload, room=player['sid'])
+        app.logger.info("Match found! Sent FULL result to %s (SID: %s)", player['name'], player['sid'], extra={'route': 'battle_result'})
+
+# Matched pairs are resolved on a bounded pool so MongoDB work and the simulation never run in the handler
+# (with tick-based matching each pipeline entry is a whole tick's batch)
+battle_pipeline = BattlePipeline(
+    resolve_battle_batch if skill_pool is not None else resolve_battle,
+    workers=int(os.environ.get('BATTLE_WORKERS', 8)),
+    max_pending=int(os.environ.get('BATTLE_MAX_PENDING', 256))
+)
+
+def load_player_levels(player_names):
+    """Levels of every waiting player in one read, for the tick matchmaker."""
+    players = mongo.db.players.find({'email': {'$in': list(player_names)}}, {'email': 1, 'level': 1})
+    return {player['email']: player.get('level', 1) for player in players}
+
+def submit_match_batch(pairs):
+    """Hands one tick's matched pairs to the battle pipeline, telling everyone in it if the server is busy."""
+    if not battle_pipeline.submit(pairs):
+        for player in [player for pair in pairs for player in pair]:
+            socketio.emit('queue_error', {'message': "The battle server is busy, please try again."}, room=player['sid'])
+
+if skill_pool is not None:
+    matchmaker = TickMatchmaker(skill_pool, load_player_levels, submit_match_batch, MATCHMAKING_TICK_MS)
+    socketio.start_background_task(matchmaker.run, socketio.sleep)
+
+@app.route('/api/battle/stats', methods=['GET'])
+def get_battle_stats():
+    """Reports matchmaking queue depth plus battle pipeline depth, counters and resolution latency.
+
+    With tick-based matching it also reports the tick counters and per-level-bucket wait-time histograms.
+    """
+    if skill_pool is not None:
+        return jsonify({"queued_players": len(skill_pool), "matchmaker": skill_pool.stats(), "pipeline": battle_pipeline.stats()})
+    return jsonify({"queued_players": len(match_queue), "pipeline": battle_pipeline.stats()})
+
+def species_name(species_id):
+    """Name of a recorded species, or None for fighters stored before the species catalog."""
+    species = species_catalog.get(species_id) if species_id is not None else None
+    return species['name'] if species else None
+
+def serialize_battle(battle, player_name):
+    """Describes a battle record from one player's side."""
+    me = battle['players'].index(player_name)
+    opponent = 1 - me
+    return {
+        "id": str(battle['_id']),
+        "opponent": battle['players'][opponent],
+        "player_mon": species_name(battle['species'][me]),
+        "opponent_mon": species_name(battle['species'][opponent]),
+        "won": battle['winner'] == player_name,
+        "xp_gained": battle['xp_gained'][me],
+        "level_gain": battle['level_gain'][me],
+        "timestamp": battle['timestamp'].isoformat()
     }
-    mongo.db.players.update_one({"email": user_name}, update_fields)
-    
-    return xp_gained, level_increase
 
-def simulate_battle(player_mon, opponent_mon):
-    """Simulates the battle based on ATK/DEF, returns true if player_mon wins."""
-    # Simplified simulation: higher HP Pokémon wins if ATK/DEF difference is small.
-    # We still use the existing logic for damage calculation.
-    
-    p1 = {"doc": player_mon, "hp": player_mon['hp']}
-    p2 = {"doc": opponent_mon, "hp": opponent_mon['hp']}
-    
-    p1_atk = p1['doc']['atk']
-    p2_atk = p2['doc']['atk']
+@app.route('/api/battle/history', methods=['GET'])
+def get_battle_history():
+    """Returns one page of the current user's battles, newest first.
 
-    # Determine who attacks first (higher ATK stat)
-    attacker = p1 if p1_atk >= p2_atk else p2
-    defender = p2 if p1_atk >= p2_atk else p1
-    
-    # Battle loop (max 10 rounds to prevent infinite loop just in case)
-    for _ in range(20):
-        if p1['hp'] <= 0 or p2['hp'] <= 0:
-            break
-            
-        defender_def = defender['doc']['def']
-        damage = max(1, attacker['doc']['atk'] - ceil(defender_def / 2))
-        defender['hp'] -= damage
-        
-        # Swap roles
-        attacker, defender = defender, attacker
+    Query parameters:
+        cursor: the 'next_cursor' of the previous page (omit for the first page)
+        limit:  page size, capped at MAX_BATTLE_HISTORY_PAGE_SIZE
+    """
+    user_email = get_current_user_email()
+
+    before_id = None
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            before_id = ObjectId(cursor)
+        except InvalidId:
+            return jsonify({"message": "Invalid battle history cursor."}), 400
+
+    limit = request.args.get('limit', BATTLE_HISTORY_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_BATTLE_HISTORY_PAGE_SIZE))
+
+    page = list(history_page(mongo.db, user_email, before_id, limit))
+    next_cursor = str(page[limit - 1]['_id']) if len(page) > limit else None
+
+    return jsonify({
+        "battles": [serialize_battle(battle, user_email) for battle in page[:limit]],
+        "next_cursor": next_cursor
+    })
+
+@app.route('/api/leaderboard', methods=['GET'])
+def get_leaderboard():
+    """Returns one page of a leaderboard plus the current user's own rank on it.
+
+    Query parameters:
+        board:  'level' (default, ties broken by xp) or 'wins'
+        offset: 0-based position of the first entry (the 'next_offset' of the previous page)
+        limit:  page size, capped at MAX_LEADERBOARD_PAGE_SIZE
+    """
+    if leaderboard is None:
+        return jsonify({"message": "Leaderboard is unavailable."}), 503
+
+    board = request.args.get('board', BOARD_LEVEL)
+    if board not in BOARD_KEYS:
+        return jsonify({"message": f"board must be one of: {', '.join(BOARD_KEYS)}."}), 400
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = request.args.get('limit', LEADERBOARD_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_LEADERBOARD_PAGE_SIZE))
+
+    user_email = get_current_user_email()
+    try:
+        # Fetch one extra entry to know whether another page exists
+        entries = leaderboard.page(board, offset, limit + 1)
+        # Anonymous callers still get the page, just without a rank of their own
+        me = leaderboard.rank(board, user_email) if user_email else None
+    except redis.RedisError as e:
+        app.logger.error(f"Leaderboard read failed: {e}")
+        return jsonify({"message": "Leaderboard is unavailable."}), 503
+    next_offset = offset + limit if len(entries) > limit else None
+
+    return jsonify({
+        "board": board,
+        "entries": entries[:limit],
+        "next_offset": next_offset,
+        "me": me
+    })
+
+@app.route('/api/battle/<battle_id>/replay', methods=['GET'])
+def get_battle_replay(battle_id):
+    """Regenerates every attack of one of the current user's battles from its stored stat snapshot."""
+    try:
+        battle_obj_id = ObjectId(battle_id)
+    except InvalidId:
+        return jsonify({"message": "Invalid battle ID."}), 400
+
+    battle = mongo.db.battles.find_one({'_id': battle_obj_id, 'players': get_current_user_email()})
+    if not battle or not battle.get('replay'):
+        return jsonify({"message": "No replay found for this battle."}), 404
+
+    fighters = unpack_replay(battle['replay'])
+    turns = replay_turns(*fighters)
+    return jsonify({
+        "id": battle_id,
+        "players": battle['players'],
+        "fighters": [
+            {**stats, "name": species_name(species_id)}
+            for stats, species_id in zip(fighters, battle['species'])
+        ],
+        "winner": battle['winner'],
+        "turns": [
+            {"attacker": battle['players'][side], "damage": hit, "hp": [hp0, hp1]}
+            for side, hit, hp0, hp1 in turns
+        ]
+    })
+
+# --- Helper Functions ---
+def update_user_xp(user_name, is_winner):
+    """Adds XP to the user and handles leveling up in one atomic round trip; returns (xp_gained, levels_gained)."""
+    user = award_xp(mongo.db.players, user_name, is_winner)
+    if user is None:
+        # No players document (e.g. the account was deleted mid-queue): nothing awarded, but the battle still resolves
+        return 0, 0
+
+    # The AFTER document already holds the new level, xp and record, so the boards and profile need no extra read
+    if leaderboard is not None:
+        leaderboard.record(user)
+    if profile_cache is not None:
+        profile_cache.write(user)
+
+    return (XP_PER_WIN if is_winner else XP_PER_LOSS), user['last_level_gain']
+
+def update_users_xp(awards):
+    """Batch update_user_xp for (player, is_winner) pairs: one bulk_write, then one read of the results.
+
+    Returns {player: (xp_gained, levels_gained)}. Each player may appear only once per batch.
+    """
+    xp_by_player = {name: XP_PER_WIN if is_winner else XP_PER_LOSS for name, is_winner in awards}
+    mongo.db.players.bulk_write([
+        UpdateOne({"email": name}, xp_update_pipeline(xp_by_player[name], is_winner))
+        for name, is_winner in awards
+    ], ordered=False)
+
+    users = list(mongo.db.players.find({"email": {'$in': list(xp_by_player)}}, PROGRESS_PROJECTION))
+    if leaderboard is not None:
+        leaderboard.record_many(users)
+    if profile_cache is not None:
+        profile_cache.write_many(users)
+
+    # Like update_user_xp, a player without a players document is awarded nothing
+    levels = {user['email']: user.get('last_level_gain', 0) for user in users}
+    return {name: (xp_gained, levels[name]) if name in levels else (0, 0) for name, xp_gained in xp_by_player.items()}
+
+def simulate_battle(player_mon, opponent_mon):
+    """Simulates the battle based on ATK/DEF, returns true if player_mon wins.
 
-    return p1['hp'] > 0 # Returns True if player's mon (p1) wins
+    Uses the closed-form engine, which gives the same result as the 20-attack loop without looping.
+    """
+    return player_wins(player_mon, opponent_mon)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,115 @@
+import struct
+from math import ceil
+
+import numpy as np
+
+# The battle loop runs at most this many attacks (not full rounds); if both Pokemon are
+# still standing afterwards, the first Pokemon wins because its HP is still above zero
+MAX_ATTACKS = 20
+
+# --- Replays ---
+# The simulation has no randomness, so a battle is fully determined by both fighters' stats: a replay
+# is a format version byte plus (hp, atk, def) of each side as little-endian int32s, 25 bytes in all.
+REPLAY_VERSION = 1
+REPLAY_FORMAT = struct.Struct('<B6i')
+REPLAY_STATS = ('hp', 'atk', 'def')
+
+
+def damage(atk, defense):
+    """Damage of one hit: constant for a given attacker/defender pair."""
+    return max(1, atk - ceil(defense / 2))
+
+
+def simulate_battle_loop(player_mon, opponent_mon):
+    """Reference attack-by-attack simulation; returns True if player_mon wins.
+
+    The faster hitter (higher ATK, player_mon on a tie) attacks first, then the two alternate.
+    """
+    p1 = {"doc": player_mon, "hp": player_mon['hp']}
+    p2 = {"doc": opponent_mon, "hp": opponent_mon['hp']}
+
+    attacker = p1 if player_mon['atk'] >= opponent_mon['atk'] else p2
+    defender = p2 if player_mon['atk'] >= opponent_mon['atk'] else p1
+
+    for _ in range(MAX_ATTACKS):
+        if p1['hp'] <= 0 or p2['hp'] <= 0:
+            break
+        defender['hp'] -= damage(attacker['doc']['atk'], defender['doc']['def'])
+        attacker, defender = defender, attacker
+
+    return p1['hp'] > 0
+
+
+def player_wins(player_mon, opponent_mon):
+    """Closed-form equivalent of simulate_battle_loop: compares hits-to-KO instead of looping.
+
+    The first attacker lands its k-th hit on attack 2k-1 and the second on attack 2k, so whoever
+    needs fewer attacks to KO the other wins, provided that happens within MAX_ATTACKS.
+    """
+    hp1, hp2 = player_mon['hp'], opponent_mon['hp']
+    if hp1 <= 0:
+        return False
+    if hp2 <= 0:
+        return True
+
+    # Attacks needed for each side to knock the other out
+    ko_by_p1 = -(-hp2 // damage(player_mon['atk'], opponent_mon['def']))
+    ko_by_p2 = -(-hp1 // damage(opponent_mon['atk'], player_mon['def']))
+
+    if player_mon['atk'] >= opponent_mon['atk']:
+        p1_falls_at = 2 * ko_by_p2
+        p2_falls_at = 2 * ko_by_p1 - 1
+    else:
+        p1_falls_at = 2 * ko_by_p2 - 1
+        p2_falls_at = 2 * ko_by_p1
+    return not (p1_falls_at <= MAX_ATTACKS and p1_falls_at < p2_falls_at)
+
+
+def player_wins_batch(hp1, atk1, def1, hp2, atk2, def2):
+    """Vectorised player_wins over arrays of stat pairs; returns a boolean array (True where side 1 wins)."""
+    hp1, atk1, def1, hp2, atk2, def2 = (np.asarray(a, dtype=np.int64) for a in (hp1, atk1, def1, hp2, atk2, def2))
+
+    # ceil(def / 2) for integers, then the same max(1, ...) floor as damage()
+    damage1 = np.maximum(1, atk1 - (def2 + 1) // 2)
+    damage2 = np.maximum(1, atk2 - (def1 + 1) // 2)
+    ko_by_1 = -(-hp2 // damage1)
+    ko_by_2 = -(-hp1 // damage2)
+
+    first = atk1 >= atk2
+    falls1_at = np.where(first, 2 * ko_by_2, 2 * ko_by_2 - 1)
+    falls2_at = np.where(first, 2 * ko_by_1 - 1, 2 * ko_by_1)
+    wins = ~((falls1_at <= MAX_ATTACKS) & (falls1_at < falls2_at))
+
+    # A Pokemon that starts at or below zero HP has already lost (side 1 is checked first)
+    return np.where(hp1 <= 0, False, np.where(hp2 <= 0, True, wins))
+
+
+def pack_replay(player_mon, opponent_mon):
+    """Packs the stat snapshot both sides fought with into a REPLAY_FORMAT record."""
+    return REPLAY_FORMAT.pack(REPLAY_VERSION, *(mon[stat] for mon in (player_mon, opponent_mon) for stat in REPLAY_STATS))
+
+
+def unpack_replay(data):
+    """Returns the (player_mon, opponent_mon) stat dicts stored in a replay record."""
+    version, *stats = REPLAY_FORMAT.unpack(data)
+    if version != REPLAY_VERSION:
+        raise ValueError(f"Unsupported replay version: {version}")
+    return dict(zip(REPLAY_STATS, stats[:3])), dict(zip(REPLAY_STATS, stats[3:]))
+
+
+def replay_turns(player_mon, opponent_mon):
+    """Regenerates simulate_battle_loop attack by attack; returns [(attacker side 0/1, damage, hp0, hp1), ...]."""
+    hp = [player_mon['hp'], opponent_mon['hp']]
+    mons = (player_mon, opponent_mon)
+    attacker = 0 if player_mon['atk'] >= opponent_mon['atk'] else 1
+
+    turns = []
+    for _ in range(MAX_ATTACKS):
+        if hp[0] <= 0 or hp[1] <= 0:
+            break
+        defender = 1 - attacker
+        hit = damage(mons[attacker]['atk'], mons[defender]['def'])
+        hp[defender] -= hit
+        turns.append((attacker, hit, hp[0], hp[1]))
+        attacker = defender
+    return turns
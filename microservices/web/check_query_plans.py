@@ -0,0 +1,92 @@
+import os
+import sys
+from datetime import datetime
+from bson.objectid import ObjectId
+from pymongo import MongoClient
+
+from web.db_utils import ensure_indexes
+
+# --- CONFIGURATION ---
+# Run from the microservices/ directory: python -m web.check_query_plans
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/fallback_db")
+
+# Placeholder values; only the shape of each query matters to the planner
+SAMPLE_EMAIL = "plan_check@example.com"
+SAMPLE_ID = ObjectId()
+SAMPLE_TIME = datetime(2024, 1, 1)
+
+# --- Query Shapes ---
+# (description, collection, filter, sort) for every query the services issue
+QUERY_SHAPES = [
+    ("inventory page", 'pokemon', {'player': SAMPLE_EMAIL}, [('_id', 1)]),
+    ("inventory next page", 'pokemon', {'player': SAMPLE_EMAIL, '_id': {'$gt': SAMPLE_ID}}, [('_id', 1)]),
+    ("unlocked inventory page", 'pokemon', {'player': SAMPLE_EMAIL, 'locked': False}, [('_id', 1)]),
+    ("battle roster", 'pokemon', {'player': SAMPLE_EMAIL, 'locked': False}, None),
+    ("battle lead", 'pokemon', {'player': SAMPLE_EMAIL, 'locked': False, 'lead': True}, None),
+    ("battle batch leads", 'pokemon', {'player': {'$in': [SAMPLE_EMAIL]}, 'locked': False, 'lead': True}, None),
+    ("battle fighter", 'pokemon', {'player': SAMPLE_EMAIL, 'locked': False, '_id': SAMPLE_ID}, None),
+    ("clear other leads", 'pokemon', {'player': SAMPLE_EMAIL, 'lead': True, '_id': {'$ne': SAMPLE_ID}}, None),
+    ("trade lock", 'pokemon', {'_id': SAMPLE_ID, 'player': SAMPLE_EMAIL, 'locked': False}, None),
+    ("offered pokemon lookup", 'pokemon', {'_id': {'$in': [SAMPLE_ID]}}, None),
+    ("release", 'pokemon', {'_id': {'$in': [SAMPLE_ID]}, 'player': SAMPLE_EMAIL}, None),
+    ("trade board page", 'trade', {'status': 'pending'}, [('timestamp', 1), ('_id', 1)]),
+    ("trade board next page", 'trade', {
+        'status': 'pending',
+        '$or': [
+            {'timestamp': {'$gt': SAMPLE_TIME}},
+            {'timestamp': SAMPLE_TIME, '_id': {'$gt': SAMPLE_ID}}
+        ]
+    }, [('timestamp', 1), ('_id', 1)]),
+    ("trade claim", 'trade', {'_id': SAMPLE_ID, 'status': 'pending', 'looking_for_count': 1}, None),
+    ("player lookup", 'players', {'email': SAMPLE_EMAIL}, None),
+    ("waiting player levels", 'players', {'email': {'$in': [SAMPLE_EMAIL]}}, None),
+    ("battle history page", 'battles', {'players': SAMPLE_EMAIL}, [('_id', -1)]),
+    ("battle history next page", 'battles', {'players': SAMPLE_EMAIL, '_id': {'$lt': SAMPLE_ID}}, [('_id', -1)]),
+]
+
+
+def find_stages(plan):
+    """Yields every 'stage' name found anywhere in an explain() plan tree."""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from find_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from find_stages(value)
+
+
+def check_query_plans(db):
+    """Explains every query shape and returns the descriptions of those that scan a whole collection."""
+    collscans = []
+    for description, collection, query, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning_plan = cursor.explain()['queryPlanner']['winningPlan']
+        stages = set(find_stages(winning_plan))
+        status = "COLLSCAN" if 'COLLSCAN' in stages else "ok"
+        print(f"[{status:>8}] {description:<24} {collection}: {', '.join(sorted(stages))}")
+        if 'COLLSCAN' in stages:
+            collscans.append(description)
+    return collscans
+
+
+def main():
+    client = MongoClient(MONGO_URI)
+    db = client.get_default_database()
+
+    # Verify against the same indexes the services create at startup
+    ensure_indexes(db)
+    collscans = check_query_plans(db)
+    client.close()
+
+    if collscans:
+        print(f"\n{len(collscans)} query shape(s) fall back to a collection scan: {', '.join(collscans)}")
+        sys.exit(1)
+    print(f"\nAll {len(QUERY_SHAPES)} query shapes are index-backed.")
+
+
+if __name__ == "__main__":
+    main()
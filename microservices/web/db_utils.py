@@ -1,23 +1,263 @@
 import os
-from flask import Flask, session
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from collections import OrderedDict
+from flask import Flask, session, request, g, current_app, has_request_context
+from flask.logging import default_handler
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
 from flask_pymongo import PyMongo
 from flask_cors import CORS
 from flask_session import Session 
+from flask_session.defaults import Defaults
+from flask_session.redis import RedisSessionInterface
 import redis
 import random
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError
 
-# --- Initialization Function ---
-def create_app(service_name):
-    """Initializes a Flask application with shared configuration (CORS, Redis, Mongo)."""
-    app = Flask(service_name)
-    
-    # Load configuration from environment variables (defined in docker-compose.yaml)
+# --- Index Definitions ---
+# (collection, keys, options) for every index the hot queries rely on.
+# The trailing _id lets the same index serve the keyset-paginated (sorted by _id) inventory pages.
+INDEXES = [
+    ('pokemon', [('player', ASCENDING), ('locked', ASCENDING), ('_id', ASCENDING)], {'name': 'player_locked_id'}),
+    ('pokemon', [('player', ASCENDING), ('_id', ASCENDING)], {'name': 'player_id'}),
+    # Only lead Pokemon are indexed, so looking up a player's lead stays tiny however large the inventory
+    ('pokemon', [('player', ASCENDING)], {'name': 'player_lead', 'partialFilterExpression': {'lead': True}}),
+    ('trade', [('status', ASCENDING), ('timestamp', ASCENDING), ('_id', ASCENDING)], {'name': 'status_timestamp_id'}),
+    ('players', [('email', ASCENDING)], {'name': 'email_unique', 'unique': True}),
+    # Multikey on both players, newest first, for keyset-paginated battle history
+    ('battles', [('players', ASCENDING), ('_id', DESCENDING)], {'name': 'players_id'}),
+]
+
+def ensure_indexes(db):
+    """Creates every index in INDEXES; a no-op for indexes that already exist."""
+    for collection, keys, options in INDEXES:
+        db[collection].create_index(keys, **options)
+
+# --- Socket.IO Rooms ---
+# Clients viewing the trade board join this room on the battle service's Socket.IO server;
+# the trade service publishes trade_added / trade_removed deltas to it through the Redis message queue.
+TRADE_BOARD_ROOM = 'trade_board'
+
+# --- Session Layer ---
+# Every request used to GET (and, with SESSION_REFRESH_EACH_REQUEST, SET again) its session in Redis just so
+# get_current_user_email() could read one key. Each worker now keeps decoded sessions in a small LRU for
+# SESSION_CACHE_TTL seconds. Any worker that changes or deletes a session (login, logout) publishes its id
+# on SESSION_INVALIDATE_CHANNEL, and every worker drops it. Unchanged sessions are re-saved (to slide their
+# expiry) at most once per SESSION_REFRESH_SECONDS per worker instead of on every request.
+# SESSION_CACHE=0 goes back to plain Flask-Session.
+SESSION_INVALIDATE_CHANNEL = "session:invalidate"
+SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE', 10000))
+SESSION_CACHE_TTL = float(os.environ.get('SESSION_CACHE_TTL', 30))
+SESSION_REFRESH_SECONDS = float(os.environ.get('SESSION_REFRESH_SECONDS', 3600))
+
+logger = logging.getLogger(__name__)
+
+
+class SessionCache:
+    """Thread-safe LRU of store id -> [session data, loaded at, last saved at], with a TTL on the data.
+
+    generation is bumped by every invalidation, so a load that raced with one is not cached.
+    """
+
+    def __init__(self, max_size=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, store_id):
+        """Returns a copy of the cached session data, or None if it is missing or older than ttl."""
+        with self._lock:
+            entry = self._entries.get(store_id)
+            if entry is None or entry[0] is None or time.monotonic() - entry[1] > self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(store_id)
+            self.hits += 1
+            return dict(entry[0])
+
+    def put(self, store_id, data, generation):
+        """Caches freshly loaded data unless an invalidation arrived since the load started."""
+        with self._lock:
+            if generation != self.generation:
+                return
+            now = time.monotonic()
+            entry = self._entries.get(store_id)
+            # Keep the last-saved time across reloads, so the refresh interval is not restarted
+            self._entries[store_id] = [dict(data), now, entry[2] if entry else now]
+            self._entries.move_to_end(store_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def refresh_due(self, store_id, interval):
+        """True (and marks it saved now) if this worker has not saved the session for interval seconds."""
+        with self._lock:
+            entry = self._entries.get(store_id)
+            now = time.monotonic()
+            if entry is not None and now - entry[2] < interval:
+                return False
+            if entry is not None:
+                entry[2] = now
+            return True
+
+    def evict(self, store_id):
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(store_id, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+
+class CachedRedisSessionInterface(RedisSessionInterface):
+    """Flask-Session's Redis sessions behind a per-worker SessionCache, with pub/sub invalidation and write avoidance."""
+
+    def __init__(self, app, client, cache=None, refresh_seconds=SESSION_REFRESH_SECONDS, **kwargs):
+        super().__init__(app, client, **kwargs)
+        self.cache = cache or SessionCache()
+        self.refresh_seconds = refresh_seconds
+        self.skipped_writes = 0
+        self._listener = threading.Thread(target=self._listen, name='session-invalidate', daemon=True)
+        self._listener.start()
+
+    def _retrieve_session_data(self, store_id):
+        data = self.cache.get(store_id)
+        if data is not None:
+            return data
+        generation = self.cache.generation
+        data = super()._retrieve_session_data(store_id)
+        if data is not None:
+            self.cache.put(store_id, data, generation)
+        return data
+
+    def should_set_storage(self, app, session):
+        """Only writes changed sessions, plus an expiry refresh at most once per refresh_seconds."""
+        if session.modified:
+            return True
+        if app.config['SESSION_REFRESH_EACH_REQUEST'] and \
+                self.cache.refresh_due(self._get_store_id(session.sid), self.refresh_seconds):
+            return True
+        self.skipped_writes += 1
+        return False
+
+    def save_session(self, app, session, response):
+        changed = session.modified
+        super().save_session(app, session, response)
+        if changed:
+            self.invalidate(self._get_store_id(session.sid))
+
+    def invalidate(self, store_id):
+        """Drops a session here and, through Redis pub/sub, on every other worker."""
+        self.cache.evict(store_id)
+        try:
+            self.client.publish(SESSION_INVALIDATE_CHANNEL, store_id)
+        except redis.RedisError as e:
+            logger.error(f"Session invalidation publish failed for {store_id}: {e}")
+
+    def stats(self):
+        return {"hits": self.cache.hits, "misses": self.cache.misses, "skipped_writes": self.skipped_writes}
+
+    def _listen(self):
+        """Evicts every session id published on the channel; clears everything whenever the subscription drops."""
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(SESSION_INVALIDATE_CHANNEL)
+                # Anything published while unsubscribed was missed
+                self.cache.clear()
+                for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        store_id = message['data']
+                        self.cache.evict(store_id.decode() if isinstance(store_id, bytes) else store_id)
+            except redis.RedisError as e:
+                logger.warning(f"Session invalidation listener lost its subscription, retrying: {e}")
+                self.cache.clear()
+                time.sleep(1)
+
+
+# --- Auth Tokens ---
+# AUTH_MODE=token replaces the shared Redis session with a short-lived token signed with SECRET_KEY and
+# carrying the player's email (and level at issue time). Every service verifies it locally, so looking up
+# the caller costs no network call and keeps working while Redis is down. The auth service sets it as the
+# AUTH_TOKEN_COOKIE cookie; service-to-service callers may send it as "Authorization: Bearer <token>".
+# Tokens past half of AUTH_TOKEN_TTL are re-issued on the way out, so active players stay logged in.
+# A logout only deletes the cookie: a copied token stays valid until it expires.
+# AUTH_MODE=session (default) keeps Flask-Session.
+AUTH_MODE_SESSION = 'session'
+AUTH_MODE_TOKEN = 'token'
+AUTH_TOKEN_COOKIE = 'auth_token'
+AUTH_TOKEN_SALT = 'auth-token'
+AUTH_TOKEN_TTL = int(os.environ.get('AUTH_TOKEN_TTL', 900))
+
+
+def _token_serializer():
+    return URLSafeTimedSerializer(current_app.secret_key, salt=AUTH_TOKEN_SALT)
+
+
+def issue_auth_token(response, email, level=None):
+    """Signs a token for the player and sets it as the auth cookie on response; returns the token."""
+    claims = {'email': email}
+    if level is not None:
+        claims['level'] = level
+    token = _token_serializer().dumps(claims)
+    response.set_cookie(
+        AUTH_TOKEN_COOKIE, token, max_age=AUTH_TOKEN_TTL, httponly=True,
+        samesite=current_app.config.get('SESSION_COOKIE_SAMESITE'), secure=current_app.config.get('SESSION_COOKIE_SECURE', False)
+    )
+    return token
+
+
+def clear_auth_token(response):
+    response.delete_cookie(AUTH_TOKEN_COOKIE)
+
+
+def get_auth_claims():
+    """Returns the verified claims ({email, level}) of the request's token, or None. Checked once per request."""
+    if 'auth_claims' not in g:
+        g.auth_claims, g.auth_issued_at = None, None
+        header = request.headers.get('Authorization', '')
+        token = header[7:] if header.startswith('Bearer ') else request.cookies.get(AUTH_TOKEN_COOKIE)
+        if token:
+            try:
+                g.auth_claims, issued_at = _token_serializer().loads(token, max_age=AUTH_TOKEN_TTL, return_timestamp=True)
+                g.auth_issued_at = issued_at.timestamp()
+            except (BadSignature, SignatureExpired):
+                pass
+    return g.auth_claims
+
+
+def refresh_auth_token(response):
+    """after_request hook: re-issues a valid token cookie once it is past half its lifetime."""
+    claims = g.get('auth_claims')
+    if claims and request.cookies.get(AUTH_TOKEN_COOKIE) and time.time() - g.auth_issued_at > AUTH_TOKEN_TTL / 2:
+        issue_auth_token(response, claims['email'], claims.get('level'))
+    return response
+
+
+def init_sessions(app, service_name):
+    """Configures authentication from the environment: signed tokens, or Flask-Session (cached when on Redis)."""
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'default_secret') 
+    app.config['AUTH_MODE'] = os.environ.get('AUTH_MODE', AUTH_MODE_SESSION)
+    if app.config['AUTH_MODE'] == AUTH_MODE_TOKEN:
+        # Flask's own signed-cookie session is left in place for flash messages; nothing touches Redis
+        app.after_request(refresh_auth_token)
+        app.logger.info(f"[{service_name}] Signed-token authentication enabled.")
+        return
+
     app.config['SESSION_TYPE'] = os.environ.get('SESSION_TYPE', 'redis')
     
-    # Mongo URI for database access
-    app.config["MONGO_URI"] = os.environ.get("MONGO_URI", "mongodb://localhost:27017/fallback_db")
-    
     # Redis URL for Session and later for Battle Service message broker
     SESSION_REDIS_URL = os.environ.get('SESSION_REDIS') 
 
@@ -35,9 +275,113 @@ def create_app(service_name):
     
     # Initialize Flask-Session
     Session(app)
+
+    if app.config['SESSION_TYPE'] == 'redis' and os.environ.get('SESSION_CACHE', '1') == '1':
+        plain = app.session_interface
+        app.session_interface = CachedRedisSessionInterface(
+            app, plain.client,
+            key_prefix=plain.key_prefix, use_signer=plain.use_signer, permanent=plain.permanent,
+            sid_length=plain.sid_length, serialization_format=app.config.get('SESSION_SERIALIZATION_FORMAT', Defaults.SESSION_SERIALIZATION_FORMAT)
+        )
+        app.logger.info(f"[{service_name}] Session cache enabled.")
+
+# --- Logging ---
+# Every service logs through one QueueHandler: the request thread only filters and enqueues the record,
+# and a QueueListener thread formats it as one JSON line and writes it. LOG_LEVEL sets the level
+# (default INFO). LOG_SAMPLE_RATES keeps only a share of the INFO/DEBUG records of noisy routes or events,
+# e.g. "/api/user/info=0.01,battle_result=0.1"; warnings and errors are always kept. A record's route is
+# its `route` extra if given, else the URL rule of the request it was logged from.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+
+
+def parse_sample_rates(spec):
+    """Parses "route=rate,route=rate" into {route: rate}."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        route, _, rate = item.rpartition('=')
+        rates[route] = float(rate)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Drops all but a route's sampling rate of its records below WARNING."""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        route = getattr(record, 'route', None)
+        if route is None and has_request_context() and request.url_rule is not None:
+            route = request.url_rule.rule
+        rate = self.rates.get(route, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, service, logger, message (with any traceback) and route."""
+
+    def __init__(self, service_name):
+        super().__init__()
+        self.service_name = service_name
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'service': self.service_name,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'route', None):
+            entry['route'] = record.route
+        return json.dumps(entry, default=str)
+
+
+def init_logging(app, service_name, stream=None):
+    """Routes the app's and every library's logging through the shared background JSON writer; returns the listener."""
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter(service_name))
+    # queue.Queue rather than SimpleQueue: its blocking get is green under the eventlet battle worker
+    log_queue = queue.Queue()
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    # Flush what is still queued when the worker exits
+    atexit.register(listener.stop)
+
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(parse_sample_rates(os.environ.get('LOG_SAMPLE_RATES', ''))))
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+    app.logger.removeHandler(default_handler)
+    app.logger.setLevel(LOG_LEVEL)
+    return listener
+
+# --- Initialization Function ---
+def create_app(service_name):
+    """Initializes a Flask application with shared configuration (CORS, Redis, Mongo)."""
+    app = Flask(service_name)
+    init_logging(app, service_name)
+    
+    # Load configuration from environment variables (defined in docker-compose.yaml)
+    # Mongo URI for database access
+    app.config["MONGO_URI"] = os.environ.get("MONGO_URI", "mongodb://localhost:27017/fallback_db")
+    
+    # Secret key and authentication: signed tokens, or Flask-Session with the cached Redis session layer
+    init_sessions(app, service_name)
     
     # Initialize PyMongo
     mongo = PyMongo(app)
+
+    # Make sure the hot queries are index-backed (idempotent, safe for every worker to run)
+    try:
+        ensure_indexes(mongo.db)
+        app.logger.info(f"[{service_name}] MongoDB indexes ensured.")
+    except PyMongoError as e:
+        app.logger.error(f"[{service_name}] Failed to ensure MongoDB indexes: {e}")
     
     # Enable CORS for cross-service communication (essential in microservices)
     CORS(app, supports_credentials=True, resources={r"/*": {"origins": "*"}})
@@ -49,7 +393,10 @@ def create_app(service_name):
 # --- Utility Function for Authentication ---
 # Every service will check this before processing business logic
 def get_current_user_email():
-    """Retrieves the authenticated user's email from the session."""
+    """Retrieves the authenticated user's email from the auth token or the session, depending on AUTH_MODE."""
+    if current_app.config.get('AUTH_MODE') == AUTH_MODE_TOKEN:
+        claims = get_auth_claims()
+        return claims.get('email') if claims else None
     return session.get('user_email')
 
 # Create a mock monster for Gatcha and Trading to ensure consistency (Simplified for now)
@@ -0,0 +1,76 @@
+import random
+
+# Fighter selection shared by the battle service and its benchmarks.
+# Kept free of import-time side effects (no app, database or Redis connections).
+
+# --- Selection modes ---
+# 'sample' lets MongoDB pick a random unlocked Pokemon with $sample; 'roster' picks from a cached list of
+# unlocked ids and fetches just that one. Either way a player's chosen lead Pokemon always fights.
+SELECT_SAMPLE = 'sample'
+SELECT_ROSTER = 'roster'
+# Compact documents only need species_id; the inline fields cover documents created before the species catalog
+FIGHTER_PROJECTION = {'species_id': 1, 'name': 1, 'hp': 1, 'atk': 1, 'def': 1}
+
+
+def get_battle_roster(db, player_name, inventory_cache=None):
+    """Returns {ids, lead} for the player's unlocked Pokemon, read through the inventory cache if there is one."""
+    def load_roster():
+        query = {"player": player_name, "locked": False}
+        # Projecting _id alone lets player_locked_id answer this without fetching any documents
+        ids = [doc['_id'] for doc in db.pokemon.find(query, {'_id': 1})]
+        lead = db.pokemon.find_one({**query, 'lead': True}, {'_id': 1})
+        return {"ids": ids, "lead": lead['_id'] if lead else None}
+    if inventory_cache is not None:
+        return inventory_cache.get_or_load(player_name, 'roster', load_roster)
+    return load_roster()
+
+
+def select_fighter(db, player_name, mode=SELECT_SAMPLE, inventory_cache=None):
+    """Returns the compact document of the Pokemon that fights for this player, or None if none is available."""
+    query = {"player": player_name, "locked": False}
+
+    if mode == SELECT_ROSTER:
+        roster = get_battle_roster(db, player_name, inventory_cache)
+        if not roster['ids']:
+            return None
+        fighter_id = roster['lead'] or random.choice(roster['ids'])
+        # The filter re-checks ownership and lock state in case the cached roster is a moment old
+        return db.pokemon.find_one({**query, '_id': fighter_id}, FIGHTER_PROJECTION)
+
+    # The lead lookup only touches the small partial player_lead index, so it is cheap when no lead is set
+    lead = db.pokemon.find_one({**query, 'lead': True}, FIGHTER_PROJECTION)
+    if lead:
+        return lead
+    return sample_fighter(db, player_name)
+
+
+def sample_fighter(db, player_name):
+    """A random unlocked Pokemon of a player with no lead set, or None if none is available."""
+    sample = list(db.pokemon.aggregate([
+        {'$match': {"player": player_name, "locked": False}},
+        {'$sample': {'size': 1}},
+        {'$project': FIGHTER_PROJECTION}
+    ]))
+    return sample[0] if sample else None
+
+
+def select_fighters(db, player_names, mode=SELECT_SAMPLE, inventory_cache=None):
+    """Batch select_fighter for a whole tick: {player: fighter document or None}.
+
+    In 'sample' mode every player's lead comes from one query, and only players without one are sampled.
+    """
+    if mode == SELECT_ROSTER:
+        return {player_name: select_fighter(db, player_name, mode, inventory_cache) for player_name in player_names}
+
+    fighters = {}
+    leads = db.pokemon.find(
+        {"player": {'$in': list(player_names)}, "locked": False, 'lead': True},
+        {**FIGHTER_PROJECTION, 'player': 1}
+    )
+    for lead in leads:
+        fighters.setdefault(lead.pop('player'), lead)
+    # The batch lead query already answered for everyone, so the rest go straight to $sample
+    for player_name in player_names:
+        if player_name not in fighters:
+            fighters[player_name] = sample_fighter(db, player_name)
+    return fighters
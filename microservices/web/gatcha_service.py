@@ -1,11 +1,63 @@
+import os
 import random
 from datetime import datetime
 from flask import request, jsonify
 from web.db_utils import create_app, get_current_user_email
+from web.species_catalog import SpeciesCatalog
+from web.write_behind import WriteBehindInserter, WriteBehindError, WriteBehindTimeout
+from web.inventory_cache import create_inventory_cache
 
 # Initialize the Flask App and MongoDB connection for this service
 app, mongo = create_app(__name__)
 
+# Species are loaded once per worker and expanded into pokemon at read time
+species_catalog = SpeciesCatalog(mongo.db)
+
+# Shared Redis inventory cache; every stored pull invalidates its owner
+inventory_cache = create_inventory_cache(app.logger)
+
+def invalidate_owners(docs):
+    """Invalidates the cached inventory of everyone who just received a Pokemon."""
+    if inventory_cache is not None:
+        inventory_cache.invalidate(*{doc['player'] for doc in docs})
+
+# --- Multi-pull limits ---
+MULTI_PULL_SIZE = 10
+MAX_MULTI_PULL_SIZE = 10
+
+# --- Optional write-behind batching of new Pokemon ---
+# GATCHA_WRITE_BEHIND=1 queues pulls in-process and flushes them with insert_many every
+# GATCHA_FLUSH_SIZE documents or GATCHA_FLUSH_MS milliseconds. GATCHA_WRITE_ACK picks whether a
+# pull is acknowledged after its batch is written ('flush') or as soon as it is queued ('enqueue').
+# Batches only fill up when a worker serves concurrent requests (gunicorn --threads or -k gevent),
+# and with ack-on-flush a batch can never hold more pulls than the worker has threads.
+write_behind = None
+if os.environ.get('GATCHA_WRITE_BEHIND', '0') == '1':
+    write_behind = WriteBehindInserter(
+        mongo.db.pokemon,
+        max_batch=int(os.environ.get('GATCHA_FLUSH_SIZE', 8)),
+        max_delay_ms=int(os.environ.get('GATCHA_FLUSH_MS', 20)),
+        ack_mode=os.environ.get('GATCHA_WRITE_ACK', 'flush'),
+        # Invalidate only once the documents are in MongoDB, or a read in between would re-cache the old inventory
+        on_flush=invalidate_owners
+    )
+    app.logger.info(f"Gatcha write-behind enabled (ack on {write_behind.ack_mode}).")
+
+# With ack-on-flush, a pull whose wait timed out is still queued and may be written later,
+# so a blind retry could pull twice
+SAVE_PENDING_MESSAGE = "Your pull is still being saved; check your inventory before pulling again."
+
+def save_new_pokemon(new_pokemon):
+    """Persists freshly pulled Pokemon directly or through the write-behind queue."""
+    if write_behind is not None:
+        write_behind.submit(new_pokemon)
+        return
+    if len(new_pokemon) == 1:
+        mongo.db.pokemon.insert_one(new_pokemon[0])
+    else:
+        mongo.db.pokemon.insert_many(new_pokemon)
+    invalidate_owners(new_pokemon)
+
 # --- Core Monster Generation Logic (Moved from app.py) ---
 def generate_monster_stats(base_name, level=1):
     """Generates base stats for a new monster based on provided level."""
@@ -36,25 +88,55 @@ def run_gatcha():
 
 @app.route('/api/gatcha/', methods=['POST'])
 def run_gatcha_post():
+    """Pulls a random Pokemon species and adds an instance of it to the inventory."""
     user_email = get_current_user_email()
-    """Pulls a random Pokemon and adds it to the inventory."""
-    
-    # Define a pool of possible gatcha pulls
-    # Add the player's email to associate the Pokemon with the user
-
-    gatcha_pool = [
-        {"player":user_email, "name": "Squirtle", "atk": 48, "def": 65, "hp": 44, "locked":False, "image": "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/7.png"},
-        {"player":user_email, "name": "Jigglypuff", "atk": 45, "def": 20, "hp": 115, "locked":False, "image": "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/39.png"},
-        {"player":user_email, "name": "Snorlax", "atk": 110, "def": 65, "hp": 160, "locked":False, "image": "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/143.png"}
-    ]
-    
-    new_pokemon = random.choice(gatcha_pool)
+
+    # Only the species id and per-instance fields are stored; name, stats and sprite come from the catalog
+    species = species_catalog.draw()[0]
+    new_pokemon = {"player": user_email, "species_id": species['_id'], "locked": False}
 
     # Save the new Pokemon to the database
-    mongo.db.pokemon.insert_one(new_pokemon)
+    try:
+        save_new_pokemon([new_pokemon])
+    except WriteBehindTimeout as e:
+        app.logger.error(f"Gatcha save failed: {e}")
+        return jsonify({"message": SAVE_PENDING_MESSAGE}), 503
+    except WriteBehindError as e:
+        app.logger.error(f"Gatcha save failed: {e}")
+        return jsonify({"message": "Gatcha is busy, please try again."}), 503
 
     # Return the newly caught Pokemon data
-    return jsonify({"message": "Gatcha successful!", "new_pokemon": new_pokemon}), 200
+    return jsonify({"message": "Gatcha successful!", "new_pokemon": species_catalog.expand(new_pokemon)}), 200
+
+@app.route('/api/gatcha/multi', methods=['POST'])
+def run_gatcha_multi():
+    """Pulls several Pokemon at once (a 10-pull by default) and stores them with a single insert_many."""
+    user_email = get_current_user_email()
+    data = request.get_json(silent=True) or {}
+    count = data.get('count', MULTI_PULL_SIZE)
+
+    if isinstance(count, bool) or not isinstance(count, int) or not 1 <= count <= MAX_MULTI_PULL_SIZE:
+        return jsonify({"message": f"count must be a whole number between 1 and {MAX_MULTI_PULL_SIZE}."}), 400
+
+    new_pokemon = [
+        {"player": user_email, "species_id": species['_id'], "locked": False}
+        for species in species_catalog.draw(count)
+    ]
+
+    # One round trip for the whole pull
+    try:
+        save_new_pokemon(new_pokemon)
+    except WriteBehindTimeout as e:
+        app.logger.error(f"Gatcha multi-pull save failed: {e}")
+        return jsonify({"message": SAVE_PENDING_MESSAGE}), 503
+    except WriteBehindError as e:
+        app.logger.error(f"Gatcha multi-pull save failed: {e}")
+        return jsonify({"message": "Gatcha is busy, please try again."}), 503
+
+    return jsonify({
+        "message": f"{count}-pull successful!",
+        "new_pokemon": [species_catalog.expand(pokemon) for pokemon in new_pokemon]
+    }), 200
 
 
 if __name__ == '__main__':
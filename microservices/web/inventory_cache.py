@@ -0,0 +1,116 @@
+import os
+import logging
+import redis
+from bson import json_util
+
+# --- Key layout ---
+# inv:ver:<player>               -> integer version, bumped (INCR) by every inventory mutation
+# inv:<player>:<version>:<query> -> JSON of one cached read; dead versions simply expire
+# inv:cache:stats                -> hash of hits / misses / stale counters shared by every worker
+VERSION_KEY = "inv:ver:{}"
+ENTRY_PREFIX = "inv:{}:"
+STATS_KEY = "inv:cache:stats"
+
+INVENTORY_CACHE_TTL = int(os.environ.get('INVENTORY_CACHE_TTL', 300))
+
+logger = logging.getLogger(__name__)
+
+# Reads the player's current version and the entry stored under it in one round trip,
+# counting the hit when there is one. Returns {version, cached JSON or false}.
+GET_CACHED_SCRIPT = """
+local version = redis.call('GET', KEYS[1]) or '0'
+local cached = redis.call('GET', ARGV[1] .. version .. ':' .. ARGV[2])
+if cached then
+    redis.call('HINCRBY', KEYS[2], 'hits', 1)
+end
+return {version, cached}
+"""
+
+
+class InventoryCache:
+    """Read-through Redis cache of per-player inventory reads with version-based invalidation.
+
+    Every mutation bumps the owner's version instead of deleting keys, so a reader that loaded
+    from MongoDB before the mutation can only store its (stale) result under a version nobody reads.
+    With verify=True every hit is re-read from MongoDB and mismatches are counted as 'stale'.
+    """
+
+    def __init__(self, client, ttl=INVENTORY_CACHE_TTL, verify=False):
+        self.client = client
+        self.ttl = ttl
+        self.verify = verify
+        self._get_cached = client.register_script(GET_CACHED_SCRIPT)
+
+    def get_or_load(self, player, query_key, loader):
+        """Returns the cached result of loader() for this player and query, loading it on a miss.
+
+        A Redis outage degrades to reading MongoDB directly.
+        """
+        try:
+            version, cached = self._get_cached(
+                keys=[VERSION_KEY.format(player), STATS_KEY],
+                args=[ENTRY_PREFIX.format(player), query_key]
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Inventory cache read failed, reading MongoDB directly: {e}")
+            return loader()
+        if cached:
+            value = json_util.loads(cached)
+            if self.verify:
+                fresh = loader()
+                if json_util.dumps(fresh) != json_util.dumps(value):
+                    self.client.hincrby(STATS_KEY, 'stale', 1)
+                    logger.error(f"Inventory cache for {player} ({query_key}) is stale.")
+                    return fresh
+            return value
+
+        value = loader()
+        entry_key = f"{ENTRY_PREFIX.format(player)}{int(version)}:{query_key}"
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.set(entry_key, json_util.dumps(value), ex=self.ttl)
+            pipe.hincrby(STATS_KEY, 'misses', 1)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Inventory cache write failed: {e}")
+        return value
+
+    def invalidate(self, *players):
+        """Bumps the version of every given player so their cached reads are never served again.
+
+        If Redis is unreachable the stale entries live at most INVENTORY_CACHE_TTL seconds.
+        """
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for player in set(players):
+                if player:
+                    pipe.incr(VERSION_KEY.format(player))
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.error(f"Inventory cache invalidation failed for {players}: {e}")
+
+    def stats(self):
+        """Returns the shared hit / miss / stale counters and the hit ratio."""
+        raw = self.client.hgetall(STATS_KEY)
+        stats = {key: int(raw.get(key.encode(), 0)) for key in ('hits', 'misses', 'stale')}
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+def create_inventory_cache(logger):
+    """Builds the shared inventory cache from the environment, or returns None when it is disabled.
+
+    INVENTORY_CACHE_REDIS (falling back to SESSION_REDIS) selects the Redis instance;
+    INVENTORY_CACHE=0 turns the cache off and INVENTORY_CACHE_VERIFY=1 enables consistency checks.
+    """
+    redis_url = os.environ.get('INVENTORY_CACHE_REDIS', os.environ.get('SESSION_REDIS'))
+    if os.environ.get('INVENTORY_CACHE', '1') != '1' or not redis_url:
+        return None
+    try:
+        cache = InventoryCache(redis.from_url(redis_url), verify=os.environ.get('INVENTORY_CACHE_VERIFY', '0') == '1')
+        logger.info("Inventory cache enabled.")
+        return cache
+    except Exception as e:
+        logger.error(f"Failed to initialize inventory cache, reading MongoDB directly: {e}")
+        return None
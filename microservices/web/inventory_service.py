@@ -1,11 +1,20 @@
 import json
 from bson.objectid import ObjectId
-from flask import request, jsonify
+from bson.errors import InvalidId
+from flask import request, jsonify, Response, stream_with_context
 from web.db_utils import create_app, get_current_user_email
+from web.species_catalog import SpeciesCatalog, SPECIES_FIELDS
+from web.inventory_cache import create_inventory_cache
 
 # Initialize the Flask App and MongoDB connection for this service
 app, mongo = create_app(__name__)
 
+# Species are loaded once per worker and expanded into pokemon at read time
+species_catalog = SpeciesCatalog(mongo.db)
+
+# Shared Redis read-through cache of inventory pages (None when disabled)
+inventory_cache = create_inventory_cache(app.logger)
+
 # --- Helper to serialize MongoDB documents ---
 def serialize_inventory(monster):
     """Converts a single MongoDB monster document to a JSON-safe dictionary."""
@@ -13,15 +22,105 @@ def serialize_inventory(monster):
         monster['_id'] = str(monster['_id'])
     return monster
 
+# --- Keyset pagination and projection over a player's inventory ---
+INVENTORY_PAGE_SIZE = 50
+MAX_INVENTORY_PAGE_SIZE = 500
+INVENTORY_STREAM_BATCH = 500
+# Fields a client may ask for with ?fields=; '_id' is always returned
+INVENTORY_FIELDS = {'name', 'image', 'hp', 'atk', 'def', 'locked', 'lead', 'player', 'species_id'}
+
+def parse_inventory_args(args, user_email):
+    """Builds the (query, projection, species_fields) for an inventory request, raising ValueError on bad input.
+
+    species_fields lists the catalog fields to expand into each monster after it is read.
+    """
+    query = {"player": user_email}
+
+    # Optional filter so trade forms only fetch Pokemon that can still be offered
+    locked = args.get('locked')
+    if locked is not None:
+        if locked not in ('true', 'false'):
+            raise ValueError("locked must be 'true' or 'false'.")
+        query['locked'] = locked == 'true'
+
+    cursor = args.get('cursor')
+    if cursor:
+        try:
+            query['_id'] = {'$gt': ObjectId(cursor)}
+        except InvalidId:
+            raise ValueError("Invalid inventory cursor.")
+
+    projection = None
+    species_fields = SPECIES_FIELDS
+    fields = args.get('fields')
+    if fields:
+        requested = {field.strip() for field in fields.split(',') if field.strip()}
+        unknown = requested - INVENTORY_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown inventory fields: {', '.join(sorted(unknown))}.")
+        projection = {field: 1 for field in requested}
+        species_fields = tuple(field for field in SPECIES_FIELDS if field in requested)
+        if species_fields:
+            # Catalog fields can only be expanded if the species id comes back with the document
+            projection['species_id'] = 1
+
+    return query, projection, species_fields
+
+def stream_inventory(query, projection, species_fields):
+    """Yields one NDJSON line per Pokemon while the cursor is being iterated."""
+    inventory = mongo.db.pokemon.find(query, projection).sort('_id', 1).batch_size(INVENTORY_STREAM_BATCH)
+    for monster in inventory:
+        yield app.json.dumps(species_catalog.expand(monster, species_fields)) + "\n"
+
 @app.route('/api/inventory/', methods=['GET'])
 def get_inventory():
-    """Retrieves all monsters owned by the current user."""
+    """Retrieves one page of monsters owned by the current user.
+
+    Query parameters:
+        cursor: the 'next_cursor' of the previous page (omit for the first page)
+        limit:  page size, capped at MAX_INVENTORY_PAGE_SIZE
+        fields: comma-separated subset of INVENTORY_FIELDS to return
+        locked: 'true' or 'false' to only return locked or unlocked monsters
+        format: 'ndjson' streams every matching monster after the cursor, one JSON object per line
+    """
     user_email = get_current_user_email()
 
-    # Fetch all monsters belonging to the user
-    inventory = mongo.db.pokemon.find({"player": user_email})
-    
-    return jsonify(inventory)
+    try:
+        query, projection, species_fields = parse_inventory_args(request.args, user_email)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    if request.args.get('format') == 'ndjson':
+        return Response(stream_with_context(stream_inventory(query, projection, species_fields)), mimetype='application/x-ndjson')
+
+    limit = request.args.get('limit', INVENTORY_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_INVENTORY_PAGE_SIZE))
+
+    def load_page():
+        # Fetch one extra monster to know whether another page exists
+        page = list(mongo.db.pokemon.find(query, projection).sort('_id', 1).limit(limit + 1))
+        next_cursor = str(page[limit - 1]['_id']) if len(page) > limit else None
+        return {"inventory": page[:limit], "next_cursor": next_cursor}
+
+    # Pages are cached compact (species_id only) and expanded from the catalog on every read
+    if inventory_cache is not None:
+        page_key = ":".join(['page', request.args.get('locked', ''), request.args.get('cursor', ''),
+                             str(limit), request.args.get('fields', '')])
+        result = inventory_cache.get_or_load(user_email, page_key, load_page)
+    else:
+        result = load_page()
+
+    return jsonify({
+        "inventory": [species_catalog.expand(monster, species_fields) for monster in result['inventory']],
+        "next_cursor": result['next_cursor']
+    })
+
+@app.route('/api/inventory/cache/stats', methods=['GET'])
+def get_inventory_cache_stats():
+    """Reports the shared inventory cache hit / miss / stale counters."""
+    if inventory_cache is None:
+        return jsonify({"message": "Inventory cache is disabled."}), 404
+    return jsonify(inventory_cache.stats())
 
 @app.route('/api/release/', methods=['PUT'])
 def release_monster():
@@ -35,15 +134,50 @@ def release_monster():
     # Convert string IDs back to MongoDB ObjectId objects
     object_ids = [ObjectId(p_id) for p_id in pokemon_ids_to_release]
 
-    # Use $in operator to find all documents whose _id is in the list
+    # Use $in operator to find all documents whose _id is in the list; only the caller's own
+    # Pokemon can be released, which also makes the caller the only inventory to invalidate
+    user_email = get_current_user_email()
     result = mongo.db.pokemon.delete_many({
-        '_id': {'$in': object_ids}
+        '_id': {'$in': object_ids},
+        'player': user_email
     })
+    if inventory_cache is not None and result.deleted_count:
+        inventory_cache.invalidate(user_email)
 
     return jsonify({
         "message": f"Successfully released {result.deleted_count} Pokemon!",
         "deleted_count": result.deleted_count
     })
 
+@app.route('/api/inventory/lead', methods=['PUT'])
+def set_lead_pokemon():
+    """Chooses the Pokemon that always battles for the current user; {"id": null} goes back to random picks."""
+    data = request.get_json() or {}
+    pokemon_id = data.get('id')
+    user_email = get_current_user_email()
+
+    if pokemon_id:
+        try:
+            object_id = ObjectId(pokemon_id)
+        except InvalidId:
+            return jsonify({"message": "Invalid Pokemon ID."}), 400
+        result = mongo.db.pokemon.update_one({'_id': object_id, 'player': user_email}, {'$set': {'lead': True}})
+        if not result.matched_count:
+            return jsonify({"message": "Pokemon not found in your inventory."}), 404
+        # A player has at most one lead
+        mongo.db.pokemon.update_many(
+            {'player': user_email, 'lead': True, '_id': {'$ne': object_id}},
+            {'$unset': {'lead': ''}}
+        )
+        message = "Lead Pokemon set! It will battle for you while it is not locked in a trade."
+    else:
+        mongo.db.pokemon.update_many({'player': user_email, 'lead': True}, {'$unset': {'lead': ''}})
+        message = "Lead Pokemon cleared. A random Pokemon will battle for you."
+
+    if inventory_cache is not None:
+        inventory_cache.invalidate(user_email)
+
+    return jsonify({"message": message, "lead": pokemon_id or None})
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000) # Microservices run on default 5000 internally
@@ -0,0 +1,152 @@
+import os
+import logging
+import redis
+from pymongo import MongoClient
+
+# --- CONFIGURATION ---
+# Run from the microservices/ directory to rebuild both boards from MongoDB: python -m web.leaderboard
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/fallback_db")
+
+# --- Boards ---
+# leaderboard:level -> ZSET of player email scored by level and xp (see level_score)
+# leaderboard:wins  -> ZSET of player email scored by wins
+BOARD_LEVEL = 'level'
+BOARD_WINS = 'wins'
+BOARD_KEYS = {BOARD_LEVEL: "leaderboard:level", BOARD_WINS: "leaderboard:wins"}
+# A rebuild fills these first, then renames them over the live boards in one transaction
+REBUILD_SUFFIX = ":rebuild"
+REBUILD_BATCH = 5000
+
+# xp never reaches this within one level, so level * XP_SCORE_BASE + xp orders by level, then xp,
+# and stays an exact integer in the ZSET's double score for any reachable level
+XP_SCORE_BASE = 1000000
+
+logger = logging.getLogger(__name__)
+
+
+def level_score(player):
+    """Score of a players document on the level board."""
+    return player.get('level', 1) * XP_SCORE_BASE + player.get('xp', 0)
+
+
+class Leaderboard:
+    """Redis sorted-set leaderboards kept up to date from every XP update.
+
+    Ranks and pages are O(log n) (+ page size) ZSET reads, so they do not depend on how many players
+    there are. Scores only ever grow, so updates use ZADD GT: a battle whose write lands after a
+    newer one for the same player can never move that player back down.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def record(self, player):
+        """Updates both boards from a players document (email, level, xp, wins), e.g. a find_one_and_update AFTER result.
+
+        A Redis failure is logged and left for the next rebuild to repair.
+        """
+        self.record_many([player])
+
+    def record_many(self, players):
+        """record() for several players documents in one pipeline."""
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for player in players:
+                pipe.zadd(BOARD_KEYS[BOARD_LEVEL], {player['email']: level_score(player)}, gt=True)
+                pipe.zadd(BOARD_KEYS[BOARD_WINS], {player['email']: player.get('wins', 0)}, gt=True)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.error(f"Leaderboard update failed for {[player['email'] for player in players]}: {e}")
+
+    def page(self, board, offset, limit):
+        """Returns up to limit entries starting at the 0-based offset, best first."""
+        rows = self.client.zrevrange(BOARD_KEYS[board], offset, offset + limit - 1, withscores=True)
+        return [self._entry(board, offset + index + 1, member.decode(), score) for index, (member, score) in enumerate(rows)]
+
+    def rank(self, board, player_email):
+        """Returns the player's entry (with its 1-based rank), or None if the player is not on the board."""
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zrevrank(BOARD_KEYS[board], player_email)
+        pipe.zscore(BOARD_KEYS[board], player_email)
+        rank, score = pipe.execute()
+        if rank is None:
+            return None
+        return self._entry(board, rank + 1, player_email, score)
+
+    @staticmethod
+    def _entry(board, rank, player_email, score):
+        score = int(score)
+        if board == BOARD_LEVEL:
+            return {"rank": rank, "player": player_email, "level": score // XP_SCORE_BASE, "xp": score % XP_SCORE_BASE}
+        return {"rank": rank, "player": player_email, "wins": score}
+
+    def rebuild(self, players):
+        """Recomputes both boards from the players collection and swaps them in atomically; returns the player count.
+
+        Repairs drift from failed updates and adds players who have never battled. An XP update that
+        lands while the rebuild is running may be overwritten by its older snapshot until that
+        player's next battle.
+        """
+        temp_keys = {board: key + REBUILD_SUFFIX for board, key in BOARD_KEYS.items()}
+        self.client.delete(*temp_keys.values())
+
+        count = 0
+        batch = []
+        cursor = players.find({}, {'email': 1, 'level': 1, 'xp': 1, 'wins': 1}).batch_size(REBUILD_BATCH)
+        for player in cursor:
+            if not player.get('email'):
+                continue
+            batch.append(player)
+            if len(batch) == REBUILD_BATCH:
+                self._write_rebuild_batch(temp_keys, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self._write_rebuild_batch(temp_keys, batch)
+            count += len(batch)
+
+        pipe = self.client.pipeline(transaction=True)
+        for board, key in BOARD_KEYS.items():
+            if count:
+                pipe.rename(temp_keys[board], key)
+            else:
+                pipe.delete(key)
+        pipe.execute()
+        return count
+
+    def _write_rebuild_batch(self, temp_keys, batch):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zadd(temp_keys[BOARD_LEVEL], {player['email']: level_score(player) for player in batch})
+        pipe.zadd(temp_keys[BOARD_WINS], {player['email']: player.get('wins', 0) for player in batch})
+        pipe.execute()
+
+
+def create_leaderboard(logger):
+    """Builds the leaderboard from the environment, or returns None without a Redis to keep it in.
+
+    LEADERBOARD_REDIS (falling back to SESSION_REDIS) selects the Redis instance.
+    """
+    redis_url = os.environ.get('LEADERBOARD_REDIS', os.environ.get('SESSION_REDIS'))
+    if not redis_url:
+        return None
+    try:
+        return Leaderboard(redis.from_url(redis_url))
+    except Exception as e:
+        logger.error(f"Failed to initialize the leaderboard: {e}")
+        return None
+
+
+def main():
+    client = MongoClient(MONGO_URI)
+    db = client.get_default_database()
+    board = create_leaderboard(logger)
+    if board is None:
+        raise SystemExit("Set LEADERBOARD_REDIS or SESSION_REDIS to the Redis that holds the leaderboard.")
+
+    count = board.rebuild(db.players)
+    client.close()
+    print(f"Rebuilt the level and wins leaderboards from {count} player(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+import logging
+import os
+import time
+from collections import deque
+
+import redis
+
+# --- Key layout ---
+# battle:queue          -> ZSET of queued socket ids, scored by join sequence (FIFO order)
+# battle:queue:players  -> HASH socket id -> player email
+# battle:queue:seq      -> join sequence counter
+# battle:queue:expires  -> ZSET of queued socket ids, scored by when the entry expires (ms, Redis clock)
+QUEUE_KEY = "battle:queue"
+PLAYERS_KEY = "battle:queue:players"
+SEQUENCE_KEY = "battle:queue:seq"
+EXPIRES_KEY = "battle:queue:expires"
+
+# --- Entry expiry ---
+# Every worker refreshes its own waiting sockets every QUEUE_HEARTBEAT_SECONDS; an entry not refreshed for
+# QUEUE_ENTRY_TTL_SECONDS (its worker died, so no disconnect will ever remove it) is dropped before pairing.
+QUEUE_ENTRY_TTL_SECONDS = int(os.environ.get('QUEUE_ENTRY_TTL_SECONDS', 30))
+QUEUE_HEARTBEAT_SECONDS = QUEUE_ENTRY_TTL_SECONDS / 3
+
+# --- Join outcomes ---
+QUEUED = 'queued'
+ALREADY_QUEUED = 'already_queued'
+MATCHED = 'matched'
+
+logger = logging.getLogger(__name__)
+
+# Drops expired entries; shared by the join script. Leaves `now` (ms) set for the rest of the script.
+EXPIRE_STEP = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local expired = redis.call('ZRANGEBYSCORE', KEYS[4], '-inf', now)
+for _, sid in ipairs(expired) do
+    redis.call('ZREM', KEYS[1], sid)
+    redis.call('HDEL', KEYS[2], sid)
+    redis.call('ZREM', KEYS[4], sid)
+end
+"""
+
+# Drops expired entries, enqueues a socket and, if that makes two, pops the two oldest entries, all in
+# one atomic step. Every join runs this script, so the queue never holds more than one waiting player
+# and no two workers can ever pop the same entry. ARGV: sid, player, entry ttl (ms).
+JOIN_SCRIPT = EXPIRE_STEP + """
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    redis.call('ZADD', KEYS[4], now + tonumber(ARGV[3]), ARGV[1])
+    return {'already_queued', redis.call('ZRANK', KEYS[1], ARGV[1]) + 1}
+end
+redis.call('ZADD', KEYS[1], redis.call('INCR', KEYS[3]), ARGV[1])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+redis.call('ZADD', KEYS[4], now + tonumber(ARGV[3]), ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < 2 then
+    return {'queued', redis.call('ZRANK', KEYS[1], ARGV[1]) + 1}
+end
+local popped = redis.call('ZPOPMIN', KEYS[1], 2)
+local sid1, sid2 = popped[1], popped[3]
+local names = redis.call('HMGET', KEYS[2], sid1, sid2)
+redis.call('HDEL', KEYS[2], sid1, sid2)
+redis.call('ZREM', KEYS[4], sid1, sid2)
+return {'matched', sid1, names[1], sid2, names[2]}
+"""
+
+# Removes a socket only if it is still waiting; returns 1 if it was removed
+LEAVE_SCRIPT = """
+local removed = redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('ZREM', KEYS[3], ARGV[1])
+return removed
+"""
+
+# Pushes back the expiry of the given sockets that are still waiting; returns the sids that are not.
+# ARGV: entry ttl (ms), then sids.
+REFRESH_SCRIPT = """
+local time = redis.call('TIME')
+local expires = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000) + tonumber(ARGV[1])
+local gone = {}
+for i = 2, #ARGV do
+    if redis.call('ZSCORE', KEYS[1], ARGV[i]) then
+        redis.call('ZADD', KEYS[1], expires, ARGV[i])
+    else
+        table.insert(gone, ARGV[i])
+    end
+end
+return gone
+"""
+
+
+class RedisMatchQueue:
+    """FIFO matchmaking queue kept in Redis, so any number of battle workers share it.
+
+    Entries are {'name': player email, 'sid': Socket.IO session id}, like the old BATTLE_QUEUE list.
+    Each worker keeps the entries it queued alive with heartbeat(); entries of a worker that died
+    expire after entry_ttl seconds and are dropped by the next join instead of being matched.
+    """
+
+    def __init__(self, client, entry_ttl=QUEUE_ENTRY_TTL_SECONDS):
+        self.client = client
+        self.entry_ttl = entry_ttl
+        self._join = client.register_script(JOIN_SCRIPT)
+        self._leave = client.register_script(LEAVE_SCRIPT)
+        self._refresh = client.register_script(REFRESH_SCRIPT)
+        # Sockets this worker queued that may still be waiting; refreshed by heartbeat()
+        self._local_sids = set()
+
+    @classmethod
+    def from_url(cls, url):
+        return cls(redis.from_url(url, decode_responses=True))
+
+    def join(self, sid, player):
+        """Queues the socket and tries to match it.
+
+        Returns (MATCHED, (player1, player2)) with the two oldest entries, or (QUEUED, position)
+        / (ALREADY_QUEUED, position) with the socket's 1-based place in the queue.
+        """
+        reply = self._join(
+            keys=[QUEUE_KEY, PLAYERS_KEY, SEQUENCE_KEY, EXPIRES_KEY], args=[sid, player, int(self.entry_ttl * 1000)]
+        )
+        if reply[0] == MATCHED:
+            self._local_sids.difference_update((sid, reply[1], reply[3]))
+            return MATCHED, ({'sid': reply[1], 'name': reply[2]}, {'sid': reply[3], 'name': reply[4]})
+        self._local_sids.add(sid)
+        return reply[0], int(reply[1])
+
+    def leave(self, sid):
+        """Removes the socket if it is still waiting; returns True if it was."""
+        self._local_sids.discard(sid)
+        return bool(self._leave(keys=[QUEUE_KEY, PLAYERS_KEY, EXPIRES_KEY], args=[sid]))
+
+    def heartbeat(self):
+        """Refreshes the expiry of every socket this worker queued; returns how many were still waiting."""
+        sids = list(self._local_sids)
+        if not sids:
+            return 0
+        gone = self._refresh(keys=[EXPIRES_KEY], args=[int(self.entry_ttl * 1000), *sids])
+        # Sockets matched by another worker's join (or already expired) are no longer waiting
+        self._local_sids.difference_update(gone)
+        return len(sids) - len(gone)
+
+    def run_heartbeat(self, sleep=time.sleep, interval=QUEUE_HEARTBEAT_SECONDS):
+        """Heartbeats forever; pass the server's sleep (e.g. socketio.sleep) so the loop yields under eventlet."""
+        while True:
+            try:
+                self.heartbeat()
+            except redis.RedisError as e:
+                logger.error(f"Matchmaking queue heartbeat failed: {e}")
+            sleep(interval)
+
+    def __len__(self):
+        return self.client.zcard(QUEUE_KEY)
+
+
+class InProcessMatchQueue:
+    """Single-worker FIFO matchmaking queue with O(1) join, leave, match and position.
+
+    Entries sit in a deque in join order and are indexed by sid. leave() only marks an entry dead
+    (a tombstone) instead of searching the deque; dead entries are skipped when they reach the
+    front, and the deque is compacted once tombstones outnumber live entries.
+    Same interface as RedisMatchQueue, for running one battle worker without Redis.
+    """
+
+    def __init__(self):
+        self._order = deque()
+        self._by_sid = {}
+        self._tombstones = 0
+        self._next_seq = 0
+
+    def add(self, sid, player):
+        """Queues the socket; returns False if it was already queued."""
+        if sid in self._by_sid:
+            return False
+        entry = [self._next_seq, sid, player, True]
+        self._next_seq += 1
+        self._order.append(entry)
+        self._by_sid[sid] = entry
+        return True
+
+    def leave(self, sid):
+        """Removes the socket if it is still waiting; returns True if it was."""
+        entry = self._by_sid.pop(sid, None)
+        if entry is None:
+            return False
+        entry[3] = False
+        self._tombstones += 1
+        if self._tombstones > len(self._by_sid):
+            self._compact()
+        return True
+
+    def pop_pair(self):
+        """Removes and returns the two oldest waiting players, or None if fewer than two are waiting."""
+        if len(self._by_sid) < 2:
+            return None
+        return self._pop_live(), self._pop_live()
+
+    def join(self, sid, player):
+        """Queues the socket and tries to match it, returning the same outcomes as RedisMatchQueue.join."""
+        if not self.add(sid, player):
+            return ALREADY_QUEUED, self.position(sid)
+        pair = self.pop_pair()
+        if pair:
+            return MATCHED, pair
+        return QUEUED, self.position(sid)
+
+    def position(self, sid):
+        """Estimated 1-based place in the queue: exact unless players ahead of it have left."""
+        entry = self._by_sid.get(sid)
+        if entry is None:
+            return None
+        return min(entry[0] - self._order[0][0] + 1, len(self._by_sid))
+
+    def __len__(self):
+        return len(self._by_sid)
+
+    def _pop_live(self):
+        while True:
+            seq, sid, player, alive = self._order.popleft()
+            if alive:
+                del self._by_sid[sid]
+                return {'sid': sid, 'name': player}
+            self._tombstones -= 1
+
+    def _compact(self):
+        """Drops every tombstone in one pass; amortised O(1) since it only runs after as many leaves."""
+        self._order = deque(entry for entry in self._order if entry[3])
+        self._tombstones = 0
@@ -0,0 +1,69 @@
+import os
+import sys
+from pymongo import MongoClient
+
+from web.species_catalog import SpeciesCatalog, SPECIES_FIELDS
+
+# --- CONFIGURATION ---
+# Run from the microservices/ directory: python -m web.migrate_species [--dry-run]
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/fallback_db")
+
+
+def collection_stats(db):
+    """Returns the size figures (in bytes) reported by collStats for the pokemon collection."""
+    stats = db.command('collStats', 'pokemon')
+    return {
+        'documents': stats.get('count', 0),
+        'avg document size': stats.get('avgObjSize', 0),
+        'data size': stats.get('size', 0),
+        'storage size': stats.get('storageSize', 0),
+        'total index size': stats.get('totalIndexSize', 0),
+    }
+
+
+def migrate(db, dry_run=False):
+    """Replaces the embedded name/stats/sprite of every legacy pokemon with its catalog species_id.
+
+    A document is only migrated when all of its embedded species fields match a catalog entry,
+    so nothing that was customised per instance is thrown away. Returns (migrated, unmatched).
+    """
+    catalog = SpeciesCatalog(db)
+    migrated = 0
+    for species in catalog.all():
+        legacy_filter = {'species_id': {'$exists': False}}
+        legacy_filter.update({field: species[field] for field in SPECIES_FIELDS})
+        if dry_run:
+            migrated += db.pokemon.count_documents(legacy_filter)
+            continue
+        result = db.pokemon.update_many(
+            legacy_filter,
+            {'$set': {'species_id': species['_id']}, '$unset': {field: '' for field in SPECIES_FIELDS}}
+        )
+        migrated += result.modified_count
+        print(f"{species['name']:>12}: migrated {result.modified_count} document(s)")
+
+    unmatched = db.pokemon.count_documents({'species_id': {'$exists': False}})
+    return migrated, unmatched
+
+
+def main():
+    dry_run = '--dry-run' in sys.argv[1:]
+    client = MongoClient(MONGO_URI)
+    db = client.get_default_database()
+
+    before = collection_stats(db)
+    migrated, unmatched = migrate(db, dry_run=dry_run)
+    after = collection_stats(db)
+    client.close()
+
+    print(f"\n{'would migrate' if dry_run else 'migrated'} {migrated} document(s); {unmatched} left without a species_id")
+    print(f"{'':>18} | {'before':>12} | {'after':>12} | {'reduction':>9}")
+    for key in before:
+        reduction = (1 - after[key] / before[key]) * 100 if before[key] else 0.0
+        print(f"{key:>18} | {before[key]:>12,} | {after[key]:>12,} | {reduction:>8.1f}%")
+    # WiredTiger only returns freed pages to the OS after a compact
+    print("\nNote: 'storage size' shrinks only after running db.runCommand({compact: 'pokemon'}).")
+
+
+if __name__ == "__main__":
+    main()
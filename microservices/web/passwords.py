@@ -0,0 +1,167 @@
+import hashlib
+import hmac
+import multiprocessing
+import os
+import string
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# --- Hash format ---
+# scrypt$<log2 N>$<r>$<p>$<salt hex>$<key hex>. Anything else in players.password is a legacy row:
+# a SHA-256 hex digest (seed_db.py) or plaintext (older registrations), upgraded on the next login.
+SCHEME = "scrypt"
+SALT_BYTES = 16
+KEY_BYTES = 32
+# Cost factor: each hash takes 128 * r * 2**log_n bytes of memory and roughly doubles in CPU time per step
+SCRYPT_LOG_N = int(os.environ.get('PASSWORD_SCRYPT_LOG_N', 14))
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when max_pending hashes are already running or waiting; the caller should answer 503."""
+
+
+def _scrypt(password, salt, log_n, r, p):
+    """Runs in a pool process, so a hash never holds the web worker's CPU or GIL."""
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=1 << log_n, r=r, p=p, dklen=KEY_BYTES,
+        # Twice what the parameters need, so raising the cost factor never trips the 32 MiB default
+        maxmem=256 * r * (1 << log_n)
+    )
+
+
+def encode_hash(log_n, r, p, salt, key):
+    return f"{SCHEME}${log_n}${r}${p}${salt.hex()}${key.hex()}"
+
+
+def parse_hash(stored):
+    """Returns (log_n, r, p, salt, key) of an scrypt hash, or None for a legacy row."""
+    parts = stored.split('$') if isinstance(stored, str) else []
+    if len(parts) != 6 or parts[0] != SCHEME:
+        return None
+    log_n, r, p, salt, key = parts[1:]
+    return int(log_n), int(r), int(p), bytes.fromhex(salt), bytes.fromhex(key)
+
+
+def is_sha256_digest(stored):
+    return len(stored) == 64 and all(c in string.hexdigits for c in stored)
+
+
+def verify_legacy(stored, password):
+    """Checks a SHA-256 hex digest or plaintext row (both cheap, so they run inline).
+
+    A row that looks like a digest is only ever compared as one, so knowing a stored digest
+    is not enough to log in by sending it as the password.
+    """
+    if not isinstance(stored, str):
+        return False
+    if is_sha256_digest(stored):
+        candidate = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(stored.lower().encode(), candidate.encode())
+    return hmac.compare_digest(stored.encode(), password.encode())
+
+
+class PasswordHasher:
+    """Runs scrypt on a bounded process pool shared by the worker's requests.
+
+    At most `workers` hashes run at once and at most `max_pending` (running or waiting) are accepted;
+    beyond that hash() and verify() raise PasswordHasherBusy instead of queueing, so a login storm
+    turns into fast 503s rather than requests stuck behind minutes of KDF work. The pool is started
+    on first use with the 'spawn' method, i.e. after gunicorn has forked the worker.
+    """
+
+    def __init__(self, workers=2, max_pending=16, log_n=SCRYPT_LOG_N, r=SCRYPT_R, p=SCRYPT_P):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.log_n, self.r, self.p = log_n, r, p
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.hashed = 0
+        self.rehashed = 0
+        self.rejected = 0
+
+    def _discard(self, executor):
+        """Drops a broken pool (e.g. a pool process was OOM-killed) so the next hash starts a fresh one."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _run(self, password, salt, log_n, r, p):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy()
+            self._pending += 1
+        try:
+            # A hash that hit a broken pool is retried once on a new one
+            for attempt in range(2):
+                with self._lock:
+                    if self._executor is None:
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+                    executor = self._executor
+                try:
+                    return executor.submit(_scrypt, password, salt, log_n, r, p).result()
+                except BrokenProcessPool:
+                    self._discard(executor)
+                    if attempt:
+                        raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self.hashed += 1
+
+    def hash(self, password):
+        """Returns a new scrypt hash of password at the current cost factor."""
+        salt = os.urandom(SALT_BYTES)
+        return encode_hash(self.log_n, self.r, self.p, salt, self._run(password, salt, self.log_n, self.r, self.p))
+
+    def verify(self, stored, password):
+        """Checks password against a stored row; returns (matches, replacement hash or None).
+
+        A replacement is returned for a correct password whose row is legacy (SHA-256 or plaintext)
+        or was hashed at a different cost factor, so the caller can store the upgraded hash.
+        """
+        parsed = parse_hash(stored)
+        if parsed is None:
+            if not verify_legacy(stored, password):
+                return False, None
+            return True, self._upgrade(password)
+
+        log_n, r, p, salt, key = parsed
+        if not hmac.compare_digest(self._run(password, salt, log_n, r, p), key):
+            return False, None
+        if (log_n, r, p) != (self.log_n, self.r, self.p):
+            return True, self._upgrade(password)
+        return True, None
+
+    def _upgrade(self, password):
+        """Rehashes a verified password at the current cost, or returns None to retry on a later login when busy."""
+        try:
+            new_hash = self.hash(password)
+        except PasswordHasherBusy:
+            return None
+        with self._lock:
+            self.rehashed += 1
+        return new_hash
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "log_n": self.log_n,
+                "hashed": self.hashed,
+                "rehashed": self.rehashed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
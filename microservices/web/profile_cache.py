@@ -0,0 +1,109 @@
+import os
+import logging
+import redis
+
+# --- Key layout ---
+# profile:<player> -> HASH of level / xp / wins / losses, expiring PROFILE_CACHE_TTL seconds after its last write
+PROFILE_KEY = "profile:{}"
+PROFILE_FIELDS = ('level', 'xp', 'wins', 'losses')
+# Also the staleness bound: a write-through that failed leaves an old profile for at most this long
+PROFILE_CACHE_TTL = int(os.environ.get('PROFILE_CACHE_TTL', 300))
+
+logger = logging.getLogger(__name__)
+
+# Stores a profile. ARGV: ttl, mode, battles played (wins + losses), then field/value pairs.
+# mode 'fill' (a read miss) never replaces an existing profile, which may be newer than the
+# MongoDB read it came from; mode 'write' (a write-through) replaces it unless the cached one
+# has more battles, i.e. an older battle's result never overwrites a newer one.
+STORE_SCRIPT = """
+local cached = redis.call('HMGET', KEYS[1], 'wins', 'losses')
+if cached[1] then
+    if ARGV[2] == 'fill' then
+        return 0
+    end
+    if tonumber(cached[1]) + tonumber(cached[2] or 0) > tonumber(ARGV[3]) then
+        return 0
+    end
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 4))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+def profile_of(player):
+    """The cached fields of a players document, with the defaults new players start from."""
+    return {
+        'level': player.get('level', 1),
+        'xp': player.get('xp', 0),
+        'wins': player.get('wins', 0),
+        'losses': player.get('losses', 0),
+    }
+
+
+class ProfileCache:
+    """Write-through Redis cache of player profiles (level, xp, wins, losses) for /api/user/info.
+
+    Registration and every XP update write the new profile, so reads only fall back to MongoDB
+    for players whose entry expired or was never written. A Redis outage degrades to MongoDB reads.
+    """
+
+    def __init__(self, client, ttl=PROFILE_CACHE_TTL):
+        self.client = client
+        self.ttl = ttl
+        self._store = client.register_script(STORE_SCRIPT)
+
+    def get_or_load(self, player_email, loader):
+        """Returns the player's profile, loading it with loader() (a players document or None) on a miss."""
+        try:
+            cached = self.client.hgetall(PROFILE_KEY.format(player_email))
+        except redis.RedisError as e:
+            logger.warning(f"Profile cache read failed, reading MongoDB directly: {e}")
+            cached = None
+        if cached:
+            return {field.decode(): int(value) for field, value in cached.items()}
+
+        player = loader()
+        if player is None:
+            return None
+        profile = profile_of(player)
+        self._write([(player_email, profile)], 'fill')
+        return profile
+
+    def write(self, player):
+        """Writes through a players document (email, level, xp, wins, losses), e.g. a find_one_and_update AFTER result."""
+        self.write_many([player])
+
+    def write_many(self, players):
+        """write() for several players documents in one pipeline."""
+        self._write([(player['email'], profile_of(player)) for player in players], 'write')
+
+    def _write(self, profiles, mode):
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for player_email, profile in profiles:
+                args = [self.ttl, mode, profile['wins'] + profile['losses']]
+                for field in PROFILE_FIELDS:
+                    args += [field, profile[field]]
+                self._store(keys=[PROFILE_KEY.format(player_email)], args=args, client=pipe)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.error(f"Profile cache write failed for {[player_email for player_email, _ in profiles]}: {e}")
+
+
+def create_profile_cache(logger):
+    """Builds the profile cache from the environment, or returns None when it is disabled.
+
+    PROFILE_CACHE_REDIS (falling back to SESSION_REDIS) selects the Redis instance;
+    PROFILE_CACHE=0 turns the cache off.
+    """
+    redis_url = os.environ.get('PROFILE_CACHE_REDIS', os.environ.get('SESSION_REDIS'))
+    if os.environ.get('PROFILE_CACHE', '1') != '1' or not redis_url:
+        return None
+    try:
+        cache = ProfileCache(redis.from_url(redis_url))
+        logger.info("Profile cache enabled.")
+        return cache
+    except Exception as e:
+        logger.error(f"Failed to initialize profile cache, reading MongoDB directly: {e}")
+        return None
@@ -0,0 +1,41 @@
+from pymongo import ReturnDocument
+
+# Player XP and level rules shared by the battle service and its benchmarks.
+# Kept free of import-time side effects (no app, database or Redis connections).
+
+XP_PER_WIN = 100
+XP_PER_LOSS = 10 # Small XP gain for participating
+LEVEL_UP_XP = 100
+# What an XP update reads back: enough for the leaderboards and the profile cache
+PROGRESS_PROJECTION = {'email': 1, 'xp': 1, 'level': 1, 'wins': 1, 'losses': 1, 'last_level_gain': 1}
+
+
+def xp_update_pipeline(xp_gained, is_winner):
+    """Update pipeline that adds XP, rolls every full LEVEL_UP_XP into levels and counts the result, all server-side.
+
+    last_level_gain records how many levels this update added, so the caller can read it back.
+    """
+    return [
+        {'$set': {'_xp_total': {'$add': [{'$ifNull': ['$xp', 0]}, xp_gained]}}},
+        {'$set': {
+            'last_level_gain': {'$toInt': {'$floor': {'$divide': ['$_xp_total', LEVEL_UP_XP]}}},
+            'xp': {'$mod': ['$_xp_total', LEVEL_UP_XP]},
+            'wins': {'$add': [{'$ifNull': ['$wins', 0]}, 1 if is_winner else 0]},
+            'losses': {'$add': [{'$ifNull': ['$losses', 0]}, 0 if is_winner else 1]}
+        }},
+        {'$set': {'level': {'$add': [{'$ifNull': ['$level', 1]}, '$last_level_gain']}}},
+        {'$unset': '_xp_total'}
+    ]
+
+
+def award_xp(players, user_name, is_winner):
+    """Applies one battle's XP and record to a player in one atomic round trip.
+
+    Returns the updated players document (PROGRESS_PROJECTION), or None if there is no such player.
+    """
+    return players.find_one_and_update(
+        {"email": user_name},
+        xp_update_pipeline(XP_PER_WIN if is_winner else XP_PER_LOSS, is_winner),
+        projection=PROGRESS_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
@@ -0,0 +1,235 @@
+import logging
+import time
+import uuid
+
+import redis
+
+from web.matchmaking import QUEUED, ALREADY_QUEUED
+
+# --- Key layout ---
+# battle:pool               -> ZSET of waiting socket ids, scored by join time (ms, Redis clock)
+# battle:pool:players       -> HASH socket id -> player email
+# battle:matchmaker:lock    -> held by the one worker running the current tick
+# battle:matchmaker:waits   -> HASH "<level bucket>|<wait bin>" -> matched players, the wait-time histograms
+# battle:matchmaker:stats   -> HASH of ticks / matched_pairs / largest_batch counters
+POOL_KEY = "battle:pool"
+POOL_PLAYERS_KEY = "battle:pool:players"
+LOCK_KEY = "battle:matchmaker:lock"
+WAITS_KEY = "battle:matchmaker:waits"
+STATS_KEY = "battle:matchmaker:stats"
+
+# --- Pairing ---
+# Players start out only matched within MATCH_LEVEL_RANGE levels of each other; the range grows by
+# MATCH_WIDEN_PER_SECOND levels for every second waited, and after MATCH_MAX_WAIT_SECONDS anyone will do.
+MATCH_LEVEL_RANGE = 2
+MATCH_WIDEN_PER_SECOND = 1.0
+MATCH_MAX_WAIT_SECONDS = 30
+# Histograms group players into buckets of this many levels (1-10, 11-20, ...)
+LEVEL_BUCKET_SIZE = 10
+# Upper bounds (seconds) of the wait-time histogram bins; longer waits land in '+Inf'
+WAIT_BINS_SECONDS = (1, 2, 5, 10, 30, 60)
+
+logger = logging.getLogger(__name__)
+
+# Adds a socket to the pool, stamped with the Redis clock so every worker agrees on wait times.
+# Returns {outcome, 1-based place in join order}.
+ADD_SCRIPT = """
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    return {'already_queued', redis.call('ZRANK', KEYS[1], ARGV[1]) + 1}
+end
+local now = redis.call('TIME')
+redis.call('ZADD', KEYS[1], now[1] * 1000 + math.floor(now[2] / 1000), ARGV[1])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+return {'queued', redis.call('ZRANK', KEYS[1], ARGV[1]) + 1}
+"""
+
+# Removes a socket only if it is still waiting; returns 1 if it was removed
+LEAVE_SCRIPT = """
+local removed = redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+return removed
+"""
+
+# ARGV holds sid pairs (a1, b1, a2, b2, ...). A pair is removed and returned only if both sockets are
+# still waiting, so a player who left during the tick is never matched and no pair is claimed twice.
+CLAIM_SCRIPT = """
+local claimed = {}
+for i = 1, #ARGV, 2 do
+    local a, b = ARGV[i], ARGV[i + 1]
+    if redis.call('ZSCORE', KEYS[1], a) and redis.call('ZSCORE', KEYS[1], b) then
+        redis.call('ZREM', KEYS[1], a, b)
+        redis.call('HDEL', KEYS[2], a, b)
+        table.insert(claimed, a)
+        table.insert(claimed, b)
+    end
+end
+return claimed
+"""
+
+
+def level_bucket(level):
+    """Histogram label of the bucket a level falls in, e.g. '11-20'."""
+    low = (max(level, 1) - 1) // LEVEL_BUCKET_SIZE * LEVEL_BUCKET_SIZE + 1
+    return f"{low}-{low + LEVEL_BUCKET_SIZE - 1}"
+
+
+def wait_bin(wait_seconds):
+    """Histogram bin (its upper bound in seconds, or '+Inf') a wait falls in."""
+    for bound in WAIT_BINS_SECONDS:
+        if wait_seconds <= bound:
+            return str(bound)
+    return '+Inf'
+
+
+def level_tolerance(entry, now_ms):
+    """How many levels apart this entry may be matched, given how long it has waited."""
+    waited = (now_ms - entry['joined_at']) / 1000
+    if waited >= MATCH_MAX_WAIT_SECONDS:
+        return float('inf')
+    return MATCH_LEVEL_RANGE + waited * MATCH_WIDEN_PER_SECOND
+
+
+def pair_by_level(entries, now_ms):
+    """Pairs waiting entries ({sid, name, level, joined_at}) of similar level; returns [(older, newer), ...].
+
+    Entries are sorted by level and neighbours are paired when their level gap is within the wider
+    of their two tolerances, so the longer-waiting side widens the search. O(n log n) per tick.
+    A player queued from two sockets is matched at most once per tick, and never against itself.
+    """
+    ordered = sorted(entries, key=lambda entry: (entry['level'], entry['joined_at']))
+    pairs = []
+    matched_names = set()
+    candidate = None
+    for entry in ordered:
+        if entry['name'] in matched_names:
+            continue
+        if candidate and candidate['name'] != entry['name'] and \
+                entry['level'] - candidate['level'] <= max(level_tolerance(candidate, now_ms), level_tolerance(entry, now_ms)):
+            pair = sorted((candidate, entry), key=lambda e: e['joined_at'])
+            pairs.append((pair[0], pair[1]))
+            matched_names.update((candidate['name'], entry['name']))
+            candidate = None
+        else:
+            candidate = entry
+    return pairs
+
+
+class SkillMatchPool:
+    """Redis pool of waiting players that a periodic tick matches in batches, shared by every battle worker."""
+
+    def __init__(self, client):
+        self.client = client
+        self._add = client.register_script(ADD_SCRIPT)
+        self._leave = client.register_script(LEAVE_SCRIPT)
+        self._claim = client.register_script(CLAIM_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url):
+        return cls(redis.from_url(url, decode_responses=True))
+
+    def add(self, sid, player):
+        """Queues the socket; returns (QUEUED, position) or (ALREADY_QUEUED, position)."""
+        reply = self._add(keys=[POOL_KEY, POOL_PLAYERS_KEY], args=[sid, player])
+        return (QUEUED if reply[0] == QUEUED else ALREADY_QUEUED), int(reply[1])
+
+    def leave(self, sid):
+        """Removes the socket if it is still waiting; returns True if it was."""
+        return bool(self._leave(keys=[POOL_KEY, POOL_PLAYERS_KEY], args=[sid]))
+
+    def try_lock(self, ttl_ms):
+        """Takes the tick lock for ttl_ms; only the worker that gets it runs this tick."""
+        return bool(self.client.set(LOCK_KEY, uuid.uuid4().hex, nx=True, px=ttl_ms))
+
+    def snapshot(self):
+        """Returns (every waiting entry as {sid, name, joined_at}, the Redis clock in ms)."""
+        pipe = self.client.pipeline(transaction=True)
+        pipe.zrange(POOL_KEY, 0, -1, withscores=True)
+        pipe.hgetall(POOL_PLAYERS_KEY)
+        pipe.time()
+        waiting, names, (seconds, micros) = pipe.execute()
+        entries = [
+            {'sid': sid, 'name': names[sid], 'joined_at': int(joined_at)}
+            for sid, joined_at in waiting if sid in names
+        ]
+        return entries, seconds * 1000 + micros // 1000
+
+    def claim(self, pairs):
+        """Atomically removes the given pairs from the pool; returns the pairs that were still waiting."""
+        if not pairs:
+            return []
+        by_sid = {entry['sid']: entry for pair in pairs for entry in pair}
+        claimed = self._claim(keys=[POOL_KEY, POOL_PLAYERS_KEY], args=[entry['sid'] for pair in pairs for entry in pair])
+        return [(by_sid[claimed[i]], by_sid[claimed[i + 1]]) for i in range(0, len(claimed), 2)]
+
+    def record_batch(self, pairs, now_ms):
+        """Adds every matched player's wait to its level bucket's histogram and counts the tick."""
+        pipe = self.client.pipeline(transaction=False)
+        for pair in pairs:
+            for entry in pair:
+                field = f"{level_bucket(entry['level'])}|{wait_bin((now_ms - entry['joined_at']) / 1000)}"
+                pipe.hincrby(WAITS_KEY, field, 1)
+        pipe.hincrby(STATS_KEY, 'ticks', 1)
+        pipe.hincrby(STATS_KEY, 'matched_pairs', len(pairs))
+        pipe.execute()
+        if len(pairs) > int(self.client.hget(STATS_KEY, 'largest_batch') or 0):
+            self.client.hset(STATS_KEY, 'largest_batch', len(pairs))
+
+    def stats(self):
+        """Returns the tick counters and, per level bucket, how many matched players waited up to each bin."""
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hgetall(STATS_KEY)
+        pipe.hgetall(WAITS_KEY)
+        counters, waits = pipe.execute()
+        histograms = {}
+        for field, count in waits.items():
+            bucket, bin_label = field.split('|')
+            histograms.setdefault(bucket, {}).update({bin_label: int(count)})
+        return {
+            "ticks": int(counters.get('ticks', 0)),
+            "matched_pairs": int(counters.get('matched_pairs', 0)),
+            "largest_batch": int(counters.get('largest_batch', 0)),
+            "wait_seconds_by_level": histograms,
+        }
+
+    def __len__(self):
+        return self.client.zcard(POOL_KEY)
+
+
+class TickMatchmaker:
+    """Every tick_ms, pairs the whole waiting pool by level and hands the matched batch to on_batch.
+
+    load_levels(names) returns {email: level} for the waiting players in one read. Every worker runs
+    the loop, but the pool's tick lock lets only one of them match per tick.
+    """
+
+    def __init__(self, pool, load_levels, on_batch, tick_ms):
+        self.pool = pool
+        self.load_levels = load_levels
+        self.on_batch = on_batch
+        self.tick_ms = tick_ms
+
+    def tick(self):
+        """Runs one matching round if this worker holds the tick; returns the number of pairs matched."""
+        if not self.pool.try_lock(self.tick_ms):
+            return 0
+        entries, now_ms = self.pool.snapshot()
+        if len(entries) < 2:
+            return 0
+        levels = self.load_levels({entry['name'] for entry in entries})
+        for entry in entries:
+            entry['level'] = levels.get(entry['name'], 1)
+
+        pairs = self.pool.claim(pair_by_level(entries, now_ms))
+        if pairs:
+            self.pool.record_batch(pairs, now_ms)
+            self.on_batch(pairs)
+        return len(pairs)
+
+    def run(self, sleep=time.sleep):
+        """Ticks forever; pass the server's sleep (e.g. socketio.sleep) so the loop yields under eventlet."""
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Matchmaking tick failed: {e}")
+            sleep(self.tick_ms / 1000)
@@ -0,0 +1,88 @@
+import os
+import time
+import threading
+from pymongo.errors import BulkWriteError
+
+from web.alias_sampler import AliasSampler
+
+# --- Default Species ---
+# Seeded into an empty 'species' collection so a fresh stack can run the gatcha straight away.
+# _id is the Pokedex number, which is also what the sprite URL is built from.
+SPRITE_URL = "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{}.png"
+DEFAULT_SPECIES = [
+    {"_id": 7, "name": "Squirtle", "atk": 48, "def": 65, "hp": 44, "base_rarity": 1.0, "image": SPRITE_URL.format(7)},
+    {"_id": 39, "name": "Jigglypuff", "atk": 45, "def": 20, "hp": 115, "base_rarity": 1.0, "image": SPRITE_URL.format(39)},
+    {"_id": 143, "name": "Snorlax", "atk": 110, "def": 65, "hp": 160, "base_rarity": 0.5, "image": SPRITE_URL.format(143)},
+]
+
+# Fields that live on the species and are expanded into each pokemon at read time
+SPECIES_FIELDS = ('name', 'atk', 'def', 'hp', 'image')
+
+# Expanded into pokemon whose species_id is missing from the catalog (e.g. a species deleted or not
+# yet picked up by this worker), so trades, inventories and battles still get every field
+UNKNOWN_SPECIES = {"name": "Unknown", "atk": 0, "def": 0, "hp": 1, "image": None}
+
+# How often a worker re-reads the 'species' collection to pick up edits without a restart
+SPECIES_RELOAD_SECONDS = int(os.environ.get('SPECIES_RELOAD_SECONDS', 60))
+
+
+class SpeciesCatalog:
+    """In-process copy of the 'species' collection, loaded lazily and refreshed every reload_seconds."""
+
+    def __init__(self, db, reload_seconds=SPECIES_RELOAD_SECONDS):
+        self.db = db
+        self.reload_seconds = reload_seconds
+        self._species = {}
+        self._sampler = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """(Re)reads every species, seeding DEFAULT_SPECIES first if the collection is empty."""
+        if self.db.species.estimated_document_count() == 0:
+            try:
+                self.db.species.insert_many(DEFAULT_SPECIES, ordered=False)
+            except BulkWriteError:
+                pass  # Another worker seeded the same species first
+        self._species = {doc['_id']: doc for doc in self.db.species.find()}
+        # The gatcha draws from a rarity-weighted alias table rebuilt only when the catalog reloads
+        species = list(self._species.values())
+        self._sampler = AliasSampler(species, [doc.get('base_rarity', 1.0) for doc in species])
+        self._loaded_at = time.monotonic()
+
+    def _refresh(self):
+        """Loads the catalog on first use and again once it is older than reload_seconds."""
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.reload_seconds:
+            return
+        with self._lock:
+            # Re-check under the lock so only one thread hits MongoDB per reload
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.reload_seconds:
+                self.load()
+
+    def all(self):
+        """Returns every species document."""
+        self._refresh()
+        return list(self._species.values())
+
+    def get(self, species_id):
+        """Returns one species document, or None if the id is unknown."""
+        self._refresh()
+        return self._species.get(species_id)
+
+    def draw(self, count=1):
+        """Returns count species, each drawn with probability proportional to its base_rarity."""
+        self._refresh()
+        return self._sampler.sample(count)
+
+    def expand(self, pokemon, fields=SPECIES_FIELDS):
+        """Copies the species fields onto a pokemon document that only stores its species_id.
+
+        Legacy documents that still embed their own name/stats are returned unchanged, and an
+        unknown species_id is expanded with the UNKNOWN_SPECIES placeholders.
+        """
+        if not pokemon or 'species_id' not in pokemon:
+            return pokemon
+        species = self.get(pokemon['species_id']) or UNKNOWN_SPECIES
+        for field in fields:
+            pokemon.setdefault(field, species.get(field, UNKNOWN_SPECIES[field]))
+        return pokemon
@@ -59,18 +59,35 @@ async function callApi(endpoint, method, bodyData = null) {
     }
 }
 
+/**
+ * Builds a query string from the given parameters, skipping empty values.
+ * @param {Object} params - Query parameters (e.g., { cursor, limit }).
+ * @returns {string} - '' or '?key=value&...'.
+ */
+function toQueryString(params) {
+    const query = Object.entries(params)
+        .filter(([, value]) => value !== null && value !== undefined && value !== '')
+        .map(([key, value]) => `${encodeURIComponent(key)}=${encodeURIComponent(value)}`)
+        .join('&');
+    return query ? `?${query}` : '';
+}
+
 // Specific API functions
 export const API = {
     // Inventory related APIs
-    getInventory: () => callApi('inventory/', 'GET'),
+    // Pass { cursor, limit, fields, locked } to page, project or filter the inventory
+    getInventory: (params = {}) => callApi('inventory/' + toQueryString(params), 'GET'),
     releasePokemon: (ids) => callApi('release/', 'PUT', { ids }),
+    // Pass null to clear the lead and battle with a random Pokémon again
+    setLeadPokemon: (id) => callApi('inventory/lead', 'PUT', { id }),
 
     // Catch Pokemon API
     // Use trailing slash to match proxy paths and avoid 301 redirects from nginx
     runGatcha: () => callApi('gatcha/', 'POST'),
 
     // Trade related APIs
-    getTradeData: () => callApi('trade/', 'GET'),
+    // Pass the previous page's next_cursor to fetch the following page
+    getTradeData: (cursor = null) => callApi('trade/' + toQueryString({ cursor }), 'GET'),
     createTrade: (offering_ids, looking_for_count) => 
         callApi('trade/create/', 'POST', { offering_ids, looking_for_count }), 
     fulfillTrade: (trade_id, fulfilling_ids) => 
@@ -82,5 +99,10 @@ export const API = {
     
     // Battle related APIs
     getBattleData: () => callApi('battle', 'GET'),
-    enterQueue: () => callApi('battle/queue', 'POST')
+    enterQueue: () => callApi('battle/queue', 'POST'),
+    // Newest battles first; pass the previous page's next_cursor to fetch older ones
+    getBattleHistory: (cursor = null) => callApi('battle/history' + toQueryString({ cursor }), 'GET'),
+    getBattleReplay: (battleId) => callApi(`battle/${battleId}/replay`, 'GET'),
+    // board is 'level' or 'wins'; the response also carries the current player's rank as 'me'
+    getLeaderboard: (board = 'level', offset = 0) => callApi('leaderboard' + toQueryString({ board, offset }), 'GET')
 };
\ No newline at end of file
@@ -1,20 +1,49 @@
 import { API } from './api.js';
-import { renderInventory } from './renderer.js';
+import { renderInventory, renderInventoryCards, renderLoadMoreInventory } from './renderer.js';
+
+// Trade forms only need unlocked Pokémon and the fields shown on their cards
+export const TRADE_INVENTORY_PARAMS = { locked: 'false', fields: 'name,image,locked' };
+
+// Inventory query parameters for each card type that can show a "Load More" button
+const INVENTORY_PARAMS_BY_TYPE = {
+    'inventory': {},
+    'trade-create': TRADE_INVENTORY_PARAMS,
+    'trade-fulfill': TRADE_INVENTORY_PARAMS
+};
 
 /**
- * Loads the main inventory view by fetching data and rendering it.
+ * Loads the main inventory view by fetching the first page and rendering it.
  */
 export async function loadInventoryView() {
     window.actionContainer.innerHTML = '<h2>Loading Inventory...</h2>';
     try {
         const data = await API.getInventory();
-        window.actionContainer.innerHTML = renderInventory(data);
+        window.actionContainer.innerHTML = renderInventory(data.inventory, data.next_cursor);
     } catch (error) {
         window.actionContainer.innerHTML = `<h2>Inventory Error 🚨</h2><p>Failed to load inventory.</p><p>Error: ${error.message}</p>`;
         console.error("Inventory fetch error:", error);
     }
 }
 
+/**
+ * Fetches the next inventory page and appends its cards to the current grid.
+ * @param {string} cursor - The next_cursor returned with the previous page.
+ * @param {string} type - The card type being rendered ('inventory', 'trade-create' or 'trade-fulfill').
+ */
+export async function loadMoreInventory(cursor, type) {
+    const loadMoreElement = document.getElementById('inventory-load-more');
+    loadMoreElement.innerHTML = '<p>Loading more Pokémon...</p>';
+
+    try {
+        const data = await API.getInventory({ ...INVENTORY_PARAMS_BY_TYPE[type], cursor });
+        document.getElementById('inventory-grid').insertAdjacentHTML('beforeend', renderInventoryCards(data.inventory, type));
+        loadMoreElement.innerHTML = renderLoadMoreInventory(data.next_cursor, type);
+    } catch (error) {
+        loadMoreElement.innerHTML = `<p>Could not load more Pokémon. Error: ${error.message}</p>`;
+        console.error("Inventory page fetch error:", error);
+    }
+}
+
 /**
  * Handles the release API call and subsequent reload.
  */
@@ -41,4 +70,19 @@ export async function handleRelease() {
         window.actionContainer.innerHTML = `<h2>Release Failed 😞</h2><p>Error: ${error.message}</p>`;
         console.error("Release error:", error);
     }
-}
\ No newline at end of file
+}
+
+/**
+ * Sets (or clears, with null) the Pokémon that always battles for the player, then reloads the inventory.
+ * @param {string|null} pokemonId - The Pokémon's ObjectId, or null to go back to random selection.
+ */
+export async function handleSetLead(pokemonId) {
+    try {
+        const data = await API.setLeadPokemon(pokemonId);
+        alert(data.message);
+        loadInventoryView();
+    } catch (error) {
+        alert(`Could not update your lead Pokémon. Error: ${error.message}`);
+        console.error("Set lead error:", error);
+    }
+}
@@ -1,8 +1,8 @@
 // The orchestrator script that ties together various modules for the game client
 
 import { renderBattle, renderGatchaResult } from './renderer.js';
-import { loadInventoryView, handleRelease } from './inventory.js';
-import { loadTradeMenu, renderCreateTradeForm, renderFulfillTradeForm, handleCreateTrade, handleFulfillTrade, toggleTradeSelection } from './trade.js';
+import { loadInventoryView, loadMoreInventory, handleRelease, handleSetLead } from './inventory.js';
+import { loadTradeMenu, loadMoreTrades, renderCreateTradeForm, renderFulfillTradeForm, handleCreateTrade, handleFulfillTrade, toggleTradeSelection, setupTradeBoardListeners, leaveTradeBoard } from './trade.js';
 import { enterMatchmakingQueue, handleBattleEndConfirmation, setupSocketListeners } from './battle.js'; // NEW
 import { loadDashboard } from './user.js'; // NEW
 import { API } from './api.js'; // Ensure api.js is imported for generic calls
@@ -14,7 +14,10 @@ window.actionContainer = actionContainer; // Make available globally for modules
 
 // Expose these domain-specific functions globally for HTML onclick handlers
 window.handleRelease = handleRelease;
+window.handleSetLead = handleSetLead;
+window.loadMoreInventory = loadMoreInventory;
 window.loadTradeMenu = loadTradeMenu;
+window.loadMoreTrades = loadMoreTrades;
 window.renderCreateTradeForm = renderCreateTradeForm;
 window.renderFulfillTradeForm = renderFulfillTradeForm;
 window.handleCreateTrade = handleCreateTrade;
@@ -52,6 +55,11 @@ window.loadContent = async function(endpoint) {
             window.battleState.queueInterval = null;
         }
 
+        // Only the trade menu listens to trade board deltas
+        if (endpoint !== 'trade') {
+            leaveTradeBoard();
+        }
+
         if (endpoint === 'battle') {
             return enterMatchmakingQueue();
         }
@@ -104,6 +112,7 @@ function init() {
 
     // Pass the socket instance to the battle module for event binding
     setupSocketListeners(window.socket);
+    setupTradeBoardListeners(window.socket);
 
     // Set up button listeners and load dashboard
     const dynamicButtons = document.querySelectorAll('.menu-container button');
@@ -2,10 +2,15 @@
 function generatePokemonCardHtml(pokemon, type) {
     let selectionElement = '';
     let lockStatus = pokemon.locked ? ' (LOCKED)' : '';
+    let leadStatus = pokemon.lead ? ' ⭐' : '';
+    let leadButton = '';
 
     if (type === 'inventory') {
         // pokemon._id.$oid is the ObjectID in MongoDB
         selectionElement = `<input type="checkbox" name="pokemon_id" value="${pokemon._id.$oid}" class="release-checkbox" style="position: absolute; top: 10px; left: 10px; width: 20px; height: 20px;" ${pokemon.locked ? 'disabled' : ''}>`;
+        leadButton = pokemon.lead
+            ? `<button type="button" onclick="window.handleSetLead(null)">Clear Lead</button>`
+            : `<button type="button" onclick="window.handleSetLead('${pokemon._id.$oid}')">Set as Lead</button>`;
     } else if (type === 'trade-create' || type === 'trade-fulfill') {
         // ToggleTradeSelection is a global function defined in main.js/window object
         const className = type === 'trade-create' ? 'create-trade-checkbox' : 'fulfill-trade-checkbox';
@@ -22,13 +27,14 @@ function generatePokemonCardHtml(pokemon, type) {
     
     // Base card structure
     const cardContent = `
-        <h3>${pokemon.name}${lockStatus}</h3>
+        <h3>${pokemon.name}${lockStatus}${leadStatus}</h3>
         <img src="${pokemon.image}" alt="${pokemon.name}">
         <ul class="stat-list">
             <li>HP: ${pokemon.hp}</li>
             <li>ATK: ${pokemon.atk}</li>
             <li>DEF: ${pokemon.def}</li>
         </ul>
+        ${leadButton}
     `;
     
     // Return different structure based on context
@@ -63,18 +69,31 @@ export function renderGatchaResult(data) {
     `;
 }
 
-export function renderInventory(pokemonList, handleRelease) {
+export function renderInventoryCards(pokemonList, type = 'inventory') {
+    return pokemonList.map(pokemon => generatePokemonCardHtml(pokemon, type)).join('');
+}
+
+export function renderLoadMoreInventory(nextCursor, type = 'inventory') {
+    // No cursor means the last page has been reached
+    if (!nextCursor) {
+        return '';
+    }
+    return `<button type="button" class="menu-button" style="background-color: #5bc0de;" onclick="window.loadMoreInventory('${nextCursor}', '${type}')">Load More Pokémon</button>`;
+}
+
+export function renderInventory(pokemonList, nextCursor) {
     if (pokemonList.length === 0) {
         return `<h2>Inventory Empty</h2><p>You haven't caught any Pokemon yet! Go use the Gatcha!</p>`;
     }
 
-    const inventoryHtml = pokemonList.map(pokemon => generatePokemonCardHtml(pokemon, 'inventory')).join('');
+    const inventoryHtml = renderInventoryCards(pokemonList, 'inventory');
 
     return `
-        <h2>Your Pokemon Inventory (${pokemonList.length} Caught)</h2>
+        <h2>Your Pokemon Inventory</h2>
         <form id="release-form" onsubmit="return false;"> 
-            <p>Locked Pokémon (in trade) cannot be released.</p>
-            <div style="display:flex; flex-wrap:wrap; justify-content:center;">${inventoryHtml}</div>
+            <p>Locked Pokémon (in trade) cannot be released. Your lead (⭐) always fights in battles.</p>
+            <div id="inventory-grid" style="display:flex; flex-wrap:wrap; justify-content:center;">${inventoryHtml}</div>
+            <div id="inventory-load-more" style="margin-top: 20px;">${renderLoadMoreInventory(nextCursor, 'inventory')}</div>
             <button type="button" onclick="window.handleRelease()" style="margin-top: 20px; padding: 10px 30px; background-color: #dc3545; color: white; border: none; border-radius: 5px; cursor: pointer;">
                 Confirm Release Selected
             </button>
@@ -94,13 +113,11 @@ export function renderBattle(data) {
 
 // --- TRADE RENDERERS ---
 
-export function renderTradeMenu(inventory, pendingTrades, currentPlayer) {
-    const inventoryString = JSON.stringify(inventory).replace(/"/g, '&quot;');
-    
-    const tradeListHtml = pendingTrades.map(trade => {
+export function renderTradeItems(pendingTrades) {
+    return pendingTrades.map(trade => {
         const offeredNames = trade.offered_details.map(pokemon => pokemon.name).join(', ');
         return `
-            <li class="trade-request-item" style="border: 1px solid #5bc0de; padding: 15px; margin-bottom: 10px; border-radius: 5px;">
+            <li id="trade-${trade.id}" class="trade-request-item" style="border: 1px solid #5bc0de; padding: 15px; margin-bottom: 10px; border-radius: 5px;">
                 <p><strong>Offer ID:</strong> ${trade.id} | From: ${trade.creator}</p>
                 <p><strong>Offering:</strong> ${offeredNames} (1 Total)</p>
                 <p><strong>Requesting:</strong> 1 of YOUR Pokémon</p>
@@ -108,33 +125,47 @@ export function renderTradeMenu(inventory, pendingTrades, currentPlayer) {
             </li>
         `;
     }).join('');
+}
+
+export function renderLoadMoreTrades(nextCursor) {
+    // No cursor means the last page has been reached
+    if (!nextCursor) {
+        return '';
+    }
+    return `<button class="menu-button" style="background-color: #5bc0de;" onclick="window.loadMoreTrades('${nextCursor}')">Load More Trades</button>`;
+}
+
+export function renderTradeMenu(pendingTrades, currentPlayer, nextCursor) {
+    const tradeListHtml = renderTradeItems(pendingTrades);
 
     return `
         <div style="width: 100%;">
             <h1>Pokémon Trade Center</h1>
             
             <div style="display: flex; justify-content: space-around; margin-bottom: 30px;">
-                <button class="menu-button" style="background-color: #28a745;" onclick="window.renderCreateTradeForm(${inventoryString})">
+                <button class="menu-button" style="background-color: #28a745;" onclick="window.renderCreateTradeForm()">
                     + Create New Trade
                 </button>
             </div>
             
-            <h2>Pending Trade Requests (${pendingTrades.length})</h2>
-            <ul style="list-style: none; padding: 0; max-width: 600px; margin: 0 auto; text-align: left;">
-                ${tradeListHtml || '<p>No pending trade requests at the moment.</p>'}
+            <h2>Pending Trade Requests</h2>
+            <ul id="trade-list" style="list-style: none; padding: 0; max-width: 600px; margin: 0 auto; text-align: left;">
+                ${tradeListHtml || '<p id="trade-empty">No pending trade requests at the moment.</p>'}
             </ul>
+            <div id="trade-load-more" style="margin-top: 20px;">${renderLoadMoreTrades(nextCursor)}</div>
         </div>
     `;
 }
 
-export function renderCreateTradeFormHTML(inventory) {
-    const inventoryHtml = inventory.map(pokemon => generatePokemonCardHtml(pokemon, 'trade-create')).join('');
+export function renderCreateTradeFormHTML(inventory, nextCursor) {
+    const inventoryHtml = renderInventoryCards(inventory, 'trade-create');
 
     return `
         <h1>Create New Trade (Select 1 to Offer)</h1>
         <div id="selection-status">Selected: 0</div>
         
-        <div style="display:flex; flex-wrap:wrap; justify-content:center;">${inventoryHtml}</div>
+        <div id="inventory-grid" style="display:flex; flex-wrap:wrap; justify-content:center;">${inventoryHtml}</div>
+        <div id="inventory-load-more" style="margin-top: 20px;">${renderLoadMoreInventory(nextCursor, 'trade-create')}</div>
         
         <div style="margin-top: 20px;">
             <button onclick="window.handleCreateTrade()" class="menu-button" style="background-color: #28a745;">Confirm Trade Offer</button>
@@ -143,13 +174,13 @@ export function renderCreateTradeFormHTML(inventory) {
     `;
 }
 
-export function renderFulfillTradeFormHTML(tradeId, requestedCount, creator, inventory) {
+export function renderFulfillTradeFormHTML(tradeId, requestedCount, creator, inventory, nextCursor) {
     const availableInventory = inventory.filter(pokemon => !pokemon.locked);
     
     // We pass 1 to generatePokemonCardHtml for max selection status
     const inventoryWithCount = availableInventory.map(pokemon => ({...pokemon, requiredCount: 1}));
 
-    const inventoryHtml = inventoryWithCount.map(pokemon => generatePokemonCardHtml(pokemon, 'trade-fulfill')).join('');
+    const inventoryHtml = renderInventoryCards(inventoryWithCount, 'trade-fulfill');
 
     return `
         <h1>Fulfill Trade Request from ${creator}</h1>
@@ -157,7 +188,8 @@ export function renderFulfillTradeFormHTML(tradeId, requestedCount, creator, inv
         <div id="selection-status">Selected: 0 / 1</div>
 
         <p>Select your 1 Pokémon to send:</p>
-        <div style="display:flex; flex-wrap:wrap; justify-content:center;">${inventoryHtml || '<p>Your available inventory is empty!</p>'}</div>
+        <div id="inventory-grid" style="display:flex; flex-wrap:wrap; justify-content:center;">${inventoryHtml || '<p>Your available inventory is empty!</p>'}</div>
+        <div id="inventory-load-more" style="margin-top: 20px;">${renderLoadMoreInventory(nextCursor, 'trade-fulfill')}</div>
         
         <div style="margin-top: 20px;">
             <button onclick="window.handleFulfillTrade('${tradeId}', 1)" class="menu-button" style="background-color: #28a745;" id="fulfill-confirm-btn" disabled>Confirm Fulfillment</button>
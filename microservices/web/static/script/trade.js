@@ -1,8 +1,49 @@
 import { API } from './api.js';
-import { renderTradeMenu, renderCreateTradeFormHTML, renderFulfillTradeFormHTML } from './renderer.js';
+import { TRADE_INVENTORY_PARAMS } from './inventory.js';
+import { renderTradeMenu, renderTradeItems, renderLoadMoreTrades, renderCreateTradeFormHTML, renderFulfillTradeFormHTML } from './renderer.js';
+
+// --- Live trade board ---
+
+/**
+ * Patches the rendered trade list with the deltas pushed to the 'trade_board' room,
+ * so the board stays current without re-fetching /api/trade/.
+ */
+export function setupTradeBoardListeners(socket) {
+    socket.on('trade_added', (trade) => {
+        const tradeList = document.getElementById('trade-list');
+        const loadMore = document.getElementById('trade-load-more');
+        // Trades are listed oldest first, so a new one belongs after the last page; if more pages
+        // are still to be loaded it will arrive with them
+        if (!tradeList || document.getElementById(`trade-${trade.id}`) || (loadMore && loadMore.querySelector('button'))) {
+            return;
+        }
+        const emptyMessage = document.getElementById('trade-empty');
+        if (emptyMessage) emptyMessage.remove();
+        tradeList.insertAdjacentHTML('beforeend', renderTradeItems([trade]));
+    });
+
+    socket.on('trade_removed', (data) => {
+        const item = document.getElementById(`trade-${data.id}`);
+        if (item) item.remove();
+    });
+
+    // Room membership does not survive a reconnect
+    socket.on('connect', () => {
+        if (document.getElementById('trade-list')) socket.emit('join_trade_board');
+    });
+}
+
+/**
+ * Stops receiving trade board deltas (called when leaving the trade menu).
+ */
+export function leaveTradeBoard() {
+    if (window.socket && window.socket.connected) {
+        window.socket.emit('leave_trade_board');
+    }
+}
 
 /**
- * Loads the main trade menu view.
+ * Loads the main trade menu view (first page of pending trades).
  */
 export async function loadTradeMenu() {
     window.actionContainer.innerHTML = '<h2>Loading Trade Data...</h2>';
@@ -10,10 +51,14 @@ export async function loadTradeMenu() {
     try {
         const data = await API.getTradeData();
         window.actionContainer.innerHTML = renderTradeMenu(
-            data.inventory, 
             data.pending_trades, 
-            data.current_player
+            data.current_player,
+            data.next_cursor
         );
+        // Subscribe to live updates instead of re-fetching the board
+        if (window.socket && window.socket.connected) {
+            window.socket.emit('join_trade_board');
+        }
     } catch (error) {
         window.actionContainer.innerHTML = `<h2>Trade Server Error 🚨</h2><p>Could not load trade data.</p><p>Error: ${error.message}</p>`;
         console.error("Trade fetch error:", error);
@@ -21,11 +66,34 @@ export async function loadTradeMenu() {
 }
 
 /**
- * Renders the form for creating a new trade offer.
- * @param {Array<Object>} inventory - The player's available Pokémon.
+ * Fetches the next page of pending trades and appends it to the list.
+ * @param {string} cursor - The next_cursor returned with the previous page.
  */
-export function renderCreateTradeForm(inventory) {
-    window.actionContainer.innerHTML = renderCreateTradeFormHTML(inventory, 1);
+export async function loadMoreTrades(cursor) {
+    const loadMoreElement = document.getElementById('trade-load-more');
+    loadMoreElement.innerHTML = '<p>Loading more trades...</p>';
+
+    try {
+        const data = await API.getTradeData(cursor);
+        document.getElementById('trade-list').insertAdjacentHTML('beforeend', renderTradeItems(data.pending_trades));
+        loadMoreElement.innerHTML = renderLoadMoreTrades(data.next_cursor);
+    } catch (error) {
+        loadMoreElement.innerHTML = `<p>Could not load more trades. Error: ${error.message}</p>`;
+        console.error("Trade page fetch error:", error);
+    }
+}
+
+/**
+ * Renders the form for creating a new trade offer from the player's available Pokémon.
+ */
+export async function renderCreateTradeForm() {
+    window.actionContainer.innerHTML = '<h2>Loading Inventory...</h2>';
+    try {
+        const data = await API.getInventory(TRADE_INVENTORY_PARAMS);
+        window.actionContainer.innerHTML = renderCreateTradeFormHTML(data.inventory, data.next_cursor);
+    } catch (error) {
+        window.actionContainer.innerHTML = `<h2>Error loading inventory for trade creation.</h2><p>${error.message}</p>`;
+    }
 }
 
 /**
@@ -35,8 +103,8 @@ export async function renderFulfillTradeForm(tradeId, requestedCount, creator) {
     // requestedCount will always be 1, but we keep it for now as a parameter for consistency
     window.actionContainer.innerHTML = '<h2>Loading Inventory...</h2>';
     try {
-        const inventory = await API.getInventory();
-        window.actionContainer.innerHTML = renderFulfillTradeFormHTML(tradeId, 1, creator, inventory);
+        const data = await API.getInventory(TRADE_INVENTORY_PARAMS);
+        window.actionContainer.innerHTML = renderFulfillTradeFormHTML(tradeId, 1, creator, data.inventory, data.next_cursor);
     } catch (error) {
         window.actionContainer.innerHTML = `<h2>Error loading inventory for trade fulfillment.</h2><p>${error.message}</p>`;
     }
@@ -1,39 +1,110 @@
+import os
 import json
 from bson.objectid import ObjectId
-from flask import request, jsonify
-from web.db_utils import create_app, get_current_user_email
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+from flask import request, jsonify, Response, stream_with_context
+from flask_socketio import SocketIO
+from web.db_utils import create_app, get_current_user_email, TRADE_BOARD_ROOM
+from web.species_catalog import SpeciesCatalog
+from web.inventory_cache import create_inventory_cache
+from web.trades import (
+    attach_offered_details, fulfill_trade_swap,
+    FULFILL_OK, FULFILL_NOT_FOUND, FULFILL_INVALID_OFFER, FULFILL_CONFLICT
+)
 from datetime import datetime
 
 # Initialize the Flask App and MongoDB connection for this service
 app, mongo = create_app(__name__)
 
+# Species are loaded once per worker and expanded into pokemon at read time
+species_catalog = SpeciesCatalog(mongo.db)
+
+# Shared Redis inventory cache; every lock or swap invalidates the players involved
+inventory_cache = create_inventory_cache(app.logger)
+
+# --- Trade board delta events ---
+# A write-only Socket.IO client: emits go through the same Redis message queue as the battle
+# service, which delivers them to every client in TRADE_BOARD_ROOM.
+trade_events = SocketIO(message_queue=os.environ.get('SESSION_REDIS', 'redis://localhost:6379/1'), async_mode='threading')
+
+def publish_trade_event(event, payload):
+    """Broadcasts a trade_added / trade_removed delta; a failed publish never fails the request."""
+    try:
+        trade_events.emit(event, payload, to=TRADE_BOARD_ROOM)
+    except Exception as e:
+        app.logger.error(f"Failed to publish {event}: {e}")
+
+# --- Keyset pagination over pending trades ---
+TRADE_PAGE_SIZE = 20
+MAX_TRADE_PAGE_SIZE = 100
+TRADE_STREAM_CHUNK = 200
+TRADE_SORT = [('timestamp', 1), ('_id', 1)]
+
+def encode_trade_cursor(trade):
+    """Builds an opaque cursor pointing just past the given trade."""
+    return f"{trade['timestamp'].isoformat()}|{trade['_id']}"
+
+def pending_trades_query(cursor=None):
+    """Returns the pending-trade filter, resuming after the cursor when one is given."""
+    query = {"status": "pending"}
+    if cursor:
+        timestamp, trade_id = cursor.split('|')
+        timestamp, trade_id = datetime.fromisoformat(timestamp), ObjectId(trade_id)
+        query['$or'] = [
+            {'timestamp': {'$gt': timestamp}},
+            {'timestamp': timestamp, '_id': {'$gt': trade_id}}
+        ]
+    return query
+
+def serialize_trades(trades):
+    """Converts trade documents for the client and joins their offered pokemon."""
+    for doc in trades:
+        doc['id'] = str(doc.pop('_id'))
+    return attach_offered_details(mongo.db, trades, species_catalog)
+
+def stream_pending_trades(query):
+    """Yields one NDJSON line per trade, joining offered pokemon a chunk at a time."""
+    chunk = []
+    for doc in mongo.db.trade.find(query).sort(TRADE_SORT).batch_size(TRADE_STREAM_CHUNK):
+        chunk.append(doc)
+        if len(chunk) == TRADE_STREAM_CHUNK:
+            for trade in serialize_trades(chunk):
+                yield app.json.dumps(trade) + "\n"
+            chunk = []
+    for trade in serialize_trades(chunk):
+        yield app.json.dumps(trade) + "\n"
+
 # --- Routes ---
 
 @app.route('/api/trade/', methods=['GET'])
 def get_trade_menu_data():
-    """Returns the current player's inventory and all pending trades."""
-    # 1. Get current player's available (unlocked) inventory
-    available_inventory = mongo.db.pokemon.find({"player": get_current_user_email(), "locked": False})
-    available_inventory = list(available_inventory)
-    
-    # 2. Get all pending trades
-    pending_trades = []
-    for doc in mongo.db.trade.find({"status": "pending"}):
-        doc['id'] = str(doc.pop('_id'))
-        
-        # Look up the details of the offered pokemon (for display)
-        offered_pokemon_details = []
-        for p_id in doc['offering_ids']:
-            p_doc = mongo.db.pokemon.find_one({'_id': ObjectId(p_id)})
-            if p_doc:
-                offered_pokemon_details.append({"name": p_doc['name'], "image": p_doc['image']})
-        
-        doc['offered_details'] = offered_pokemon_details
-        pending_trades.append(doc)
+    """Returns one page of pending trades, oldest first.
+
+    Query parameters:
+        cursor: the 'next_cursor' of the previous page (omit for the first page)
+        limit:  page size, capped at MAX_TRADE_PAGE_SIZE
+        format: 'ndjson' streams every trade after the cursor, one JSON object per line
+    """
+    try:
+        query = pending_trades_query(request.args.get('cursor'))
+    except (ValueError, InvalidId):
+        return jsonify({"message": "Invalid trade cursor."}), 400
+
+    if request.args.get('format') == 'ndjson':
+        return Response(stream_with_context(stream_pending_trades(query)), mimetype='application/x-ndjson')
+
+    limit = request.args.get('limit', TRADE_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_TRADE_PAGE_SIZE))
+
+    # Fetch one extra trade to know whether another page exists
+    page = list(mongo.db.trade.find(query).sort(TRADE_SORT).limit(limit + 1))
+    next_cursor = encode_trade_cursor(page[limit - 1]) if len(page) > limit else None
+    pending_trades = serialize_trades(page[:limit])
 
     return jsonify({
-        "inventory": available_inventory,
         "pending_trades": pending_trades,
+        "next_cursor": next_cursor,
         "current_player": get_current_user_email()
     })
 
@@ -49,15 +120,20 @@ def create_trade():
 
     object_id = ObjectId(offering_ids[0])
     
-    # 2. Lock the Pokemon for trade
-    lock_result = mongo.db.pokemon.update_one(
+    # 2. Lock the Pokemon for trade, reading back what the trade_added event needs to display it
+    locked_pokemon = mongo.db.pokemon.find_one_and_update(
         {'_id': object_id, 'player': get_current_user_email(), 'locked': False},
-        {'$set': {'locked': True}}
+        {'$set': {'locked': True}},
+        projection={'name': 1, 'image': 1, 'species_id': 1},
+        return_document=ReturnDocument.AFTER
     )
 
-    if lock_result.modified_count != 1:
+    if not locked_pokemon:
         return jsonify({"message": "Could not lock the selected Pokémon. It may be locked or not yours."}), 409
 
+    if inventory_cache is not None:
+        inventory_cache.invalidate(get_current_user_email())
+
     # 3. Create the trade request document (always looking for 1)
     trade_request = {
         "creator": get_current_user_email(),
@@ -67,6 +143,15 @@ def create_trade():
         "timestamp": datetime.now()
     }
     mongo.db.trade.insert_one(trade_request)
+
+    # 4. Push the new trade to everyone watching the board, in the same shape as a listed trade
+    locked_pokemon = species_catalog.expand(locked_pokemon, ('name', 'image'))
+    publish_trade_event('trade_added', {
+        "id": str(trade_request['_id']),
+        "creator": trade_request['creator'],
+        "timestamp": trade_request['timestamp'].isoformat(),
+        "offered_details": [{"name": locked_pokemon['name'], "image": locked_pokemon['image']}]
+    })
     
     return jsonify({
         "message": "1-for-1 Trade request created! Your Pokémon is locked.",
@@ -75,7 +160,7 @@ def create_trade():
 
 @app.route('/api/trade/fulfill/', methods=['PUT'])
 def fulfill_trade():
-    """Requires exactly one Pokémon to fulfill the trade, swaps ownership, and removes the request."""
+    """Requires exactly one Pokémon to fulfill the trade, swaps ownership, and closes the request."""
     data = request.get_json()
     trade_id = data.get('trade_id')
     fulfilling_ids = data.get('fulfilling_ids', [])
@@ -85,35 +170,25 @@ def fulfill_trade():
 
     trade_obj_id = ObjectId(trade_id)
     fulfilling_obj_id = ObjectId(fulfilling_ids[0])
-    
-    # 1. Retrieve the trade request
-    trade = mongo.db.trade.find_one({'_id': trade_obj_id})
-    if not trade or trade.get('looking_for_count') != 1:
-        return jsonify({"message": "Trade request not found or is not a 1-for-1 trade."}), 404
-    
-    # The Pokemon offered in the original trade
-    original_offered_id = ObjectId(trade['offering_ids'][0])
-    
-    # 2. Perform the swap using two atomic updates
-    
-    # A. Original Creator (e.g., TrainerB) receives CURRENT_PLAYER's (TrainerA's) Pokemon
-    mongo.db.pokemon.update_one(
-        {'_id': fulfilling_obj_id, 'player': get_current_user_email()},
-        {'$set': {'player': trade['creator'], 'locked': False}}
-    )
-    
-    # B. CURRENT_PLAYER (TrainerA) receives the Original Creator's (TrainerB's) Pokemon (and unlocks it)
-    mongo.db.pokemon.update_one(
-        {'_id': original_offered_id},
-        {'$set': {'player': get_current_user_email(), 'locked': False}}
-    )
 
-    # 3. Delete the fulfilled trade request
-    mongo.db.trade.delete_one({'_id': trade_obj_id})
+    outcome, trade = fulfill_trade_swap(mongo.db, trade_obj_id, fulfilling_obj_id, get_current_user_email())
+
+    # Any claimed trade may have moved Pokemon, even if the swap was later undone
+    if inventory_cache is not None and trade:
+        inventory_cache.invalidate(get_current_user_email(), trade['creator'])
+
+    if outcome == FULFILL_NOT_FOUND:
+        return jsonify({"message": "Trade request not found, already fulfilled, or is not a 1-for-1 trade."}), 404
+    if outcome == FULFILL_INVALID_OFFER:
+        return jsonify({"message": "Could not trade the selected Pokémon. It may be locked or not yours."}), 409
+    if outcome == FULFILL_CONFLICT:
+        return jsonify({"message": "The trade could not be completed due to a conflicting update. Please try again."}), 409
+
+    publish_trade_event('trade_removed', {"id": trade_id})
 
     return jsonify({
         "message": "Trade successful! 1-for-1 Pokémon swap completed.",
-        "traded_in": str(original_offered_id),
+        "traded_in": trade['offering_ids'][0],
         "traded_out": str(fulfilling_obj_id)
     })
 
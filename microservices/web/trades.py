@@ -0,0 +1,149 @@
+import logging
+from datetime import datetime
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError, AutoReconnect, OperationFailure
+
+# Trade queries and writes shared by the trade service and its benchmarks.
+# Kept free of import-time side effects (no app, database or Redis connections).
+
+logger = logging.getLogger(__name__)
+
+# --- Helper to join trades with their offered pokemon ---
+def attach_offered_details(db, trades, species_catalog):
+    """Fills 'offered_details' on every trade using one $in lookup instead of one find_one per pokemon."""
+    offered_ids = {ObjectId(p_id) for trade in trades for p_id in trade['offering_ids']}
+
+    # Only the display fields (or the species id they are expanded from) are needed
+    details_by_id = {}
+    if offered_ids:
+        offered = db.pokemon.find({'_id': {'$in': list(offered_ids)}}, {'name': 1, 'image': 1, 'species_id': 1})
+        for p_doc in offered:
+            p_doc = species_catalog.expand(p_doc, ('name', 'image'))
+            details_by_id[p_doc['_id']] = {"name": p_doc['name'], "image": p_doc['image']}
+
+    for trade in trades:
+        # Keep the original offering order and skip pokemon that no longer exist
+        trade['offered_details'] = [
+            details_by_id[ObjectId(p_id)] for p_id in trade['offering_ids'] if ObjectId(p_id) in details_by_id
+        ]
+    return trades
+
+# --- Trade fulfillment: one conditional claim, then one bulk_write ---
+FULFILL_MAX_ATTEMPTS = 3
+WRITE_CONFLICT_CODE = 112
+
+FULFILL_OK = 'fulfilled'
+FULFILL_NOT_FOUND = 'not_found'
+FULFILL_INVALID_OFFER = 'invalid_offer'
+FULFILL_CONFLICT = 'conflict'
+
+# A claimed trade whose failed swap could not be undone either; it leaves the board until repaired by hand
+TRADE_NEEDS_REPAIR = 'needs_repair'
+
+def is_transient_write_error(error):
+    """True for errors where simply re-sending the same write is the right response."""
+    if isinstance(error, AutoReconnect):
+        return True
+    return isinstance(error, OperationFailure) and (
+        error.code == WRITE_CONFLICT_CODE or error.has_error_label('TransientTransactionError')
+    )
+
+def bulk_write_with_retry(collection, requests, ordered=True):
+    """bulk_write that is re-sent up to FULFILL_MAX_ATTEMPTS times on transient errors; the requests must be idempotent."""
+    for attempt in range(FULFILL_MAX_ATTEMPTS):
+        try:
+            return collection.bulk_write(requests, ordered=ordered)
+        except PyMongoError as e:
+            if not is_transient_write_error(e) or attempt + 1 == FULFILL_MAX_ATTEMPTS:
+                raise
+
+def fulfill_trade_swap(db, trade_obj_id, fulfilling_obj_id, user_email):
+    """Atomically claims a pending trade and swaps both Pokemon.
+
+    Only one caller can move a trade out of 'pending', so concurrent fulfills of the same trade
+    can never double-swap. Both swapped Pokemon are tagged with the trade id, which makes the
+    bulk_write safe to re-send and lets a failed swap be undone precisely.
+    Returns (outcome, trade) where outcome is one of the FULFILL_* constants and trade is the
+    claimed trade document (None only when nothing could be claimed).
+    """
+    # 1. Claim the trade: the status filter makes this the single point of mutual exclusion
+    trade = db.trade.find_one_and_update(
+        {'_id': trade_obj_id, 'status': 'pending', 'looking_for_count': 1},
+        {'$set': {'status': 'fulfilled', 'fulfilled_by': user_email, 'fulfilled_at': datetime.now()}}
+    )
+    if not trade:
+        return FULFILL_NOT_FOUND, None
+
+    creator = trade['creator']
+    original_offered_id = ObjectId(trade['offering_ids'][0])
+
+    # 2. Swap both Pokemon in one round trip. Each filter also matches its own already-applied
+    # state, so a retried bulk_write reports the same matched_count without changing anything.
+    # A traded Pokemon stops being its old owner's battle lead.
+    swap = [
+        # A. Original Creator receives CURRENT_PLAYER's Pokemon
+        UpdateOne(
+            {'_id': fulfilling_obj_id, '$or': [
+                {'player': user_email, 'locked': False},
+                {'player': creator, 'last_trade': trade_obj_id}
+            ]},
+            {'$set': {'player': creator, 'last_trade': trade_obj_id}, '$unset': {'lead': ''}}
+        ),
+        # B. CURRENT_PLAYER receives the Original Creator's Pokemon (and unlocks it)
+        UpdateOne(
+            {'_id': original_offered_id, '$or': [
+                {'player': creator, 'locked': True},
+                {'player': user_email, 'last_trade': trade_obj_id}
+            ]},
+            {'$set': {'player': user_email, 'locked': False, 'last_trade': trade_obj_id}, '$unset': {'lead': ''}}
+        )
+    ]
+
+    lead_ids = set()
+    try:
+        # The swap clears the lead flag of both Pokemon; remember it so an undone swap can restore it
+        lead_ids = {doc['_id'] for doc in db.pokemon.find(
+            {'_id': {'$in': [fulfilling_obj_id, original_offered_id]}, 'lead': True}, {'_id': 1}
+        )}
+        result = bulk_write_with_retry(db.pokemon, swap)
+        outcome = FULFILL_OK if result.matched_count == len(swap) else FULFILL_INVALID_OFFER
+    except PyMongoError as e:
+        logger.warning(f"Swap for trade {trade_obj_id} failed: {e}")
+        outcome = FULFILL_CONFLICT
+
+    if outcome == FULFILL_OK:
+        return outcome, trade
+
+    # 3. The swap did not fully apply: undo whatever part carries this trade's tag and reopen the trade.
+    # Both steps match only their not-yet-undone state, so they are as safe to re-send as the swap.
+    def restore(pokemon_id, fields):
+        if pokemon_id in lead_ids:
+            fields = {**fields, 'lead': True}
+        return {'$set': fields, '$unset': {'last_trade': ''}}
+
+    try:
+        bulk_write_with_retry(db.pokemon, [
+            UpdateOne(
+                {'_id': fulfilling_obj_id, 'player': creator, 'last_trade': trade_obj_id},
+                restore(fulfilling_obj_id, {'player': user_email})
+            ),
+            UpdateOne(
+                {'_id': original_offered_id, 'player': user_email, 'last_trade': trade_obj_id},
+                restore(original_offered_id, {'player': creator, 'locked': True})
+            )
+        ], ordered=False)
+        bulk_write_with_retry(db.trade, [UpdateOne(
+            {'_id': trade_obj_id, 'status': 'fulfilled', 'fulfilled_by': user_email},
+            {'$set': {'status': 'pending'}, '$unset': {'fulfilled_by': '', 'fulfilled_at': ''}}
+        )])
+    except PyMongoError as e:
+        logger.error(f"Undo of trade {trade_obj_id} failed, marking it {TRADE_NEEDS_REPAIR}: {e}")
+        try:
+            db.trade.update_one(
+                {'_id': trade_obj_id, 'status': 'fulfilled', 'fulfilled_by': user_email},
+                {'$set': {'status': TRADE_NEEDS_REPAIR}}
+            )
+        except PyMongoError as e:
+            logger.error(f"Could not mark trade {trade_obj_id} {TRADE_NEEDS_REPAIR}: {e}")
+    return outcome, trade
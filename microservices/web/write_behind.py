@@ -0,0 +1,147 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from bson.objectid import ObjectId
+
+# --- Acknowledgement modes ---
+# ACK_ON_FLUSH: submit() returns once the documents are in MongoDB (no write is ever lost silently)
+# ACK_ON_ENQUEUE: submit() returns as soon as the documents are queued (lowest latency, a crash loses the queue)
+ACK_ON_FLUSH = 'flush'
+ACK_ON_ENQUEUE = 'enqueue'
+
+# How long an ACK_ON_FLUSH caller waits for its batch before giving up
+FLUSH_WAIT_SECONDS = 5
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindError(Exception):
+    """Raised to an ACK_ON_FLUSH caller whose documents could not be written."""
+
+
+class WriteBehindTimeout(WriteBehindError):
+    """Raised to an ACK_ON_FLUSH caller that stopped waiting; its documents are still queued and may be written later."""
+
+
+class _Pending:
+    """A group of documents submitted together, plus the event its caller may be waiting on."""
+
+    def __init__(self, docs, wait):
+        self.docs = docs
+        self.done = threading.Event() if wait else None
+        self.error = None
+
+
+class WriteBehindInserter:
+    """Queues documents in-process and writes them with insert_many every max_batch documents or max_delay_ms.
+
+    A single background thread owns all writes. close() (also registered with atexit) stops the
+    thread only after everything already queued has been flushed. on_flush, if given, is called
+    with the documents of every successfully written batch (e.g. to invalidate caches).
+    """
+
+    def __init__(self, collection, max_batch=100, max_delay_ms=50, ack_mode=ACK_ON_FLUSH, on_flush=None):
+        if ack_mode not in (ACK_ON_FLUSH, ACK_ON_ENQUEUE):
+            raise ValueError(f"Unknown ack mode: {ack_mode}")
+        self.collection = collection
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000.0
+        self.ack_mode = ack_mode
+        self.on_flush = on_flush
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, docs):
+        """Queues documents for insertion; blocks until they are written when ack_mode is ACK_ON_FLUSH.
+
+        Every document gets its _id up front so callers can return it before the write happens.
+        The queue holds shallow copies, so callers may keep changing their documents (e.g. expand
+        them for the response) without that reaching MongoDB.
+        """
+        if self._closed:
+            raise WriteBehindError("Write-behind queue is closed.")
+        for doc in docs:
+            doc.setdefault('_id', ObjectId())
+
+        pending = _Pending([dict(doc) for doc in docs], wait=self.ack_mode == ACK_ON_FLUSH)
+        self._queue.put(pending)
+        if pending.done is None:
+            return docs
+
+        if not pending.done.wait(FLUSH_WAIT_SECONDS):
+            raise WriteBehindTimeout("Timed out waiting for the write-behind flush; the documents are still queued.")
+        if pending.error:
+            raise WriteBehindError(f"Write-behind flush failed: {pending.error}")
+        return docs
+
+    def close(self):
+        """Flushes everything still queued, then stops the background thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        """Background loop: wait for the first document, then fill the batch until it is full or too old."""
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            size = len(first.docs)
+            deadline = time.monotonic() + self.max_delay
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if pending is None:
+                    stopping = True
+                    break
+                batch.append(pending)
+                size += len(pending.docs)
+            self._flush(batch)
+
+        # Shutdown: drain whatever was queued after the stop marker was read
+        leftovers = []
+        while True:
+            try:
+                pending = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if pending is not None:
+                leftovers.append(pending)
+        if leftovers:
+            self._flush(leftovers)
+
+    def _flush(self, batch):
+        """Writes one batch with a single unordered insert_many and releases every waiting caller."""
+        docs = [doc for pending in batch for doc in pending.docs]
+        error = None
+        try:
+            self.collection.insert_many(docs, ordered=False)
+        except Exception as e:
+            # Anything escaping here (e.g. bson InvalidDocument) would kill the only writer thread
+            error = e
+            logger.error(f"Write-behind insert of {len(docs)} document(s) failed: {e}")
+
+        if error is None and self.on_flush:
+            try:
+                self.on_flush(docs)
+            except Exception as e:
+                logger.error(f"Write-behind on_flush callback failed: {e}")
+
+        for pending in batch:
+            pending.error = error
+            if pending.done is not None:
+                pending.done.set()